@@ -0,0 +1,213 @@
+import time
+import queue
+import threading
+from collections import Counter, namedtuple
+
+import psutil
+
+
+# Outcome of one process: 'terminated', 'killed' (needed SIGKILL), 'done' (suspend, resume,
+# priority), 'gone' (already exited), 'denied', 'reused' (PID now belongs to another
+# process), 'survived' or 'failed'
+ActionResult = namedtuple('ActionResult', ['batch', 'pid', 'name', 'outcome', 'detail'])
+
+FAILED = frozenset({'denied', 'survived', 'failed'})
+
+# action: what a successful result is called
+ACTIONS = {'terminate': 'terminated', 'kill': 'killed', 'suspend': 'suspended', 'resume': 'resumed',
+           'priority': 'reprioritized'}
+
+
+def is_zombie(proc):
+    try:
+        return proc.status() == psutil.STATUS_ZOMBIE
+    except psutil.NoSuchProcess:
+        return True
+    except psutil.AccessDenied:
+        return False
+
+
+class Batch:
+    """One action on a group of processes; `outcomes` counts results as they arrive"""
+
+    def __init__(self, targets, source, label, action='terminate', value=None):
+        if action not in ACTIONS:
+            raise ValueError(f"unknown action {action!r}")
+        self.targets = list(targets)  # (pid, create_time or None, name)
+        self.source = source
+        self.label = label
+        self.action = action
+        self.value = value  # the nice value for 'priority'
+        self.outcomes = Counter()
+        self.failures = []  # ActionResults that did not end their process
+        self.started = time.time()
+
+    def __len__(self):
+        return len(self.targets)
+
+    @property
+    def done(self):
+        return sum(self.outcomes.values()) == len(self.targets)
+
+    @property
+    def ends(self):
+        return self.action in ('terminate', 'kill')
+
+    @property
+    def verb(self):
+        return ACTIONS[self.action]
+
+    def summary(self):
+        if self.ends:
+            ended = self.outcomes['terminated'] + self.outcomes['killed'] + self.outcomes['gone']
+            parts = [f"{ended}/{len(self.targets)} ended"]
+            if self.outcomes['killed'] and self.action == 'terminate':
+                parts.append(f"{self.outcomes['killed']} needed SIGKILL")
+        else:
+            parts = [f"{self.outcomes['done']}/{len(self.targets)} {self.verb}"]
+            if self.outcomes['gone']:
+                parts.append(f"{self.outcomes['gone']} gone")
+        for outcome in ('denied', 'reused', 'survived', 'failed'):
+            if self.outcomes[outcome]:
+                parts.append(f"{self.outcomes[outcome]} {outcome}")
+        return f"{self.label}: " + ", ".join(parts)
+
+
+class Pending:
+    __slots__ = ('proc', 'pid', 'name', 'batch', 'deadline', 'killed')
+
+    def __init__(self, proc, pid, name, batch, deadline, killed):
+        self.proc = proc
+        self.pid = pid
+        self.name = name
+        self.batch = batch
+        self.deadline = deadline
+        self.killed = killed
+
+
+class ActionExecutor(threading.Thread):
+    """Acts on processes on a background thread, so neither the GUI nor the rules wait on them.
+
+    Batches are queued with submit(). Suspend, resume and priority changes
+    are reported as soon as they are applied. To end a process it gets
+    SIGTERM (or SIGKILL for 'kill'); every process still waiting is then
+    reaped together with
+    one psutil.wait_procs() call per round. A process still alive after
+    `grace` seconds gets SIGKILL, and gets reported as survived if even
+    that does not end it within `kill_grace`. Results and finished batches
+    come back on the `results` queue for the GUI to drain.
+    """
+
+    def __init__(self, grace=3.0, kill_grace=2.0, poll=0.2):
+        super().__init__(name="actions", daemon=True)
+        self.grace = grace
+        self.kill_grace = kill_grace
+        self.poll = poll
+        self.requests = queue.Queue()
+        self.results = queue.Queue()
+        self.pending = []
+        self._stop_event = threading.Event()
+
+    def submit(self, targets, source='user', label=None, action='terminate', value=None):
+        """Queue an action on (pid, create_time, name) targets; returns the Batch"""
+        targets = list(targets)
+        batch = Batch(targets, source, label or f"{action.capitalize()} {len(targets)} process(es)", action, value)
+        self.requests.put(batch)
+        return batch
+
+    def stop(self):
+        self._stop_event.set()
+        self.requests.put(None)
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                batch = self.requests.get(block=not self.pending)
+            except queue.Empty:
+                batch = None
+            while batch is not None:
+                self.start_batch(batch)
+                try:
+                    batch = self.requests.get_nowait()
+                except queue.Empty:
+                    batch = None
+            if self.pending:
+                self.reap()
+
+    def report(self, batch, pid, name, outcome, detail=''):
+        result = ActionResult(batch, pid, name, outcome, detail)
+        batch.outcomes[outcome] += 1
+        if outcome in FAILED:
+            batch.failures.append(result)
+        self.results.put(result)
+        if batch.done:
+            self.results.put(batch)
+
+    def start_batch(self, batch):
+        if not batch.targets:
+            self.results.put(batch)
+            return
+        action = batch.action
+        deadline = time.monotonic() + (self.kill_grace if action == 'kill' else self.grace)
+        for pid, create_time, name in batch.targets:
+            try:
+                proc = psutil.Process(pid)
+                # PIDs get reused; only signal the process the caller saw
+                if create_time and abs(proc.create_time() - create_time) > 1.0:
+                    self.report(batch, pid, name, 'reused')
+                    continue
+                if action == 'terminate':
+                    proc.terminate()
+                elif action == 'kill':
+                    proc.kill()
+                else:
+                    if action == 'suspend':
+                        proc.suspend()
+                    elif action == 'resume':
+                        proc.resume()
+                    else:
+                        proc.nice(batch.value)
+                    self.report(batch, pid, name, 'done')
+                    continue
+            except psutil.NoSuchProcess:
+                self.report(batch, pid, name, 'gone')
+            except psutil.AccessDenied:
+                self.report(batch, pid, name, 'denied', "access denied")
+            except Exception as e:
+                self.report(batch, pid, name, 'failed', str(e))
+            else:
+                self.pending.append(Pending(proc, pid, name, batch, deadline, action == 'kill'))
+
+    def reap(self):
+        """Wait once for every pending process, then escalate or give up on the overdue ones"""
+        now = time.monotonic()
+        timeout = max(0.0, min(self.poll, min(p.deadline for p in self.pending) - now))
+        by_proc = {id(p.proc): p for p in self.pending}
+        gone, alive = psutil.wait_procs([p.proc for p in self.pending], timeout=timeout)
+        for proc in gone:
+            p = by_proc[id(proc)]
+            self.report(p.batch, p.pid, p.name, 'killed' if p.killed else 'terminated')
+
+        now = time.monotonic()
+        self.pending = []
+        for proc in alive:
+            p = by_proc[id(proc)]
+            if is_zombie(proc):
+                # Exited, but its parent has not reaped it yet
+                self.report(p.batch, p.pid, p.name, 'killed' if p.killed else 'terminated')
+            elif now < p.deadline:
+                self.pending.append(p)
+            elif not p.killed:
+                try:
+                    proc.kill()
+                except psutil.NoSuchProcess:
+                    self.report(p.batch, p.pid, p.name, 'terminated')
+                    continue
+                except psutil.AccessDenied:
+                    self.report(p.batch, p.pid, p.name, 'denied', "SIGKILL denied")
+                    continue
+                p.killed = True
+                p.deadline = now + self.kill_grace
+                self.pending.append(p)
+            else:
+                self.report(p.batch, p.pid, p.name, 'survived', "still running after SIGKILL")
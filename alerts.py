@@ -0,0 +1,101 @@
+import time
+from collections import deque
+
+
+SEVERITIES = ('info', 'warning', 'critical')
+
+
+class Alert:
+    """One alert record; repeats of the same alert only bump `count` and `last`"""
+
+    __slots__ = ('id', 'time', 'last', 'severity', 'source', 'pid', 'message', 'count')
+
+    def __init__(self, alert_id, when, severity, source, pid, message):
+        self.id = alert_id
+        self.time = when
+        self.last = when
+        self.severity = severity
+        self.source = source
+        self.pid = pid
+        self.message = message
+        self.count = 1
+
+    @property
+    def key(self):
+        return (self.severity, self.source, self.pid, self.message)
+
+    def format(self):
+        return self.format_text() + self.format_count()
+
+    def format_text(self):
+        """The alert as one line, without its repeat count"""
+        stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.time))
+        message = self.message.replace("\n", " ")
+        return f"[{stamp}] {self.severity.upper():<8} {message}"
+
+    def format_count(self):
+        return f"  ×{self.count}" if self.count > 1 else ""
+
+
+class AlertLog:
+    """Bounded, append-only log of structured alerts.
+
+    Records live in a deque ring, so adding one is O(1) however full the
+    log is. An alert identical to one raised less than `window` seconds
+    ago is folded into it as a repeat count instead of a new record. New
+    records and changed counts are queued for the view, which drains them
+    with take_pending() and only touches those lines.
+    """
+
+    def __init__(self, maxlen=1000, window=30.0):
+        self.records = deque(maxlen=maxlen)
+        self.window = window
+        self.latest = {}  # key: newest Alert with that key still in records
+        self.next_id = 1
+        self.pending = deque(maxlen=maxlen)  # new alerts not yet shown; never more than records holds
+        self.recounted = {}  # id: alert whose count changed since last shown
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def add(self, message, severity='info', source='app', pid=None, when=None):
+        """Record an alert and return it; repeats within the window bump its count"""
+        when = time.time() if when is None else when
+        key = (severity, source, pid, message)
+        alert = self.latest.get(key)
+        if alert is not None and when - alert.last <= self.window:
+            alert.count += 1
+            alert.last = when
+            # Pending alerts are the newest ones and will be drawn with their current count
+            if not self.pending or alert.id < self.pending[0].id:
+                self.recounted[alert.id] = alert
+            return alert
+
+        if len(self.records) == self.records.maxlen:
+            oldest = self.records[0]
+            if self.latest.get(oldest.key) is oldest:
+                del self.latest[oldest.key]
+            # An evicted alert is not drawn any more, even if it was never shown
+            self.recounted.pop(oldest.id, None)
+        alert = Alert(self.next_id, when, severity, source, pid, message)
+        self.next_id += 1
+        self.records.append(alert)
+        self.latest[key] = alert
+        self.pending.append(alert)
+        return alert
+
+    def take_pending(self):
+        """(new alerts, alerts with changed counts) since the last call"""
+        pending, recounted = list(self.pending), list(self.recounted.values())
+        self.pending.clear()
+        self.recounted = {}
+        return pending, recounted
+
+    def clear(self):
+        self.records.clear()
+        self.latest.clear()
+        self.pending.clear()
+        self.recounted = {}
@@ -1,3 +1,10 @@
+import sys
+
+# Headless recording never imports tkinter: python app.py record --interval 0.5 --out session.bin
+if __name__ == "__main__" and sys.argv[1:2] == ['record']:
+    import recorder
+    sys.exit(recorder.main(sys.argv[2:]))
+
 import time
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
@@ -6,10 +13,25 @@ import platform
 from datetime import datetime
 import subprocess
 import os
-from collections import deque
-import csv
-import json
 import threading
+import queue
+import re
+import heapq
+from collections import Counter
+
+from collector import Collector
+from process_table import ProcessTable, format_runtime
+from widgets import VirtualTreeview, LineGraph, Heatmap
+from search import SearchIndex
+from timeseries import MetricStore, RingFile
+from process_history import ProcessHistory
+from snapshots import SnapshotStore, diff as diff_snapshots
+from alerts import AlertLog, SEVERITIES
+import exporter
+from recorder import Recording
+from rules import Rule, RuleEngine
+from actions import ActionExecutor, Batch
+from expressions import ExpressionError, CMDLINE_FIELDS, parse as parse_condition
 
 class TaskManager:
     def __init__(self, root):
@@ -34,17 +56,34 @@ class TaskManager:
         
         self.sort_column = "PID"
         self.sort_reverse = False
+        # Heading: (table column, flip direction). Runtime sorts on create_time.
+        self.sort_keys = {
+            "PID": ('pid', False), "Name": ('name', False), "Status": ('status', False),
+            "CPU%": ('cpu', False), "Memory%": ('memory', False), "MemoryMB": ('rss', False),
+            "Threads": ('threads', False), "User": ('user', False), "Runtime": ('create_time', True)
+        }
         
-        # Historical data for graphs (60 data points = last 2 minutes at 2s intervals)
-        self.cpu_history = deque([0] * 60, maxlen=60)
-        self.memory_history = deque([0] * 60, maxlen=60)
-        self.disk_history = deque([0] * 60, maxlen=60)
-        self.network_history = deque([0] * 60, maxlen=60)
-        
-        # Network and disk tracking
-        self.last_net_io = psutil.net_io_counters()
-        self.last_disk_io = psutil.disk_io_counters()
-        self.last_time = time.time()
+        # Historical data for graphs: raw samples plus 1-minute and 1-hour rollups
+        self.history = MetricStore(('cpu', 'memory', 'disk', 'network'))
+        self.graph_ranges = {"2 minutes": 120, "15 minutes": 900, "1 hour": 3600,
+                             "6 hours": 6 * 3600, "24 hours": 86400, "7 days": 7 * 86400}
+        # Optional on-disk copy of the raw series, e.g. TASKMANAGER_HISTORY_FILE=~/.taskmanager.hist
+        self.history_file = None
+        self.history_path = os.environ.get('TASKMANAGER_HISTORY_FILE')
+        self.history_hours = float(os.environ.get('TASKMANAGER_HISTORY_HOURS', 24))
+        # Recent CPU/RSS/threads/I/O per process; TASKMANAGER_PROCESS_HISTORY caps how many are kept
+        # (0 turns it off, and with it the background table sampling it needs)
+        self.process_series = ProcessHistory(max_processes=int(os.environ.get('TASKMANAGER_PROCESS_HISTORY', 2048)))
+        
+        # Sampling runs on a background thread; the GUI only renders its samples.
+        # TASKMANAGER_BACKEND=psutil|procfs overrides the automatic backend choice.
+        self.collector = Collector(backend=os.environ.get('TASKMANAGER_BACKEND', 'auto'))
+        self.collector.want_io = True  # per-process I/O rates feed process_series
+        self.latest_sample = None
+        self.process_table = ProcessTable.empty()
+        self.watched_table = ProcessTable.empty()  # watched PIDs sampled between full tables
+        self.watched_table_pids = frozenset()  # PIDs that watched_table was asked for
+        self.pending_compare = None  # (info, snapshot, requested at) waiting for a fresh table
         
         # Alert thresholds
         self.cpu_threshold = 80
@@ -53,9 +92,20 @@ class TaskManager:
         # NEW FEATURES: Process monitoring and automation
         self.watched_processes = {}  # PID: {name, alerts, start_time}
         self.process_history = []  # Historical process data
-        self.auto_kill_rules = []  # Rules for automatic process termination
-        self.process_snapshots = []  # Saved system states
-        self.alert_log = []  # Log of all alerts
+        self.auto_kill_rules = RuleEngine()  # Rules for automatic process termination
+        # Terminations run on their own thread; TASKMANAGER_KILL_GRACE is the wait before SIGKILL
+        self.actions = ActionExecutor(grace=float(os.environ.get('TASKMANAGER_KILL_GRACE', 3)))
+        # Saved system states; TASKMANAGER_SNAPSHOTS=file.db keeps them in SQLite across runs
+        try:
+            self.snapshots = SnapshotStore(os.environ.get('TASKMANAGER_SNAPSHOTS'))
+        except Exception as e:
+            print(f"Snapshot database disabled: {e}")
+            self.snapshots = SnapshotStore()
+        self.recorded = SnapshotStore()  # tables opened from recordings; in memory only, never persisted
+        self.alert_log = AlertLog()  # Log of all alerts, repeats folded into counts
+        self.alert_rows = {}  # alert id: shown in alerts_text, oldest first
+        self.alert_line_cap = 500
+        self.alert_flush_job = None
         
         # Create notebook for tabs
         style = ttk.Style()
@@ -102,7 +152,85 @@ class TaskManager:
         except Exception as e:
             print(f"Error creating Alerts tab: {e}")
         
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.notebook.bind('<<NotebookTabChanged>>', self.on_tab_changed)
+        # Toplevel bindings also fire for every child widget; only the window itself matters
+        self.root.bind('<Map>', lambda e: e.widget is self.root and self.update_collector_demand())
+        self.root.bind('<Unmap>', lambda e: e.widget is self.root and self.update_collector_demand())
+        self.open_history_file()
+        self.collector.start()
+        self.actions.start()
         self.update_data()
+    
+    def on_close(self):
+        self.collector.stop()
+        self.actions.stop()
+        if self.history_file is not None:
+            self.history_file.close()
+        self.snapshots.close()
+        self.root.destroy()
+    
+    def open_history_file(self):
+        """Map the history file, if configured, and show what it holds right away"""
+        if not self.history_path:
+            return
+        capacity = max(int(self.history_hours * 3600 / self.collector.schedule.base['system']), 60)
+        try:
+            self.history_file = RingFile(os.path.expanduser(self.history_path), 5, capacity)
+        except (OSError, ValueError) as e:
+            print(f"History file disabled: {e}")
+            return
+        timestamps, columns = self.history_file.columns(time.time() - self.history_hours * 3600)
+        self.history.extend(timestamps, columns)
+        if timestamps:
+            # Open on the shortest range that shows everything restored
+            span = timestamps[-1] - timestamps[0]
+            for label, seconds in self.graph_ranges.items():
+                if seconds >= span:
+                    self.graph_range_var.set(label)
+                    break
+    
+    def on_tab_changed(self, event=None):
+        # Hidden graphs are not redrawn, so catch up when the tab comes back
+        if self.current_tab() == 'Performance':
+            self.draw_performance_graphs()
+        self.update_collector_demand()
+    
+    def current_tab(self):
+        try:
+            return self.notebook.tab(self.notebook.select(), 'text')
+        except tk.TclError:
+            return None
+    
+    def update_collector_demand(self):
+        """Tell the collector what the GUI currently needs sampled"""
+        schedule = self.collector.schedule
+        processes_visible = self.current_tab() == 'Processes'
+        iconified = self.root.state() == 'iconic'
+        watched = frozenset(self.watched_processes)
+        rules_active = self.auto_kill_rules.active
+        history_active = self.process_series.capacity > 0
+        # Command lines are only read while a search or a rule condition uses them
+        want_cmdline = self.search_cmdline_var.get() or bool(self.auto_kill_rules.fields & CMDLINE_FIELDS)
+        if want_cmdline != self.collector.want_cmdline:
+            self.collector.want_cmdline = want_cmdline
+            self.collector.request_refresh()
+        
+        became_visible = processes_visible and not iconified and \
+            not (schedule.processes_visible and not schedule.iconified)
+        changed = (processes_visible, iconified, watched, rules_active, history_active) != \
+            (schedule.processes_visible, schedule.iconified, schedule.watched, schedule.rules_active,
+             schedule.history_active)
+        
+        schedule.processes_visible = processes_visible
+        schedule.iconified = iconified
+        schedule.watched = watched
+        schedule.rules_active = rules_active
+        schedule.history_active = history_active
+        if became_visible:
+            self.collector.request_refresh()
+        elif changed:
+            self.collector.wake()
         
     def create_processes_tab(self):
         processes_frame = tk.Frame(self.notebook, bg=self.bg_dark)
@@ -168,11 +296,17 @@ class TaskManager:
         self.tree.bind('<Delete>', lambda e: self.end_task())
         
         self.selected_process = None
+        self.tree_rows = {}  # iid: (values, tags) currently shown in self.tree, in display order
+        
+        # Above this many processes only the visible rows are materialized
+        self.virtual_threshold = 5000
+        self.virtual_list = VirtualTreeview(self.tree, vsb)
         
         # Create context menu with NEW options
         self.context_menu = tk.Menu(self.tree, tearoff=0, bg=self.bg_darker, fg=self.fg_light,
                                     activebackground=self.accent, activeforeground='white')
         self.context_menu.add_command(label="End Task", command=self.end_task)
+        self.context_menu.add_command(label="End Process Tree", command=lambda: self.end_task(include_children=True))
         self.context_menu.add_command(label="Show Details", command=self.show_details)
         self.context_menu.add_command(label="Open File Location", command=self.open_file_location)
         self.context_menu.add_separator()
@@ -181,7 +315,7 @@ class TaskManager:
         self.context_menu.add_command(label="Resume Process", command=self.resume_process)
         self.context_menu.add_command(label="Change Priority", command=self.change_priority)
         self.context_menu.add_separator()
-        self.context_menu.add_command(label="Refresh List", command=self.refresh_data)
+        self.context_menu.add_command(label="Refresh List", command=self.collector.request_refresh)
         
         # Color coding tags
         self.tree.tag_configure('critical', background=self.critical_bg, foreground=self.fg_light)
@@ -210,6 +344,12 @@ class TaskManager:
                                       bg=self.bg_dark, fg=self.fg_dim, font=('Arial', 9))
         self.selected_label.pack(side=tk.LEFT, padx=10)
         
+        # Actions also apply to every descendant of the selected processes
+        self.include_children_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(button_frame, text="Include children", variable=self.include_children_var,
+                       bg=self.bg_dark, fg=self.fg_light, selectcolor=self.bg_darker, activebackground=self.bg_dark,
+                       activeforeground=self.accent, font=('Arial', 9)).pack(side=tk.LEFT, padx=5)
+        
         end_btn = tk.Button(button_frame, text="End Task", command=self.end_task, bg=self.danger, 
                            activebackground='#b02a37', **btn_style)
         end_btn.pack(side=tk.LEFT, padx=5)
@@ -248,12 +388,38 @@ class TaskManager:
         
         tk.Label(search_frame, text="Search:", bg=self.bg_dark, fg=self.fg_light, font=('Arial', 10)).pack(side=tk.LEFT, padx=5)
         
+        self.search_index = SearchIndex()
+        self.search_job = None
         self.search_var = tk.StringVar()
         self.search_var.trace('w', self.filter_processes)
-        search_entry = tk.Entry(search_frame, textvariable=self.search_var, width=20, font=('Arial', 10),
-                               bg=self.bg_darker, fg=self.fg_light, insertbackground=self.fg_light, 
-                               relief=tk.FLAT, borderwidth=2)
-        search_entry.pack(side=tk.LEFT)
+        self.search_entry = tk.Entry(search_frame, textvariable=self.search_var, width=20, font=('Arial', 10),
+                                     bg=self.bg_darker, fg=self.fg_light, insertbackground=self.fg_light, 
+                                     relief=tk.FLAT, borderwidth=2)
+        self.search_entry.pack(side=tk.LEFT)
+        
+        check_style = {'bg': self.bg_dark, 'fg': self.fg_light, 'selectcolor': self.bg_darker,
+                       'activebackground': self.bg_dark, 'activeforeground': self.accent, 'font': ('Arial', 9)}
+        self.search_more_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(search_frame, text="PID/User", variable=self.search_more_var,
+                      command=self.filter_processes, **check_style).pack(side=tk.LEFT, padx=2)
+        self.search_cmdline_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(search_frame, text="Cmdline", variable=self.search_cmdline_var,
+                      command=self.toggle_cmdline_search, **check_style).pack(side=tk.LEFT, padx=2)
+        self.search_regex_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(search_frame, text="Regex", variable=self.search_regex_var,
+                      command=self.filter_processes, **check_style).pack(side=tk.LEFT, padx=2)
+        
+        self.top_k_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(search_frame, text="Top", variable=self.top_k_var,
+                      command=self.refresh_data, **check_style).pack(side=tk.LEFT, padx=(5, 0))
+        self.top_k_count = tk.IntVar(value=50)
+        tk.Spinbox(search_frame, from_=5, to=1000, increment=5, width=4, textvariable=self.top_k_count,
+                   command=self.refresh_data, bg=self.bg_darker, fg=self.fg_light,
+                   buttonbackground=self.bg_darkest, relief=tk.FLAT).pack(side=tk.LEFT)
+        
+        self.virtual_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(search_frame, text="Virtual list", variable=self.virtual_var,
+                      command=self.refresh_data, **check_style).pack(side=tk.LEFT, padx=5)
         
     def create_performance_tab(self):
         perf_frame = tk.Frame(self.notebook, bg=self.bg_dark)
@@ -262,6 +428,15 @@ class TaskManager:
         self.perf_canvas = tk.Canvas(perf_frame, bg=self.bg_darker, highlightthickness=0)
         self.perf_canvas.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
+        # Graph items are created once; resizing re-lays them out, ticks only move the lines
+        graph_style = {'bg': self.bg_darkest, 'fg': self.fg_light, 'border': self.bg_darker}
+        self.cpu_graph = LineGraph(self.perf_canvas, "CPU Usage (%)", "#e74c3c", **graph_style)
+        self.memory_graph = LineGraph(self.perf_canvas, "Memory Usage (%)", "#3498db", **graph_style)
+        self.disk_graph = LineGraph(self.perf_canvas, "Disk Activity (MB/s)", "#2ecc71", **graph_style)
+        self.network_graph = LineGraph(self.perf_canvas, "Network Activity (KB/s)", "#f39c12", **graph_style)
+        self.core_heatmap = Heatmap(self.perf_canvas, **graph_style)
+        self.perf_canvas.bind('<Configure>', self.layout_performance_graphs)
+        
         perf_info_frame = tk.Frame(perf_frame, bg=self.bg_darkest, pady=10)
         perf_info_frame.pack(fill=tk.X)
         
@@ -277,6 +452,20 @@ class TaskManager:
         self.perf_net_label = tk.Label(perf_info_frame, text="Network: ↑0 KB/s ↓0 KB/s", bg=self.bg_darkest, fg=self.fg_light, font=('Arial', 11, 'bold'))
         self.perf_net_label.pack(side=tk.LEFT, padx=20)
         
+        self.graph_range_var = tk.StringVar(value="2 minutes")
+        range_box = ttk.Combobox(perf_info_frame, textvariable=self.graph_range_var, state='readonly',
+                                 values=list(self.graph_ranges), width=12)
+        range_box.pack(side=tk.RIGHT, padx=(0, 20))
+        range_box.bind('<<ComboboxSelected>>', lambda e: self.draw_performance_graphs())
+        tk.Label(perf_info_frame, text="Range:", bg=self.bg_darkest, fg=self.fg_light,
+                font=('Arial', 10)).pack(side=tk.RIGHT)
+        tk.Button(perf_info_frame, text="Export", command=self.export_history, font=('Arial', 9, 'bold'),
+                 bg=self.accent, fg='white', relief=tk.FLAT, cursor='hand2').pack(side=tk.RIGHT, padx=10)
+        
+        self.perf_devices_label = tk.Label(perf_frame, text="", bg=self.bg_darkest, fg=self.fg_light,
+                                           font=('Consolas', 9), anchor='w', justify=tk.LEFT)
+        self.perf_devices_label.pack(fill=tk.X)
+        
     def create_system_info_tab(self):
         info_frame = tk.Frame(self.notebook, bg=self.bg_dark)
         self.notebook.add(info_frame, text='System Info')
@@ -386,7 +575,7 @@ class TaskManager:
         rule_frame = tk.Frame(auto_frame, bg=self.bg_darker, pady=15)
         rule_frame.pack(fill=tk.X, padx=20, pady=10)
         
-        tk.Label(rule_frame, text="Process Name:", bg=self.bg_darker, fg=self.fg_light).grid(row=0, column=0, padx=5, pady=5)
+        tk.Label(rule_frame, text="Process Name (glob or /regex/):", bg=self.bg_darker, fg=self.fg_light).grid(row=0, column=0, padx=5, pady=5)
         self.auto_name_entry = tk.Entry(rule_frame, width=30, bg=self.bg_darkest, fg=self.fg_light)
         self.auto_name_entry.grid(row=0, column=1, padx=5, pady=5)
         
@@ -405,9 +594,19 @@ class TaskManager:
         self.auto_duration_entry.insert(0, "10")
         self.auto_duration_entry.grid(row=1, column=3, padx=5, pady=5)
         
+        tk.Label(rule_frame, text="Condition (optional):", bg=self.bg_darker, fg=self.fg_light).grid(row=2, column=0, padx=5, pady=5)
+        self.auto_condition_entry = tk.Entry(rule_frame, width=60, bg=self.bg_darkest, fg=self.fg_light)
+        self.auto_condition_entry.grid(row=2, column=1, columnspan=3, padx=5, pady=5, sticky='we')
+        self.auto_condition_entry.bind('<KeyRelease>', self.validate_auto_condition)
+        
+        self.auto_condition_label = tk.Label(rule_frame, bg=self.bg_darker, fg=self.fg_light, anchor='w',
+                                             text='e.g. user == "ci" and rss_mb > 4096 and runtime > 10m; '
+                                                  'replaces the thresholds')
+        self.auto_condition_label.grid(row=3, column=1, columnspan=3, padx=5, sticky='w')
+        
         tk.Button(rule_frame, text="Add Rule", font=('Arial', 10, 'bold'), width=15, bg=self.success,
                  fg='white', relief=tk.FLAT, cursor='hand2',
-                 command=self.add_auto_kill_rule).grid(row=2, column=0, columnspan=4, pady=10)
+                 command=self.add_auto_kill_rule).grid(row=4, column=0, columnspan=4, pady=10)
         
         # Rules list
         list_frame = tk.Frame(auto_frame, bg=self.bg_dark)
@@ -416,7 +615,7 @@ class TaskManager:
         vsb = ttk.Scrollbar(list_frame, orient="vertical")
         vsb.pack(side=tk.RIGHT, fill=tk.Y)
         
-        columns = ("Process", "CPU%", "Memory%", "Duration", "Status", "Triggers")
+        columns = ("Process", "CPU%", "Memory%", "Condition", "Duration", "Status", "Triggers")
         self.auto_tree = ttk.Treeview(list_frame, columns=columns, show='headings', yscrollcommand=vsb.set)
         vsb.config(command=self.auto_tree.yview)
         
@@ -435,6 +634,14 @@ class TaskManager:
         tk.Button(btn_frame, text="Clear All Rules", font=('Arial', 10, 'bold'), width=15, bg=self.accent,
                  fg='white', relief=tk.FLAT, cursor='hand2',
                  command=self.clear_auto_rules).pack(side=tk.LEFT, padx=10)
+        
+        tk.Button(btn_frame, text="Save Rules", font=('Arial', 10, 'bold'), width=15, bg=self.accent,
+                 fg='white', relief=tk.FLAT, cursor='hand2',
+                 command=self.save_auto_rules).pack(side=tk.LEFT, padx=10)
+        
+        tk.Button(btn_frame, text="Load Rules", font=('Arial', 10, 'bold'), width=15, bg=self.accent,
+                 fg='white', relief=tk.FLAT, cursor='hand2',
+                 command=self.load_auto_rules).pack(side=tk.LEFT, padx=10)
     
     # NEW FEATURE: History Tab
     def create_history_tab(self):
@@ -470,9 +677,20 @@ class TaskManager:
                  fg='white', relief=tk.FLAT, cursor='hand2',
                  command=self.export_snapshot).pack(side=tk.LEFT, padx=10)
         
+        tk.Button(btn_frame, text="Compare", font=('Arial', 10, 'bold'), width=15, bg=self.accent,
+                 fg='white', relief=tk.FLAT, cursor='hand2',
+                 command=self.compare_snapshots).pack(side=tk.LEFT, padx=10)
+        
+        tk.Button(btn_frame, text="Open Recording", font=('Arial', 10, 'bold'), width=15, bg=self.accent,
+                 fg='white', relief=tk.FLAT, cursor='hand2',
+                 command=self.open_recording).pack(side=tk.LEFT, padx=10)
+        
         tk.Button(btn_frame, text="Clear History", font=('Arial', 10, 'bold'), width=15, bg=self.danger,
                  fg='white', relief=tk.FLAT, cursor='hand2',
                  command=self.clear_history).pack(side=tk.LEFT, padx=10)
+        
+        # Snapshots kept in a database from earlier runs
+        self.update_history_display()
     
     # NEW FEATURE: Alerts Tab
     def create_alerts_tab(self):
@@ -495,9 +713,24 @@ class TaskManager:
         self.alerts_text.pack(fill=tk.BOTH, expand=True)
         scrollbar.config(command=self.alerts_text.yview)
         
+        # Filtering only toggles elide on a severity tag; the text is never rebuilt
+        severity_colors = {'info': self.fg_light, 'warning': self.warning, 'critical': self.danger}
+        for severity in SEVERITIES:
+            self.alerts_text.tag_configure(f'sev_{severity}', foreground=severity_colors[severity])
+        
         btn_frame = tk.Frame(alerts_frame, bg=self.bg_dark, pady=10)
         btn_frame.pack(fill=tk.X)
         
+        self.alert_filter_vars = {}
+        for severity in reversed(SEVERITIES):
+            var = tk.BooleanVar(value=True)
+            self.alert_filter_vars[severity] = var
+            tk.Checkbutton(btn_frame, text=severity.capitalize(), variable=var,
+                          command=lambda sev=severity: self.filter_alerts(sev),
+                          bg=self.bg_dark, fg=self.fg_light, selectcolor=self.bg_darker,
+                          activebackground=self.bg_dark, activeforeground=self.accent,
+                          font=('Arial', 9)).pack(side=tk.RIGHT, padx=5)
+        
         tk.Button(btn_frame, text="Clear Alerts", font=('Arial', 10, 'bold'), width=15, bg=self.danger,
                  fg='white', relief=tk.FLAT, cursor='hand2',
                  command=self.clear_alerts).pack(side=tk.LEFT, padx=10)
@@ -528,8 +761,7 @@ class TaskManager:
             messagebox.showinfo("Info", f"Process '{name}' is already being watched")
             return
         
-        try:
-            proc = psutil.Process(pid)
+        if pid in self.process_table:
             self.watched_processes[pid] = {
                 'name': name,
                 'start_time': datetime.now(),
@@ -540,7 +772,7 @@ class TaskManager:
             self.add_alert(f"Started watching process: {name} (PID: {pid})")
             messagebox.showinfo("Success", f"Now watching process: {name}")
             self.update_monitor_display()
-        except psutil.NoSuchProcess:
+        else:
             messagebox.showerror("Error", "Process no longer exists")
     
     def stop_watching_selected(self):
@@ -568,73 +800,42 @@ class TaskManager:
             self.add_alert("Cleared all watched processes")
     
     def suspend_process(self):
-        """Suspend a process"""
+        """Suspend the selected processes"""
         self.root.update_idletasks()
         
-        if self.selected_process:
-            pid = self.selected_process['pid']
-            name = self.selected_process['name']
-        else:
-            selected = self.tree.selection()
-            if not selected:
-                messagebox.showwarning("Warning", "Select a process to suspend")
-                return
-            values = self.tree.item(selected[0])['values']
-            pid = int(values[0])
-            name = values[1]
+        rows = self.selected_rows()
+        if not rows:
+            messagebox.showwarning("Warning", "Select a process to suspend")
+            return
         
-        if messagebox.askyesno("Confirm", f"Suspend process '{name}'?\n\nThis will pause execution."):
-            try:
-                proc = psutil.Process(pid)
-                proc.suspend()
-                self.add_alert(f"Suspended process: {name} (PID: {pid})")
-                messagebox.showinfo("Success", f"Process '{name}' suspended")
-            except psutil.AccessDenied:
-                messagebox.showerror("Error", "Access denied. Try running as administrator.")
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed: {str(e)}")
+        if self.confirm_rows("Suspend", rows, "\n\nThis will pause execution."):
+            self.actions.submit(self.action_targets(rows), 'user', f"Suspend {len(rows)} process(es)", 'suspend')
     
     def resume_process(self):
-        """Resume a suspended process"""
+        """Resume the selected suspended processes"""
         self.root.update_idletasks()
         
-        if self.selected_process:
-            pid = self.selected_process['pid']
-            name = self.selected_process['name']
-        else:
-            selected = self.tree.selection()
-            if not selected:
-                messagebox.showwarning("Warning", "Select a process to resume")
-                return
-            values = self.tree.item(selected[0])['values']
-            pid = int(values[0])
-            name = values[1]
+        rows = self.selected_rows()
+        if not rows:
+            messagebox.showwarning("Warning", "Select a process to resume")
+            return
         
-        try:
-            proc = psutil.Process(pid)
-            proc.resume()
-            self.add_alert(f"Resumed process: {name} (PID: {pid})")
-            messagebox.showinfo("Success", f"Process '{name}' resumed")
-        except psutil.AccessDenied:
-            messagebox.showerror("Error", "Access denied. Try running as administrator.")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed: {str(e)}")
+        # Resuming is harmless, so only a bulk resume asks first
+        if len(rows) == 1 or self.confirm_rows("Resume", rows):
+            # Parents last, so a resumed parent does not find its children still stopped
+            rows.reverse()
+            self.actions.submit(self.action_targets(rows), 'user', f"Resume {len(rows)} process(es)", 'resume')
     
     def change_priority(self):
-        """Change process priority"""
+        """Change the priority of the selected processes"""
         self.root.update_idletasks()
         
-        if self.selected_process:
-            pid = self.selected_process['pid']
-            name = self.selected_process['name']
-        else:
-            selected = self.tree.selection()
-            if not selected:
-                messagebox.showwarning("Warning", "Select a process")
-                return
-            values = self.tree.item(selected[0])['values']
-            pid = int(values[0])
-            name = values[1]
+        rows = self.selected_rows()
+        if not rows:
+            messagebox.showwarning("Warning", "Select a process")
+            return
+        targets = self.action_targets(rows)
+        name = targets[0][2] if len(targets) == 1 else f"{len(targets)} processes"
         
         # Create priority selection dialog
         priority_window = tk.Toplevel(self.root)
@@ -663,81 +864,74 @@ class TaskManager:
                           font=('Arial', 10)).pack(anchor=tk.W, padx=30, pady=3)
         
         def apply_priority():
-            try:
-                proc = psutil.Process(pid)
-                priority_value = priorities[selected_priority.get()]
-                if platform.system() == 'Windows':
-                    proc.nice(priority_value)
-                else:
-                    import os
-                    os.setpriority(os.PRIO_PROCESS, pid, priority_value)
-                self.add_alert(f"Changed priority of {name} to {selected_priority.get()}")
-                messagebox.showinfo("Success", f"Priority changed to {selected_priority.get()}")
-                priority_window.destroy()
-            except psutil.AccessDenied:
-                messagebox.showerror("Error", "Access denied. Try running as administrator.")
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed: {str(e)}")
+            # Process.nice() is the priority class on Windows and setpriority() elsewhere
+            level = selected_priority.get()
+            self.actions.submit(targets, 'user', f"Set priority {level} on {len(targets)} process(es)",
+                                'priority', priorities[level])
+            priority_window.destroy()
         
         tk.Button(priority_window, text="Apply", command=apply_priority, font=('Arial', 10, 'bold'),
                  bg=self.accent, fg='white', relief=tk.FLAT, width=12).pack(pady=10)
     
     def take_snapshot(self):
         """Take a snapshot of current system state"""
-        snapshot = {
-            'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            'processes': [],
-            'cpu': psutil.cpu_percent(),
-            'memory': psutil.virtual_memory().percent,
-            'description': f"Snapshot at {datetime.now().strftime('%H:%M:%S')}"
-        }
-        
-        for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent']):
-            try:
-                snapshot['processes'].append({
-                    'pid': proc.info['pid'],
-                    'name': proc.info['name'],
-                    'cpu': proc.info['cpu_percent'] or 0,
-                    'memory': proc.info['memory_percent'] or 0
-                })
-            except:
-                pass
+        if self.latest_sample is None:
+            messagebox.showwarning("Warning", "No data collected yet")
+            return
         
-        self.process_snapshots.append(snapshot)
-        self.update_history_display()
-        self.add_alert(f"Snapshot taken: {len(snapshot['processes'])} processes captured")
-        messagebox.showinfo("Success", f"Snapshot saved with {len(snapshot['processes'])} processes")
+        info = self.snapshots.add(self.process_table, self.latest_sample.cpu, self.latest_sample.memory.percent,
+                                  f"Snapshot at {datetime.now().strftime('%H:%M:%S')}")
+        self.insert_snapshot_row(info)
+        self.add_alert(f"Snapshot taken: {info.count} processes captured")
+        messagebox.showinfo("Success", f"Snapshot saved with {info.count} processes")
     
     def add_auto_kill_rule(self):
         """Add automatic process termination rule"""
         name = self.auto_name_entry.get().strip()
+        condition = self.auto_condition_entry.get().strip()
+        if not name and condition:
+            name = '*'  # the condition alone picks the processes
         if not name:
             messagebox.showwarning("Warning", "Enter a process name")
             return
         
         try:
-            cpu_threshold = float(self.auto_cpu_entry.get())
-            mem_threshold = float(self.auto_mem_entry.get())
+            cpu_threshold = mem_threshold = None
+            if not condition:
+                cpu_threshold = float(self.auto_cpu_entry.get())
+                mem_threshold = float(self.auto_mem_entry.get())
             duration = int(self.auto_duration_entry.get())
         except ValueError:
             messagebox.showerror("Error", "Invalid threshold values")
             return
         
-        rule = {
-            'name': name,
-            'cpu_threshold': cpu_threshold,
-            'mem_threshold': mem_threshold,
-            'duration': duration,
-            'triggers': 0,
-            'active': True,
-            'last_trigger': None
-        }
+        try:
+            rule = Rule(name, cpu_threshold, mem_threshold, duration, condition=condition)
+        except re.error as e:
+            messagebox.showerror("Error", f"Invalid regular expression: {e}")
+            return
+        except ExpressionError as e:
+            messagebox.showerror("Error", f"Invalid condition: {e}")
+            return
         
-        self.auto_kill_rules.append(rule)
+        self.auto_kill_rules.add(rule)
         self.update_auto_display()
-        self.add_alert(f"Auto-kill rule added: {name} (CPU>{cpu_threshold}% OR Mem>{mem_threshold}% for {duration}s)")
+        self.add_alert(f"Auto-kill rule added: {rule.describe()}")
         messagebox.showinfo("Success", f"Auto-kill rule added for '{name}'")
     
+    def validate_auto_condition(self, event=None):
+        """Check the condition as it is typed"""
+        condition = self.auto_condition_entry.get().strip()
+        if not condition:
+            self.auto_condition_label.config(text="Uses the CPU and memory thresholds", fg=self.fg_light)
+            return
+        try:
+            parse_condition(condition)
+        except ExpressionError as e:
+            self.auto_condition_label.config(text=f"✗ {e}", fg=self.danger)
+        else:
+            self.auto_condition_label.config(text="✓ Valid condition", fg=self.success)
+    
     def remove_auto_rule(self):
         """Remove selected auto-kill rule"""
         selected = self.auto_tree.selection()
@@ -748,7 +942,7 @@ class TaskManager:
         values = self.auto_tree.item(selected[0])['values']
         process_name = values[0]
         
-        self.auto_kill_rules = [r for r in self.auto_kill_rules if r['name'] != process_name]
+        self.auto_kill_rules.remove(str(process_name))
         self.update_auto_display()
         self.add_alert(f"Removed auto-kill rule for: {process_name}")
     
@@ -759,126 +953,220 @@ class TaskManager:
             self.update_auto_display()
             self.add_alert("Cleared all auto-kill rules")
     
-    def add_alert(self, message):
-        """Add alert to alert log"""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        alert_entry = f"[{timestamp}] {message}"
-        self.alert_log.append(alert_entry)
-        
-        # Keep only last 1000 alerts
-        if len(self.alert_log) > 1000:
-            self.alert_log = self.alert_log[-1000:]
-        
-        self.update_alerts_display()
+    def save_auto_rules(self):
+        """Save rules as JSON, e.g. for `app.py record --rules`"""
+        filename = filedialog.asksaveasfilename(defaultextension=".json",
+                                                filetypes=[("JSON files", "*.json"), ("All files", "*.*")])
+        if filename:
+            try:
+                self.auto_kill_rules.save(filename)
+            except OSError as e:
+                messagebox.showerror("Error", f"Save failed: {e}")
+    
+    def load_auto_rules(self):
+        filename = filedialog.askopenfilename(filetypes=[("JSON files", "*.json"), ("All files", "*.*")])
+        if not filename:
+            return
+        try:
+            self.auto_kill_rules = RuleEngine.load(filename)
+        except (OSError, ValueError, KeyError, re.error) as e:  # ExpressionError is a ValueError
+            messagebox.showerror("Error", f"Could not load rules: {e}")
+            return
+        self.update_auto_display()
+        self.add_alert(f"Loaded {len(self.auto_kill_rules)} auto-kill rules from {filename}")
+    
+    def add_alert(self, message, severity='info', source='app', pid=None):
+        """Add alert to alert log; the Alerts tab catches up once the current event is handled"""
+        self.alert_log.add(message, severity, source, pid)
+        if self.alert_flush_job is None:
+            self.alert_flush_job = self.root.after_idle(self.update_alerts_display)
     
     def update_monitor_display(self):
         """Update the watched processes display"""
         for item in self.monitor_tree.get_children():
             self.monitor_tree.delete(item)
         
+        if not self.watched_processes or self.latest_sample is None:
+            return
+        
+        # Watched PIDs are sampled on their own between full tables; use the newer
+        newer_watch = self.watched_table.timestamp > self.process_table.timestamp
+        
         for pid, data in list(self.watched_processes.items()):
-            try:
-                proc = psutil.Process(pid)
-                cpu = proc.cpu_percent()
-                mem = proc.memory_percent()
-                runtime = datetime.now() - data['start_time']
-                runtime_str = f"{runtime.seconds//3600}h {(runtime.seconds//60)%60}m"
-                
-                # Update max values
-                data['max_cpu'] = max(data['max_cpu'], cpu)
-                data['max_memory'] = max(data['max_memory'], mem)
-                
-                self.monitor_tree.insert('', tk.END, values=(
-                    pid, data['name'], f"{cpu:.1f}%", f"{mem:.2f}%",
-                    runtime_str, proc.status(), data['alerts']
-                ))
-            except psutil.NoSuchProcess:
+            if newer_watch and pid in self.watched_table_pids:
+                proc = self.watched_table.get(pid)
+            else:
+                proc = self.process_table.get(pid)
+            if proc is None:
                 # Process ended, remove from watch list
-                self.add_alert(f"Watched process ended: {data['name']} (PID: {pid})")
+                self.add_alert(f"Watched process ended: {data['name']} (PID: {pid})", 'warning', 'monitor', pid)
                 del self.watched_processes[pid]
+                continue
+            
+            cpu = proc['cpu']
+            mem = proc['memory']
+            runtime = datetime.now() - data['start_time']
+            runtime_str = f"{runtime.seconds//3600}h {(runtime.seconds//60)%60}m"
+            
+            # Update max values
+            data['max_cpu'] = max(data['max_cpu'], cpu)
+            data['max_memory'] = max(data['max_memory'], mem)
+            
+            self.monitor_tree.insert('', tk.END, values=(
+                pid, data['name'], f"{cpu:.1f}%", f"{mem:.2f}%",
+                runtime_str, proc['status'], data['alerts']
+            ))
     
     def update_auto_display(self):
         """Update auto-kill rules display"""
         for item in self.auto_tree.get_children():
             self.auto_tree.delete(item)
         
+        breaching = self.auto_kill_rules.breaching()
         for rule in self.auto_kill_rules:
-            status = "Active" if rule['active'] else "Inactive"
+            status = "Active" if rule.active else "Inactive"
+            if breaching.get(rule):
+                status = f"Breaching ({breaching[rule]})"
+            if rule.condition:
+                cpu_text = mem_text = "-"
+            else:
+                cpu_text, mem_text = f"{rule.cpu_threshold}%", f"{rule.mem_threshold}%"
             self.auto_tree.insert('', tk.END, values=(
-                rule['name'], f"{rule['cpu_threshold']}%", f"{rule['mem_threshold']}%",
-                f"{rule['duration']}s", status, rule['triggers']
+                rule.name, cpu_text, mem_text, rule.condition or "-",
+                f"{rule.duration}s", status, rule.triggers
             ))
+        
+        self.update_collector_demand()
     
     def update_history_display(self):
         """Update history/snapshots display"""
-        for item in self.history_tree.get_children():
-            self.history_tree.delete(item)
-        
-        for snapshot in self.process_snapshots[-50:]:  # Show last 50 snapshots
-            self.history_tree.insert('', tk.END, values=(
-                snapshot['timestamp'],
-                len(snapshot['processes']),
-                f"{snapshot['cpu']:.1f}%",
-                f"{snapshot['memory']:.1f}%",
-                snapshot['description']
-            ))
+        self.history_tree.delete(*self.history_tree.get_children())
+        
+        # Rows only carry the small index entries; process data is decoded on demand
+        rows = heapq.merge(((info, '') for info in self.snapshots), ((info, 'r') for info in self.recorded),
+                           key=lambda row: row[0].timestamp)
+        for info, prefix in rows:
+            self.insert_snapshot_row(info, prefix)
+    
+    def insert_snapshot_row(self, info, prefix=''):
+        self.history_tree.insert('', tk.END, iid=f"{prefix}{info.id}", values=(
+            datetime.fromtimestamp(info.timestamp).strftime("%Y-%m-%d %H:%M:%S"),
+            info.count,
+            f"{info.cpu:.1f}%",
+            f"{info.memory:.1f}%",
+            info.description
+        ))
+    
+    def snapshot_source(self, iid):
+        """(store, snapshot ID) for a History tab row; recorded tables have 'r'-prefixed rows"""
+        if iid.startswith('r'):
+            return self.recorded, int(iid[1:])
+        return self.snapshots, int(iid)
+    
+    def selected_snapshot(self, action):
+        """Decoded snapshot for the History tab selection, or None after telling the user"""
+        selected = self.history_tree.selection()
+        if not selected:
+            messagebox.showwarning("Warning", f"Select a snapshot to {action}")
+            return None
+        store, snapshot_id = self.snapshot_source(selected[0])
+        snapshot = store.get(snapshot_id)
+        if snapshot is None:
+            messagebox.showerror("Error", "Snapshot not found")
+        return snapshot
     
     def update_alerts_display(self):
-        """Update alerts text display"""
-        self.alerts_text.delete(1.0, tk.END)
+        """Append new alerts and refresh changed repeat counts; older lines are left alone"""
+        self.alert_flush_job = None
+        new, recounted = self.alert_log.take_pending()
+        text = self.alerts_text
+        at_bottom = text.yview()[1] >= 0.999
+        
+        for alert in recounted:
+            if alert.id in self.alert_rows:
+                mark = f'alert{alert.id}'
+                text.delete(mark, f'{mark} lineend')
+                text.insert(mark, alert.format_count(), (f'sev_{alert.severity}',))
+        
+        for alert in new[-self.alert_line_cap:]:
+            tags = (f'sev_{alert.severity}',)
+            text.insert(tk.END, alert.format_text(), tags)
+            # The repeat count goes after this mark so it can be rewritten in place
+            text.mark_set(f'alert{alert.id}', 'end-1c')
+            text.mark_gravity(f'alert{alert.id}', tk.LEFT)
+            text.insert(tk.END, alert.format_count() + "\n", tags)
+            self.alert_rows[alert.id] = True
+        
+        excess = len(self.alert_rows) - self.alert_line_cap
+        if excess > 0:
+            text.delete('1.0', f'{excess + 1}.0')
+            for _ in range(excess):
+                old = next(iter(self.alert_rows))
+                del self.alert_rows[old]
+                text.mark_unset(f'alert{old}')
+        
+        if new and at_bottom:
+            text.see(tk.END)
+    
+    def filter_alerts(self, severity):
+        self.alerts_text.tag_configure(f'sev_{severity}', elide=not self.alert_filter_vars[severity].get())
+    
+    def clear_alerts(self):
+        """Clear all alerts"""
+        if len(self.alert_log) and messagebox.askyesno("Confirm", "Clear all alerts?"):
+            self.alert_log.clear()
+            for alert_id in self.alert_rows:
+                self.alerts_text.mark_unset(f'alert{alert_id}')
+            self.alert_rows.clear()
+            self.alerts_text.delete('1.0', tk.END)
+    
+    def export_alerts(self):
+        """Export alert log"""
+        if not len(self.alert_log):
+            messagebox.showinfo("Info", "No alerts to export")
+            return
         
-        # Show last 100 alerts
-        for alert in self.alert_log[-100:]:
-            self.alerts_text.insert(tk.END, alert + "\n")
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".txt",
+            filetypes=[("Text files", "*.txt"), ("All files", "*.*")],
+            initialfile=f"alerts_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
+        )
         
-        self.alerts_text.see(tk.END)
+        if filename:
+            try:
+                with open(filename, 'w', encoding='utf-8') as f:
+                    f.write("\n".join(alert.format() for alert in self.alert_log))
+                messagebox.showinfo("Success", f"Alerts exported to {filename}")
+            except Exception as e:
+                messagebox.showerror("Error", f"Export failed: {str(e)}")
     
     def check_auto_kill_rules(self):
-        """Check and execute auto-kill rules"""
-        for rule in self.auto_kill_rules:
-            if not rule['active']:
-                continue
-            
-            for proc in psutil.process_iter(['name', 'cpu_percent', 'memory_percent']):
-                try:
-                    if proc.info['name'].lower() == rule['name'].lower():
-                        cpu = proc.info['cpu_percent'] or 0
-                        mem = proc.info['memory_percent'] or 0
-                        
-                        if cpu > rule['cpu_threshold'] or mem > rule['mem_threshold']:
-                            # Would need to track duration properly - simplified here
-                            rule['triggers'] += 1
-                            self.add_alert(f"⚠ Auto-kill triggered: {rule['name']} (CPU:{cpu:.1f}% MEM:{mem:.1f}%)")
-                            
-                            # Kill the process
-                            try:
-                                proc.terminate()
-                                self.add_alert(f"✓ Auto-killed process: {rule['name']}")
-                            except:
-                                pass
-                except:
-                    pass
+        """Check and execute auto-kill rules against the latest sample"""
+        # One pass over the table for all rules; a rule fires once its breach has lasted its duration
+        table = self.process_table
+        targets = {}
+        for rule, i, breach in self.auto_kill_rules.evaluate(table):
+            rule.triggers += 1
+            rule.last_trigger = table.timestamp
+            self.add_alert(f"⚠ Auto-kill triggered: {rule.name} for {breach.elapsed(table.timestamp):.0f}s "
+                           f"(avg CPU:{breach.cpu:.1f}% MEM:{breach.memory:.1f}%)",
+                           'critical', 'rules', table.pid[i])
+            targets[table.pid[i]] = (table.pid[i], table.create_time[i], table.name(i))
+        
+        # One batch per tick; the executor escalates to SIGKILL and reports each result
+        if targets:
+            self.actions.submit(list(targets.values()), 'rules', "Auto-kill")
+        
+        if self.auto_kill_rules and self.current_tab() == '⚡ Auto-Kill':
+            self.update_auto_display()
     
     def view_snapshot_details(self):
         """View details of selected snapshot"""
-        selected = self.history_tree.selection()
-        if not selected:
-            messagebox.showwarning("Warning", "Select a snapshot to view")
-            return
-        
-        values = self.history_tree.item(selected[0])['values']
-        timestamp = values[0]
-        
-        # Find the snapshot
-        snapshot = None
-        for s in self.process_snapshots:
-            if s['timestamp'] == timestamp:
-                snapshot = s
-                break
-        
-        if not snapshot:
-            messagebox.showerror("Error", "Snapshot not found")
+        snapshot = self.selected_snapshot("view")
+        if snapshot is None:
             return
+        info = snapshot.info
+        timestamp = datetime.fromtimestamp(info.timestamp).strftime("%Y-%m-%d %H:%M:%S")
         
         # Create detail window
         detail_window = tk.Toplevel(self.root)
@@ -894,58 +1182,216 @@ class TaskManager:
         details = f"""
 SNAPSHOT DETAILS
 ================
-Time: {snapshot['timestamp']}
-Total Processes: {len(snapshot['processes'])}
-System CPU: {snapshot['cpu']:.1f}%
-System Memory: {snapshot['memory']:.1f}%
+Time: {timestamp}
+Total Processes: {len(snapshot)}
+System CPU: {info.cpu:.1f}%
+System Memory: {info.memory:.1f}%
 
 TOP PROCESSES BY CPU:
 ---------------------
 """
-        top_cpu = sorted(snapshot['processes'], key=lambda x: x['cpu'], reverse=True)[:10]
+        processes = list(snapshot.rows())
+        top_cpu = sorted(processes, key=lambda x: x['cpu'], reverse=True)[:10]
         for proc in top_cpu:
             details += f"{proc['name']:<30} PID:{proc['pid']:<8} CPU:{proc['cpu']:.1f}%  MEM:{proc['memory']:.2f}%\n"
         
         details += "\nTOP PROCESSES BY MEMORY:\n---------------------\n"
-        top_mem = sorted(snapshot['processes'], key=lambda x: x['memory'], reverse=True)[:10]
+        top_mem = sorted(processes, key=lambda x: x['memory'], reverse=True)[:10]
         for proc in top_mem:
             details += f"{proc['name']:<30} PID:{proc['pid']:<8} CPU:{proc['cpu']:.1f}%  MEM:{proc['memory']:.2f}%\n"
         
         text_widget.insert(1.0, details)
         text_widget.config(state=tk.DISABLED)
     
-    def export_snapshot(self):
-        """Export selected snapshot to JSON"""
+    def compare_snapshots(self):
+        """Diff two selected snapshots, or one snapshot against the current process table"""
         selected = self.history_tree.selection()
-        if not selected:
-            messagebox.showwarning("Warning", "Select a snapshot to export")
+        if len(selected) not in (1, 2):
+            messagebox.showwarning("Warning", "Select one snapshot to compare with now, or two to compare")
             return
-        
-        values = self.history_tree.item(selected[0])['values']
-        timestamp = values[0]
-        
-        snapshot = None
-        for s in self.process_snapshots:
-            if s['timestamp'] == timestamp:
-                snapshot = s
-                break
-        
-        if not snapshot:
+        sources = sorted((self.snapshot_source(iid) for iid in selected),
+                         key=lambda source: source[0].info(source[1]).timestamp)
+        infos = [store.info(snapshot_id) for store, snapshot_id in sources]
+        old = sources[0][0].get(infos[0].id)
+        if len(infos) == 1:
+            # The shown table may be seconds old (or paused); diff against the next one
+            self.pending_compare = (infos[0], old, time.time())
+            self.collector.request_refresh()
+            return
+        new = sources[1][0].get(infos[1].id)
+        new_label = datetime.fromtimestamp(infos[1].timestamp).strftime("%Y-%m-%d %H:%M:%S")
+        self.show_comparison(infos[0], old, new, new_label)
+    
+    def show_comparison(self, old_info, old, new, new_label):
+        """Diff two process tables and show the report in its own window"""
+        old_label = datetime.fromtimestamp(old_info.timestamp).strftime("%Y-%m-%d %H:%M:%S")
+        
+        started = time.perf_counter()
+        result = diff_snapshots(old, new)
+        elapsed = (time.perf_counter() - started) * 1000
+        
+        lines = [
+            f"COMPARE {old_label}  →  {new_label}",
+            "=" * 60,
+            f"Processes: {len(old)} → {len(new)}   "
+            f"(+{len(result.started)} started, -{len(result.exited)} exited, {elapsed:.1f} ms)",
+            "",
+            "LARGEST MEMORY (RSS) CHANGES:",
+            "-" * 30,
+        ]
+        for delta, i, j in result.rss:
+            lines.append(f"{new.name(j):<30} PID:{new.pid[j]:<8} {old.rss[i] / 1048576:9.1f} → "
+                         f"{new.rss[j] / 1048576:9.1f} MB  ({delta / 1048576:+.1f})")
+        lines += ["", "LARGEST CPU CHANGES:", "-" * 30]
+        for delta, i, j in result.cpu:
+            lines.append(f"{new.name(j):<30} PID:{new.pid[j]:<8} {old.cpu[i]:6.1f} → {new.cpu[j]:6.1f}%  ({delta:+.1f})")
+        lines += ["", f"STARTED ({len(result.started)}):", "-" * 30]
+        for j in sorted(result.started, key=lambda j: -new.rss[j])[:50]:
+            lines.append(f"{new.name(j):<30} PID:{new.pid[j]:<8} {new.rss[j] / 1048576:9.1f} MB")
+        lines += ["", f"EXITED ({len(result.exited)}):", "-" * 30]
+        for i in sorted(result.exited, key=lambda i: -old.rss[i])[:50]:
+            lines.append(f"{old.name(i):<30} PID:{old.pid[i]:<8} {old.rss[i] / 1048576:9.1f} MB")
+        
+        diff_window = tk.Toplevel(self.root)
+        diff_window.title(f"Compare - {old_label} / {new_label}")
+        diff_window.geometry("800x600")
+        diff_window.configure(bg=self.bg_dark)
+        
+        text_widget = tk.Text(diff_window, wrap=tk.NONE, font=('Consolas', 9),
+                             bg=self.bg_darker, fg=self.fg_light)
+        text_widget.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        text_widget.insert(1.0, "\n".join(lines))
+        text_widget.config(state=tk.DISABLED)
+    
+    def export_snapshot(self):
+        """Stream the selected snapshot's rows to CSV or NDJSON"""
+        snapshot = self.selected_snapshot("export")
+        if snapshot is None:
             return
+        timestamp = datetime.fromtimestamp(snapshot.info.timestamp).strftime("%Y-%m-%d_%H-%M-%S")
         
         filename = filedialog.asksaveasfilename(
-            defaultextension=".json",
-            filetypes=[("JSON files", "*.json"), ("All files", "*.*")],
-            initialfile=f"snapshot_{timestamp.replace(':', '-')}.json"
+            defaultextension=".ndjson",
+            filetypes=exporter.FILETYPES,
+            initialfile=f"snapshot_{snapshot.info.id}_{timestamp}.ndjson"
         )
         
         if filename:
-            try:
-                with open(filename, 'w') as f:
-                    json.dump(snapshot, f, indent=2)
-                messagebox.showinfo("Success", f"Snapshot exported to {filename}")
-            except Exception as e:
-                messagebox.showerror("Error", f"Export failed: {str(e)}")
+            self.start_export(filename, exporter.SNAPSHOT_FIELDS, exporter.snapshot_records(snapshot),
+                              len(snapshot), "Snapshot")
+    
+    def export_history(self):
+        """Stream the Performance graphs' current range, raw or rolled up, to a file"""
+        label = self.graph_range_var.get()
+        fields, rows, total = self.history.rows(self.graph_ranges.get(label, 120))
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".csv",
+            filetypes=exporter.FILETYPES,
+            initialfile=f"performance_{label.replace(' ', '')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+        )
+        if filename:
+            self.start_export(filename, fields, rows, total, "Performance history")
+    
+    def start_export(self, filename, fields, records, total, what):
+        """Write records on a worker thread, with a progress window that can cancel it"""
+        job = exporter.ExportJob(filename, fields, records, total)
+        
+        window = tk.Toplevel(self.root)
+        window.title(f"Exporting {what}")
+        window.geometry("420x130")
+        window.configure(bg=self.bg_dark)
+        status = tk.Label(window, text=f"Writing {os.path.basename(filename)}...", bg=self.bg_dark,
+                          fg=self.fg_light, font=('Arial', 10))
+        status.pack(pady=(15, 5))
+        bar = ttk.Progressbar(window, length=360, maximum=max(total or 0, 1),
+                              mode='determinate' if total else 'indeterminate')
+        bar.pack(pady=5)
+        tk.Button(window, text="Cancel", command=job.cancel, font=('Arial', 10, 'bold'), bg=self.danger,
+                 fg='white', relief=tk.FLAT, width=12).pack(pady=5)
+        window.protocol("WM_DELETE_WINDOW", job.cancel)
+        
+        def poll():
+            if not job.done:
+                if total:
+                    bar['value'] = job.rows
+                else:
+                    bar.step()
+                window.after(100, poll)
+                return
+            window.destroy()
+            if job.error is not None:
+                messagebox.showerror("Error", f"Export failed: {job.error}")
+            elif job.cancelled:
+                self.add_alert(f"{what} export cancelled after {job.rows} rows: {filename}", 'warning')
+            else:
+                self.add_alert(f"{what} exported to {filename} ({job.rows} rows)")
+                messagebox.showinfo("Success", f"{what} exported to {filename}")
+        
+        job.start()
+        poll()
+    
+    def open_recording(self):
+        """Load a headless recording: its process tables are listed as snapshots, its series a graph window.
+        
+        The tables go into self.recorded, which lives in memory only, so
+        opening a recording never adds it to the snapshot database.
+        """
+        filename = filedialog.askopenfilename(filetypes=[("Recordings", "*.bin"), ("All files", "*.*")])
+        if not filename:
+            return
+        try:
+            recording = Recording(filename)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Error", f"Could not open recording: {e}")
+            return
+        
+        name = os.path.basename(filename)
+        for timestamp, count, blob in recording.tables:
+            cpu, memory = recording.system_at(timestamp)
+            self.recorded.add_encoded(blob, count, cpu, memory, f"Recorded ({name})", timestamp)
+        self.update_history_display()
+        self.add_alert(f"Opened recording {name}: {len(recording.timestamps)} samples, "
+                       f"{len(recording.tables)} process tables")
+        
+        if not recording.timestamps:
+            return
+        store = MetricStore(('cpu', 'memory', 'disk', 'network'))
+        store.extend(recording.timestamps, recording.columns)
+        span = recording.timestamps[-1] - recording.timestamps[0]
+        
+        window = tk.Toplevel(self.root)
+        start = datetime.fromtimestamp(recording.timestamps[0]).strftime('%Y-%m-%d %H:%M:%S')
+        window.title(f"Recording - {name} ({start}, {span / 60:.1f} min)")
+        window.geometry("900x600")
+        window.configure(bg=self.bg_dark)
+        canvas = tk.Canvas(window, bg=self.bg_darker, highlightthickness=0)
+        canvas.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        style = {'bg': self.bg_darkest, 'fg': self.fg_light, 'border': self.bg_darker}
+        graphs = [
+            ('cpu', LineGraph(canvas, "CPU Usage (%)", "#e74c3c", **style)),
+            ('memory', LineGraph(canvas, "Memory Usage (%)", "#3498db", **style)),
+            ('disk', LineGraph(canvas, "Disk Activity (MB/s)", "#2ecc71", **style)),
+            ('network', LineGraph(canvas, "Network Activity (KB/s)", "#f39c12", **style)),
+        ]
+        
+        def layout(event):
+            width = (event.width - 60) // 2
+            height = (event.height - 60) // 2
+            for i, (metric, graph) in enumerate(graphs):
+                graph.layout(20 + (i % 2) * (width + 20), 20 + (i // 2) * (height + 20), width, height)
+                _, data = store.window(metric, span + 1, now=recording.timestamps[-1] + 0.5)
+                limit = 100 if metric in ('cpu', 'memory') else (max(data, default=0) or 1) * 1.2
+                graph.update(data, limit)
+        
+        canvas.bind('<Configure>', layout)
+    
+    def clear_history(self):
+        """Clear all snapshots"""
+        if (len(self.snapshots) or len(self.recorded)) and messagebox.askyesno("Confirm", "Clear all snapshots?"):
+            self.snapshots.clear()
+            self.recorded.clear()
+            self.update_history_display()
+            self.add_alert("Cleared all snapshots")
     
     # ORIGINAL METHODS (preserved from your code)
     
@@ -1180,71 +1626,103 @@ TOP PROCESSES BY CPU:
         
         self.sys_info_text.insert(1.0, info)
         
-    def get_processes(self):
-        processes = []
-        for proc in psutil.process_iter(['pid', 'name', 'status', 'cpu_percent', 'memory_percent', 'memory_info', 'num_threads', 'username', 'create_time']):
+    def update_data(self):
+        """Drain samples produced by the collector thread and render the newest"""
+        # Scheduled first, so nothing below (a dialog, an error) can stall the loop
+        self.root.after(100, self.update_data)
+        sample = table = watched = watched_pids = None
+        while True:
             try:
-                pinfo = proc.info
-                mem_mb = pinfo['memory_info'].rss / (1024 * 1024) if pinfo.get('memory_info') else 0
-                username = pinfo.get('username', 'N/A')
-                if username and '\\' in username:
-                    username = username.split('\\')[-1]
-                
-                # Calculate runtime
-                create_time = pinfo.get('create_time', 0)
-                if create_time:
-                    runtime = datetime.now() - datetime.fromtimestamp(create_time)
-                    if runtime.days > 0:
-                        runtime_str = f"{runtime.days}d {runtime.seconds//3600}h"
-                    elif runtime.seconds >= 3600:
-                        runtime_str = f"{runtime.seconds//3600}h {(runtime.seconds//60)%60}m"
-                    else:
-                        runtime_str = f"{runtime.seconds//60}m"
-                else:
-                    runtime_str = "N/A"
-                
-                processes.append({
-                    'pid': pinfo['pid'],
-                    'name': pinfo['name'],
-                    'status': pinfo['status'],
-                    'cpu': pinfo['cpu_percent'] or 0,
-                    'memory': round(pinfo['memory_percent'], 2),
-                    'memory_mb': round(mem_mb, 1),
-                    'threads': pinfo['num_threads'],
-                    'username': username,
-                    'runtime': runtime_str
-                })
-            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                pass
-        return processes
+                sample = self.collector.samples.get_nowait()
+            except queue.Empty:
+                break
+            self.record_sample(sample)
+            # Not every sample carries a table; keep the newest of each kind
+            if sample.table is not None:
+                table = sample.table
+            if sample.watched is not None:
+                watched, watched_pids = sample.watched, sample.watched_pids
+        
+        if sample is not None:
+            self.render_sample(sample, table, watched, watched_pids)
+        if table is not None and self.pending_compare is not None and table.timestamp >= self.pending_compare[2]:
+            info, old, _ = self.pending_compare
+            self.pending_compare = None
+            now_label = datetime.fromtimestamp(table.timestamp).strftime("%Y-%m-%d %H:%M:%S")
+            self.show_comparison(info, old, table, f"now ({now_label})")
+        self.drain_action_results()
     
-    def update_data(self):
-        cpu = psutil.cpu_percent(interval=0.1)
-        memory = psutil.virtual_memory()
-        process_count = len(psutil.pids())
-        
-        current_net = psutil.net_io_counters()
-        current_time = time.time()
-        time_delta = current_time - self.last_time
-        
-        if time_delta > 0:
-            net_sent = (current_net.bytes_sent - self.last_net_io.bytes_sent) / time_delta / 1024
-            net_recv = (current_net.bytes_recv - self.last_net_io.bytes_recv) / time_delta / 1024
-        else:
-            net_sent = net_recv = 0
-        
-        self.last_net_io = current_net
-        
-        current_disk = psutil.disk_io_counters()
-        if current_disk and time_delta > 0:
-            disk_read = (current_disk.read_bytes - self.last_disk_io.read_bytes) / time_delta / (1024*1024)
-            disk_write = (current_disk.write_bytes - self.last_disk_io.write_bytes) / time_delta / (1024*1024)
-            disk_total = disk_read + disk_write
+    def drain_action_results(self):
+        """Report results of the actions the executor has finished"""
+        while True:
+            try:
+                result = self.actions.results.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(result, Batch):
+                self.finish_batch(result)
+                continue
+            batch = result.batch
+            if result.outcome in ('terminated', 'killed', 'done'):
+                how = " after SIGKILL" if result.outcome == 'killed' and batch.action == 'terminate' else ""
+                if batch.source == 'rules':
+                    self.add_alert(f"✓ Auto-killed process: {result.name}{how}", 'warning', 'rules', result.pid)
+                elif len(batch) == 1:
+                    # Bulk actions get one summary from finish_batch instead
+                    self.add_alert(f"Process {batch.verb}{how}: {result.name} (PID: {result.pid})",
+                                   'info', batch.source, result.pid)
+            elif result.outcome != 'gone':
+                detail = f" ({result.detail})" if result.detail else ""
+                self.add_alert(f"Process not {batch.verb}: {result.name} (PID: {result.pid}): {result.outcome}{detail}",
+                               'warning', batch.source, result.pid)
+    
+    def finish_batch(self, batch):
+        """One summary per batch; user requests also get a dialog.
+        
+        The dialogs are modal, so they are opened from an idle callback
+        rather than from inside the update loop that drains the results.
+        """
+        self.collector.request_refresh()
+        if len(batch) > 1:
+            self.add_alert(batch.summary(), 'warning' if batch.failures else 'info', batch.source)
+        if batch.source != 'user':
+            return
+        if len(batch) == 1:
+            pid, _, name = batch.targets[0]
+            if batch.outcomes['gone'] or batch.outcomes['reused']:
+                dialog = (messagebox.showerror, "Error", "Process no longer exists")
+            elif batch.outcomes['denied']:
+                dialog = (messagebox.showerror, "Error", "Access denied. Try running as administrator.")
+            elif batch.failures:
+                dialog = (messagebox.showerror, "Error",
+                          f"Failed: {batch.failures[0].detail or batch.failures[0].outcome}")
+            else:
+                dialog = (messagebox.showinfo, "Success", f"Process {name} {batch.verb} successfully")
+        elif batch.failures:
+            dialog = (messagebox.showwarning, "Finished", batch.summary())
         else:
-            disk_total = 0
-        
-        self.last_disk_io = current_disk if current_disk else self.last_disk_io
-        self.last_time = current_time
+            dialog = (messagebox.showinfo, "Finished", batch.summary())
+        self.root.after_idle(*dialog)
+    
+    def record_sample(self, sample):
+        """Append one sample to the graph history"""
+        values = (sample.cpu, sample.memory.percent, sample.disk_total, (sample.net_sent + sample.net_recv) / 2)
+        self.history.add(sample.timestamp, values)
+        if self.history_file is not None:
+            self.history_file.append(sample.timestamp, values)
+        if sample.table is not None:
+            self.process_series.record(sample.table)
+    
+    def render_sample(self, sample, table=None, watched=None, watched_pids=None):
+        """Update every tab from a collector sample. No sampling happens here."""
+        self.latest_sample = sample
+        if table is not None:
+            self.process_table = table
+        if watched is not None:
+            self.watched_table = watched
+            self.watched_table_pids = watched_pids
+        cpu = sample.cpu
+        memory = sample.memory
         
         cpu_text = f"CPU: {cpu}%"
         if cpu > self.cpu_threshold:
@@ -1256,127 +1734,181 @@ TOP PROCESSES BY CPU:
             mem_text += " ⚠️"
         self.memory_label.config(text=mem_text)
         
-        self.process_label.config(text=f"Processes: {process_count}")
-        self.disk_label.config(text=f"Disk: {disk_total:.1f} MB/s")
-        self.network_label.config(text=f"Network: ↑{net_sent:.1f} ↓{net_recv:.1f} KB/s")
+        self.process_label.config(text=f"Processes: {len(self.process_table)}")
+        self.disk_label.config(text=f"Disk: {sample.disk_total:.1f} MB/s")
+        self.network_label.config(text=f"Network: ↑{sample.net_sent:.1f} ↓{sample.net_recv:.1f} KB/s")
         
         self.perf_cpu_label.config(text=f"CPU: {cpu}%")
         mem_used_gb = memory.used / (1024**3)
         mem_total_gb = memory.total / (1024**3)
         self.perf_mem_label.config(text=f"Memory: {mem_used_gb:.1f} GB / {mem_total_gb:.1f} GB ({memory.percent}%)")
-        self.perf_disk_label.config(text=f"Disk: {disk_total:.1f} MB/s")
-        self.perf_net_label.config(text=f"Network: ↑{net_sent:.1f} KB/s ↓{net_recv:.1f} KB/s")
-        
-        self.cpu_history.append(cpu)
-        self.memory_history.append(memory.percent)
-        self.disk_history.append(disk_total)
-        self.network_history.append((net_sent + net_recv) / 2)
-        
-        self.draw_performance_graphs()
-        self.refresh_data()
+        self.perf_disk_label.config(text=f"Disk: {sample.disk_total:.1f} MB/s")
+        self.perf_net_label.config(text=f"Network: ↑{sample.net_sent:.1f} KB/s ↓{sample.net_recv:.1f} KB/s")
+        self.perf_devices_label.config(text=self.format_devices(sample))
+        
+        if self.current_tab() == 'Performance':
+            self.draw_performance_graphs()
+        if table is not None:
+            # The list is not diffed off-screen; showing the tab requests a fresh table
+            if self.current_tab() == 'Processes':
+                self.refresh_data()
+            self.check_auto_kill_rules()
         
         # Update new features
         self.update_monitor_display()
-        self.check_auto_kill_rules()
-        
-        self.root.after(2000, self.update_data)
+        self.update_collector_demand()
     
-    def draw_performance_graphs(self):
-        self.perf_canvas.delete("all")
+    def layout_performance_graphs(self, event=None):
         width = self.perf_canvas.winfo_width()
         height = self.perf_canvas.winfo_height()
         
         if width < 10 or height < 10:
             return
         
+        # The per-core heatmap takes a strip under the four graphs
+        heatmap_height = max(80, min(height // 4, 220))
         graph_width = (width - 60) // 2
-        graph_height = (height - 60) // 2
+        graph_height = (height - heatmap_height - 80) // 2
         padding = 20
         
-        self.draw_graph(padding, padding, graph_width, graph_height, 
-                       list(self.cpu_history), "CPU Usage (%)", "#e74c3c", 100)
-        
-        self.draw_graph(padding + graph_width + 20, padding, graph_width, graph_height,
-                       list(self.memory_history), "Memory Usage (%)", "#3498db", 100)
-        
-        max_disk = max(self.disk_history) if max(self.disk_history) > 0 else 1
-        self.draw_graph(padding, padding + graph_height + 20, graph_width, graph_height,
-                       list(self.disk_history), "Disk Activity (MB/s)", "#2ecc71", max_disk * 1.2)
-        
-        max_net = max(self.network_history) if max(self.network_history) > 0 else 1
-        self.draw_graph(padding + graph_width + 20, padding + graph_height + 20, 
-                       graph_width, graph_height, list(self.network_history), 
-                       "Network Activity (KB/s)", "#f39c12", max_net * 1.2)
+        self.cpu_graph.layout(padding, padding, graph_width, graph_height)
+        self.memory_graph.layout(padding + graph_width + 20, padding, graph_width, graph_height)
+        self.disk_graph.layout(padding, padding + graph_height + 20, graph_width, graph_height)
+        self.network_graph.layout(padding + graph_width + 20, padding + graph_height + 20,
+                                  graph_width, graph_height)
+        self.core_heatmap.layout(padding, padding + 2 * (graph_height + 20),
+                                 2 * graph_width + 20, heatmap_height)
+        self.draw_performance_graphs()
     
-    def draw_graph(self, x, y, width, height, data, title, color, max_val):
-        self.perf_canvas.create_rectangle(x, y, x + width, y + height, fill=self.bg_darkest, 
-                                         outline=self.bg_darker, width=2)
+    def format_devices(self, sample, limit=4):
+        """One line each for the busiest network interfaces and disks"""
+        nics = sorted(sample.nics.items(), key=lambda item: -sum(item[1]))[:limit]
+        disks = sorted(sample.disks.items(), key=lambda item: -sum(item[1]))[:limit]
+        nic_text = "  ".join(f"{name} ↑{sent:.1f} ↓{recv:.1f}" for name, (sent, recv) in nics)
+        disk_text = "  ".join(f"{name} R{read:.1f} W{write:.1f}" for name, (read, write) in disks)
+        return f" NICs (KB/s): {nic_text or 'none'}\n Disks (MB/s): {disk_text or 'none'}"
+    
+    def draw_performance_graphs(self):
+        # Each range reads the finest resolution that covers it without downsampling
+        seconds = self.graph_ranges.get(self.graph_range_var.get(), 120)
+        now = time.time()
+        _, cpu = self.history.window('cpu', seconds, now=now)
+        _, memory = self.history.window('memory', seconds, now=now)
+        _, disk = self.history.window('disk', seconds, now=now)
+        _, network = self.history.window('network', seconds, now=now)
         
-        self.perf_canvas.create_text(x + width//2, y + 15, text=title, font=('Arial', 11, 'bold'), 
-                                     fill=self.fg_light)
+        self.cpu_graph.update(cpu, 100)
+        self.memory_graph.update(memory, 100)
         
-        current = data[-1] if data else 0
-        self.perf_canvas.create_text(x + width//2, y + height - 15, text=f"{current:.1f}", 
-                                     font=('Arial', 10, 'bold'), fill=color)
+        max_disk = max(disk, default=0) or 1
+        self.disk_graph.update(disk, max_disk * 1.2)
         
-        for i in range(5):
-            y_pos = y + 30 + (height - 60) * i / 4
-            self.perf_canvas.create_line(x + 10, y_pos, x + width - 10, y_pos, fill='#3e3e42', dash=(2, 2))
+        max_net = max(network, default=0) or 1
+        self.network_graph.update(network, max_net * 1.2)
         
-        if len(data) > 1:
-            points = []
-            for i, value in enumerate(data):
-                px = x + 10 + (width - 20) * i / (len(data) - 1)
-                py = y + 30 + (height - 60) * (1 - min(value, max_val) / max_val)
-                points.extend([px, py])
-            
-            if len(points) >= 4:
-                self.perf_canvas.create_line(points, fill=color, width=2, smooth=True)
+        if self.latest_sample is not None:
+            self.core_heatmap.update(self.latest_sample.per_cpu)
+    
+    def process_tags(self, i, levels):
+        table = self.process_table
+        if table.pid[i] in self.watched_processes:
+            return ('watched',)
+        elif i in levels[0]:
+            return ('critical',)
+        elif i in levels[1]:
+            return ('high',)
+        return ()
+    
+    def format_process_row(self, i, now=None):
+        table = self.process_table
+        return (
+            table.pid[i], table.name(i), table.status(i),
+            f"{table.cpu[i]:.1f}%", f"{table.memory[i]:.2f}%",
+            f"{table.memory_mb(i):.1f} MB", table.threads[i], table.username(i),
+            format_runtime(table.create_time[i], now)
+        )
     
     def refresh_data(self):
-        # Store currently selected PID before refresh
-        selected_pid = None
-        if self.selected_process:
-            selected_pid = self.selected_process['pid']
-        
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
-        processes = self.get_processes()
-        search_term = self.search_var.get().lower()
-        
-        new_selected_item = None
-        
-        for proc in processes:
-            if search_term == "" or search_term in proc['name'].lower():
-                tags = ()
-                if proc['pid'] in self.watched_processes:
-                    tags = ('watched',)
-                elif proc['cpu'] > 50 or proc['memory'] > 50:
-                    tags = ('critical',)
-                elif proc['cpu'] > 30 or proc['memory'] > 30:
-                    tags = ('high',)
-                
-                item_id = self.tree.insert('', tk.END, values=(
-                    proc['pid'], proc['name'], proc['status'],
-                    f"{proc['cpu']:.1f}%", f"{proc['memory']:.2f}%",
-                    f"{proc['memory_mb']:.1f} MB", proc['threads'], proc['username'], proc['runtime']
-                ), tags=tags)
-                
-                # Re-select the previously selected process
-                if selected_pid and proc['pid'] == selected_pid:
-                    new_selected_item = item_id
-        
-        # Restore selection
-        if new_selected_item:
-            self.tree.selection_set(new_selected_item)
-            self.tree.focus(new_selected_item)
-            self.tree.see(new_selected_item)
+        """Reconcile the process list with the current table.
+        
+        Rows are keyed by pid and create_time, so only new processes are
+        inserted, only exited ones deleted and only changed rows touched.
+        Selection and scroll position survive because items are never rebuilt.
+        On very large hosts the tree switches to a virtual window instead.
+        """
+        table = self.process_table
+        rows = self.sorted_rows(self.search_rows())
+        levels = table.levels(50, 30)
+        now = datetime.now()
+        
+        if self.virtual_var.get() or len(table) > self.virtual_threshold:
+            if not self.virtual_list.attached:
+                if self.tree_rows:
+                    self.tree.delete(*self.tree_rows)
+                    self.tree_rows = {}
+                self.virtual_list.attach()
+            self.virtual_list.set_model(rows, table.iid,
+                                        lambda i: (self.format_process_row(i, now), self.process_tags(i, levels)))
+            return
+        self.virtual_list.detach()
+        
+        wanted = {}
+        for i in rows:
+            wanted[table.iid(i)] = (self.format_process_row(i, now), self.process_tags(i, levels))
+        
+        shown = self.tree_rows
+        gone = [iid for iid in shown if iid not in wanted]
+        if gone:
+            self.tree.delete(*gone)
+        
+        for iid, row in wanted.items():
+            old = shown.get(iid)
+            if old is None:
+                self.tree.insert('', tk.END, iid=iid, values=row[0], tags=row[1])
+            elif old != row:
+                self.tree.item(iid, values=row[0], tags=row[1])
+        
+        # New rows went in at the end; reorder in one call only if that is not the sort order
+        current = [iid for iid in shown if iid in wanted]
+        current.extend(iid for iid in wanted if iid not in shown)
+        if current != list(wanted):
+            self.tree.set_children('', *wanted)
+        
+        self.tree_rows = wanted
+    
+    def search_rows(self):
+        """Indices of process rows matching the search box, from the cached table"""
+        try:
+            rows = self.search_index.search(
+                self.process_table, self.search_var.get(),
+                match_more=self.search_more_var.get(),
+                match_cmdline=self.search_cmdline_var.get(),
+                regex=self.search_regex_var.get())
+        except re.error:
+            self.search_entry.config(bg=self.critical_bg)
+            return range(len(self.process_table))
+        self.search_entry.config(bg=self.bg_darker)
+        return rows
     
     def filter_processes(self, *args):
+        """Re-filter shortly after typing stops instead of on every keystroke"""
+        if self.search_job is not None:
+            self.root.after_cancel(self.search_job)
+        self.search_job = self.root.after(150, self.apply_search)
+    
+    def apply_search(self):
+        self.search_job = None
         self.refresh_data()
     
+    def toggle_cmdline_search(self):
+        # Command lines are only read by the collector while this or a rule needs them
+        self.update_collector_demand()
+        self.filter_processes()
+    
     def on_tree_select(self, event):
+        # Shift and Control clicks extend the selection; the Treeview handles those
+        if event.state & 0x0005:
+            return
         item = self.tree.identify_row(event.y)
         if item:
             # Don't clear selection, just add to it
@@ -1389,7 +1921,7 @@ TOP PROCESSES BY CPU:
                     self.selected_process = {
                         'pid': int(values[0]),
                         'name': values[1],
-                        'item_id': item
+                        'item_id': self.row_key(item)
                     }
                     self.selected_label.config(
                         text=f"Selected: {values[1]} (PID: {values[0]})",
@@ -1400,9 +1932,22 @@ TOP PROCESSES BY CPU:
             except Exception as e:
                 print(f"Selection storage error: {e}")
     
+    def row_key(self, item):
+        """Table key (pid-create_time) of a Treeview item; virtual-list items are reusable slots"""
+        if self.virtual_list.attached:
+            return self.virtual_list.slot_rows.get(item, (item,))[0]
+        return item
+    
     def on_selection_changed(self, event):
         selected = self.tree.selection()
-        if selected:
+        if self.virtual_list.attached:
+            self.virtual_list.on_select(event)  # bound after this handler; bring its keys up to date
+            count = len(self.virtual_list.selected)
+        else:
+            count = len(selected)
+        if count > 1:
+            self.selected_label.config(text=f"Selected: {count} processes", fg=self.accent)
+        elif selected:
             try:
                 item = selected[0]
                 values = self.tree.item(item)['values']
@@ -1410,7 +1955,7 @@ TOP PROCESSES BY CPU:
                     self.selected_process = {
                         'pid': int(values[0]),
                         'name': values[1],
-                        'item_id': item
+                        'item_id': self.row_key(item)
                     }
                     self.selected_label.config(
                         text=f"Selected: {values[1]} (PID: {values[0]})",
@@ -1429,7 +1974,9 @@ TOP PROCESSES BY CPU:
     def show_context_menu(self, event):
         item = self.tree.identify_row(event.y)
         if item:
-            self.tree.selection_set(item)
+            # Right-clicking inside a multi-selection acts on all of it
+            if item not in self.tree.selection():
+                self.tree.selection_set(item)
             self.tree.focus(item)
             
             try:
@@ -1438,7 +1985,7 @@ TOP PROCESSES BY CPU:
                     self.selected_process = {
                         'pid': int(values[0]),
                         'name': values[1],
-                        'item_id': item
+                        'item_id': self.row_key(item)
                     }
                     self.selected_label.config(
                         text=f"Selected: {values[1]} (PID: {values[0]})",
@@ -1452,6 +1999,17 @@ TOP PROCESSES BY CPU:
             finally:
                 self.context_menu.grab_release()
     
+    def sorted_rows(self, rows):
+        """Order row indices by the active sort column, keeping only the top K if enabled"""
+        column, flip = self.sort_keys[self.sort_column]
+        limit = None
+        if self.top_k_var.get():
+            try:
+                limit = max(1, int(self.top_k_count.get()))
+            except (tk.TclError, ValueError):
+                limit = 50
+        return self.process_table.order(column, self.sort_reverse != flip, rows, limit)
+    
     def sort_by(self, col):
         if self.sort_column == col:
             self.sort_reverse = not self.sort_reverse
@@ -1459,51 +2017,80 @@ TOP PROCESSES BY CPU:
             self.sort_reverse = False
         
         self.sort_column = col
-        items = [(self.tree.set(item, col), item) for item in self.tree.get_children('')]
+        for heading in self.sort_keys:
+            arrow = (" ▼" if self.sort_reverse else " ▲") if heading == col else ""
+            self.tree.heading(heading, text=heading + arrow)
         
-        try:
-            items.sort(key=lambda x: float(str(x[0]).rstrip('%').split()[0]), reverse=self.sort_reverse)
-        except:
-            items.sort(reverse=self.sort_reverse)
-        
-        for index, (val, item) in enumerate(items):
-            self.tree.move(item, '', index)
+        self.refresh_data()
+    
+    def selected_rows(self, include_children=None):
+        """Rows of the current table that the process actions apply to.
+        
+        Every selected process (the virtual list keeps its selection by key,
+        outside the visible window too), or the last one clicked, plus all
+        their descendants when "Include children" is on. Descendants come
+        from the table's ppid index, parents before children. The task
+        manager itself is never included.
+        """
+        table = self.process_table
+        if self.virtual_list.attached:
+            iids = self.virtual_list.selected
+        else:
+            iids = self.tree.selection()
+        rows = []
+        for iid in iids:
+            pid, _, _ = str(iid).partition('-')
+            i = table.index.get(int(pid)) if pid.isdigit() else None
+            # A PID reused since the selection is a different process
+            if i is not None and table.iid(i) == iid:
+                rows.append(i)
+        if not rows and self.selected_process:
+            i = table.index.get(self.selected_process['pid'])
+            if i is not None and table.iid(i) == self.selected_process['item_id']:
+                rows.append(i)
+        
+        if include_children is None:
+            include_children = self.include_children_var.get()
+        if include_children and rows:
+            rows.extend(table.descendants([table.pid[i] for i in rows]))
+        own = table.index.get(os.getpid())
+        return [i for i in rows if i != own]
+    
+    def action_targets(self, rows):
+        table = self.process_table
+        return [(table.pid[i], table.create_time[i], table.name(i)) for i in rows]
+    
+    def confirm_rows(self, verb, rows, note=""):
+        """One confirmation for the whole set"""
+        table = self.process_table
+        if len(rows) == 1:
+            question = f"{verb} process '{table.name(rows[0])}' (PID: {table.pid[rows[0]]})?"
+        else:
+            names = Counter(table.name(i) for i in rows)
+            listing = ", ".join(f"{name} ×{count}" if count > 1 else name
+                                for name, count in names.most_common(8))
+            if len(names) > 8:
+                listing += f" and {len(names) - 8} more"
+            question = f"{verb} {len(rows)} processes?\n\n{listing}"
+        return messagebox.askyesno("Confirm", question + note)
     
-    def end_task(self):
+    def end_task(self, include_children=None):
         self.root.update_idletasks()
         
-        if self.selected_process:
-            pid = self.selected_process['pid']
-            name = self.selected_process['name']
-        else:
-            selected = self.tree.selection()
-            if not selected:
-                messagebox.showwarning("Warning", "Select a process to end")
-                return
-            values = self.tree.item(selected[0])['values']
-            pid = int(values[0])
-            name = values[1]
+        rows = self.selected_rows(include_children)
+        if not rows:
+            messagebox.showwarning("Warning", "Select a process to end")
+            return
         
-        if messagebox.askyesno("Confirm", f"End process '{name}' (PID: {pid})?"):
-            try:
-                proc = psutil.Process(pid)
-                proc.terminate()
-                try:
-                    proc.wait(timeout=3)
-                except psutil.TimeoutExpired:
-                    proc.kill()
-                
-                self.add_alert(f"Process terminated: {name} (PID: {pid})")
-                messagebox.showinfo("Success", f"Process {name} terminated successfully")
-                self.selected_process = None
-                self.selected_label.config(text="No process selected", fg=self.fg_dim)
-                self.refresh_data()
-            except psutil.NoSuchProcess:
-                messagebox.showerror("Error", "Process no longer exists")
-            except psutil.AccessDenied:
-                messagebox.showerror("Error", "Access denied. Try running as administrator.")
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed: {str(e)}")
+        if self.confirm_rows("End", rows):
+            # Children first, so a parent cannot respawn them; SIGTERM, the wait and any
+            # SIGKILL happen on the executor, and finish_batch reports back
+            rows.reverse()
+            table = self.process_table
+            label = f"End {table.name(rows[0])}" if len(rows) == 1 else f"End {len(rows)} processes"
+            self.actions.submit(self.action_targets(rows), 'user', label)
+            self.selected_process = None
+            self.selected_label.config(text=f"{label}...", fg=self.fg_dim)
     
     def show_details(self):
         self.root.update_idletasks()
@@ -1543,10 +2130,9 @@ TOP PROCESSES BY CPU:
                 except (psutil.AccessDenied, psutil.ZombieProcess):
                     parent_pid = "N/A"
                 
-                try:
-                    cpu_percent = proc.cpu_percent(interval=0.1)
-                except:
-                    cpu_percent = 0
+                # Measured by the collector between ticks; no blocking sample here
+                row = self.process_table.get(pid)
+                cpu_percent = row['cpu'] if row else 0
                 
                 try:
                     mem_percent = proc.memory_percent()
@@ -1569,10 +2155,10 @@ TOP PROCESSES BY CPU:
             
             detail_window = tk.Toplevel(self.root)
             detail_window.title(f"Process Details - {proc.name()}")
-            detail_window.geometry("600x400")
+            detail_window.geometry("600x600")
             detail_window.configure(bg=self.bg_dark)
             
-            text_widget = tk.Text(detail_window, wrap=tk.WORD, font=('Consolas', 10),
+            text_widget = tk.Text(detail_window, wrap=tk.WORD, font=('Consolas', 10), height=12,
                                  bg=self.bg_darker, fg=self.fg_light, insertbackground=self.fg_light,
                                  selectbackground=self.accent, relief=tk.FLAT, padx=10, pady=10)
             text_widget.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
@@ -1580,6 +2166,9 @@ TOP PROCESSES BY CPU:
             text_widget.insert(1.0, "\n".join(details))
             text_widget.config(state=tk.DISABLED)
             
+            if row:
+                self.show_sparklines(detail_window, (pid, row['create_time']))
+            
             close_btn = tk.Button(detail_window, text="Close", command=detail_window.destroy,
                                  font=('Arial', 10, 'bold'), bg=self.accent, fg='white', 
                                  relief=tk.FLAT, width=15, cursor='hand2', activebackground=self.accent_hover)
@@ -1590,6 +2179,38 @@ TOP PROCESSES BY CPU:
         except Exception as e:
             messagebox.showerror("Error", f"Failed: {str(e)}")
     
+    def show_sparklines(self, window, key):
+        """Recent CPU, RSS, threads and I/O of one process, redrawn while the window is open"""
+        canvas = tk.Canvas(window, bg=self.bg_darker, highlightthickness=0, height=220)
+        canvas.pack(fill=tk.X, padx=10)
+        style = {'bg': self.bg_darkest, 'fg': self.fg_light, 'border': self.bg_darker}
+        graphs = [
+            ('cpu', LineGraph(canvas, "CPU (%)", "#e74c3c", **style)),
+            ('rss_mb', LineGraph(canvas, "RSS (MB)", "#3498db", **style)),
+            ('threads', LineGraph(canvas, "Threads", "#2ecc71", **style)),
+            ('io_kbps', LineGraph(canvas, "I/O (KB/s)", "#f39c12", **style)),
+        ]
+        
+        def redraw():
+            for field, graph in graphs:
+                data = self.process_series.series(key, field)
+                graph.update(data, 100 if field == 'cpu' else (max(data, default=0) or 1) * 1.2)
+        
+        def layout(event):
+            width = (event.width - 30) // 2
+            height = (event.height - 30) // 2
+            for i, (_, graph) in enumerate(graphs):
+                graph.layout(10 + (i % 2) * (width + 10), 10 + (i // 2) * (height + 10), width, height)
+            redraw()
+        
+        def tick():
+            if canvas.winfo_exists():
+                redraw()
+                canvas.after(2000, tick)
+        
+        canvas.bind('<Configure>', layout)
+        canvas.after(2000, tick)
+    
     def open_file_location(self):
         self.root.update_idletasks()
         
@@ -1621,25 +2242,15 @@ TOP PROCESSES BY CPU:
             messagebox.showerror("Error", f"Failed: {str(e)}")
     
     def export_data(self):
-        filename = filedialog.asksaveasfilename(defaultextension=".csv",
-                                               filetypes=[("CSV files", "*.csv"), ("All files", "*.*")])
+        """Export every process in the current table with raw numeric columns"""
+        filename = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=exporter.FILETYPES)
         if not filename:
             return
         
-        try:
-            with open(filename, 'w', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow(["PID", "Name", "Status", "CPU%", "Memory%", "Memory(MB)", "Threads", "User", "Runtime"])
-                
-                for item in self.tree.get_children():
-                    values = self.tree.item(item)['values']
-                    writer.writerow(values)
-            
-            self.add_alert(f"Process data exported to {filename}")
-            messagebox.showinfo("Success", f"Data exported to {filename}")
-        except Exception as e:
-            messagebox.showerror("Error", f"Export failed: {str(e)}")
-
+        # Tables are immutable once built, so the worker can read this one while new ticks arrive
+        table = self.process_table
+        self.start_export(filename, exporter.PROCESS_FIELDS, exporter.table_records(table), len(table),
+                          "Process data")
 
 if __name__ == "__main__":
     try:
@@ -1664,36 +2275,3 @@ if __name__ == "__main__":
         import traceback
         traceback.print_exc()
         input("Press Enter to exit...")
-    
-    def clear_history(self):
-        """Clear all snapshots"""
-        if self.process_snapshots and messagebox.askyesno("Confirm", "Clear all snapshots?"):
-            self.process_snapshots.clear()
-            self.update_history_display()
-            self.add_alert("Cleared all snapshots")
-    
-    def clear_alerts(self):
-        """Clear all alerts"""
-        if self.alert_log and messagebox.askyesno("Confirm", "Clear all alerts?"):
-            self.alert_log.clear()
-            self.update_alerts_display()
-    
-    def export_alerts(self):
-        """Export alert log"""
-        if not self.alert_log:
-            messagebox.showinfo("Info", "No alerts to export")
-            return
-        
-        filename = filedialog.asksaveasfilename(
-            defaultextension=".txt",
-            filetypes=[("Text files", "*.txt"), ("All files", "*.*")],
-            initialfile=f"alerts_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
-        )
-        
-        if filename:
-            try:
-                with open(filename, 'w') as f:
-                    f.write("\n".join(self.alert_log))
-                messagebox.showinfo("Success", f"Alerts exported to {filename}")
-            except Exception as e:
-                messagebox.showerror("Error", f"Export failed: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,85 @@
+"""Per-tick cost of the process collector backends.
+
+    python bench.py                 # live /proc on this host
+    python bench.py 1000 10000      # synthetic /proc trees of that many processes
+
+Synthetic trees copy this process's own /proc files under fake PIDs, so both
+backends parse realistic content without needing thousands of real processes.
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+import psutil
+
+import procfs
+from collector import PsutilBackend
+from process_table import StringPool, TableBuilder
+
+
+PROC_FILES = ('stat', 'statm', 'status', 'cmdline', 'comm')
+
+
+def build_fake_proc(count):
+    root = tempfile.mkdtemp(prefix='fakeproc')
+    for name in ('stat', 'meminfo', 'uptime'):
+        shutil.copy(f'/proc/{name}', os.path.join(root, name))
+    templates = {}
+    for name in PROC_FILES:
+        with open(f'/proc/self/{name}', 'rb') as f:
+            templates[name] = f.read()
+    own_pid = str(os.getpid()).encode()
+    for pid in range(1000, 1000 + count):
+        base = os.path.join(root, str(pid))
+        os.mkdir(base)
+        for name, data in templates.items():
+            if name == 'stat':
+                data = str(pid).encode() + data[len(own_pid):]
+            with open(os.path.join(base, name), 'wb') as f:
+                f.write(data)
+    return root
+
+
+def time_backend(backend, ticks=5):
+    pools = (StringPool(), StringPool(), StringPool())
+    backend.collect(TableBuilder(*pools))  # baseline tick primes CPU deltas and caches
+    started = time.perf_counter()
+    for _ in range(ticks):
+        builder = TableBuilder(*pools)
+        backend.collect(builder)
+        table = builder.build(time.time())
+    return (time.perf_counter() - started) / ticks, len(table)
+
+
+def report(label, backend):
+    per_tick, rows = time_backend(backend)
+    print(f"{label:<28} {rows:>6} rows  {per_tick * 1000:8.1f} ms/tick  "
+          f"{per_tick / max(rows, 1) * 1e6:6.1f} us/process")
+
+
+def main(argv):
+    if not procfs.is_supported():
+        print("procfs backend needs Linux; nothing to compare")
+        return 1
+
+    if not argv:
+        report("psutil (live)", PsutilBackend())
+        report("procfs (live)", procfs.ProcfsBackend())
+        return 0
+
+    for count in map(int, argv):
+        root = build_fake_proc(count)
+        try:
+            psutil.PROCFS_PATH = root
+            report(f"psutil ({count} synthetic)", PsutilBackend())
+            report(f"procfs ({count} synthetic)", procfs.ProcfsBackend(proc_root=root))
+        finally:
+            psutil.PROCFS_PATH = '/proc'
+            shutil.rmtree(root)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,452 @@
+import sys
+import time
+import threading
+import queue
+from array import array
+from operator import sub
+from collections import namedtuple
+
+import psutil
+
+from process_table import StringPool, TableBuilder
+import procfs
+
+
+# One immutable sample per collector tick. The GUI only ever reads these.
+# `table` is None when the full process table was not due this tick, and
+# `watched` holds a small table of just `watched_pids` when it was not.
+# `per_cpu` lists busy% per core; `nics` maps interface to (sent, recv) KB/s
+# and `disks` maps device to (read, write) MB/s.
+Sample = namedtuple('Sample', [
+    'timestamp', 'cpu', 'memory', 'process_count',
+    'net_sent', 'net_recv', 'disk_total', 'table', 'watched', 'watched_pids',
+    'per_cpu', 'nics', 'disks'
+])
+
+
+class CounterRates:
+    """Per-second rates for a set of devices from their cumulative counters.
+
+    Every device's counters are flattened into one array in key order and
+    the deltas against the previous tick are taken in a single pass over
+    both arrays. When the device set changes (hotplug) the previous array is
+    realigned by key first; a new device reports 0 until its second reading
+    and a removed one simply drops out. A counter that went backwards,
+    because it wrapped or the driver reset it, reports 0 for that tick
+    rather than a bogus spike.
+    """
+
+    def __init__(self, width):
+        self.width = width
+        self.keys = ()
+        self.values = array('d')
+        self.last_time = None
+
+    def update(self, counters, now):
+        """counters: {key: tuple of `width` cumulative values}. Returns {key: tuple of rates}."""
+        keys = tuple(counters)
+        width = self.width
+        values = array('d')
+        for row in counters.values():
+            values.extend(row)
+
+        if keys == self.keys:
+            previous = self.values
+        else:
+            positions = {key: i * width for i, key in enumerate(self.keys)}
+            previous = array('d')
+            missing = [float('nan')] * width
+            for key in keys:
+                j = positions.get(key)
+                previous.extend(missing if j is None else self.values[j:j + width])
+
+        elapsed = now - self.last_time if self.last_time is not None else 0.0
+        self.keys, self.values, self.last_time = keys, values, now
+        if elapsed <= 0:
+            return {key: (0.0,) * width for key in keys}
+
+        # NaN (new device) and negative (wrapped or reset) deltas both fail >= 0
+        rates = [d / elapsed if d >= 0 else 0.0 for d in map(sub, values, previous)]
+        return {key: tuple(rates[i * width:(i + 1) * width]) for i, key in enumerate(keys)}
+
+
+def cpu_busy_times(times):
+    """(busy, total) seconds for one psutil cpu_times entry, counted the way psutil does"""
+    total = sum(times) - getattr(times, 'guest', 0.0) - getattr(times, 'guest_nice', 0.0)
+    idle = times.idle + getattr(times, 'iowait', 0.0)
+    return (total - idle, total)
+
+
+class ProcessCache:
+    """psutil.Process objects kept across ticks, keyed by (pid, create_time).
+
+    psutil measures per-process CPU% as the delta since the previous call on
+    the same Process object, so a fresh object always reports 0.0. Keeping
+    the objects alive between ticks gives real, non-blocking CPU figures;
+    entries for exited processes are dropped when the next tick replaces
+    the live set.
+
+    A cached object is not re-checked against its PID here: psutil already
+    verifies the process identity when as_dict() reads the ppid, and raises
+    NoSuchProcess if the PID now belongs to another process.
+    """
+
+    def __init__(self):
+        self.procs = {}  # (pid, create_time): psutil.Process
+        self.keys = {}  # pid: (pid, create_time)
+
+    def __len__(self):
+        return len(self.procs)
+
+    def lookup(self, pid):
+        """Cached Process for a PID, or None if it is unknown"""
+        return self.procs.get(self.keys.get(pid))
+
+    def update(self, procs):
+        """Add or refresh entries from a partial pass without dropping the others"""
+        for proc in procs:
+            key = (proc.pid, proc.create_time())
+            self.procs[key] = proc
+            self.keys[proc.pid] = key
+
+    def replace(self, procs):
+        """Make `procs` (everything seen this tick) the cached set"""
+        self.procs = {(proc.pid, proc.create_time()): proc for proc in procs}
+        self.keys = {key[0]: key for key in self.procs}
+
+
+class PsutilBackend:
+    """Portable process reader built on psutil"""
+
+    name = 'psutil'
+    attrs = ['pid', 'name', 'status', 'cpu_percent', 'memory_percent', 'memory_info',
+             'num_threads', 'username', 'create_time', 'ppid']
+
+    def __init__(self):
+        self.cache = ProcessCache()
+
+    def collect(self, builder, pids=None):
+        """Enumerate all processes (or just `pids`) once into a TableBuilder.
+
+        This is the only process enumeration per tick; every consumer reads
+        the resulting ProcessTable.
+        """
+        seen = []
+        for pid in psutil.pids() if pids is None else pids:
+            try:
+                proc = self.cache.lookup(pid)
+                pinfo = None
+                if proc is not None:
+                    try:
+                        pinfo = proc.as_dict(self.attrs)
+                    except psutil.NoSuchProcess:
+                        pass  # exited, or the PID now belongs to another process
+                if pinfo is None:
+                    proc = psutil.Process(pid)
+                    pinfo = proc.as_dict(self.attrs)
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                continue
+            seen.append(proc)
+
+            username = pinfo.get('username', 'N/A')
+            if username and '\\' in username:
+                username = username.split('\\')[-1]
+
+            cmdline = None
+            if builder.cmdline is not None:
+                try:
+                    cmdline = ' '.join(proc.cmdline())
+                except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                    pass
+
+            io = None
+            if builder.io_read is not None:
+                try:
+                    io = proc.io_counters()
+                except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess, AttributeError):
+                    pass  # other users' processes, or no per-process I/O on this platform
+
+            builder.add(
+                pid=pinfo['pid'],
+                name=pinfo['name'],
+                status=pinfo['status'],
+                cpu=pinfo['cpu_percent'] or 0.0,
+                memory=round(pinfo['memory_percent'] or 0, 2),
+                rss=pinfo['memory_info'].rss if pinfo.get('memory_info') else 0,
+                threads=pinfo['num_threads'],
+                username=username,
+                create_time=pinfo.get('create_time'),
+                cmdline=cmdline,
+                io_read=io.read_bytes if io else 0,
+                io_write=io.write_bytes if io else 0,
+                ppid=pinfo.get('ppid')
+            )
+        if pids is None:
+            self.cache.replace(seen)
+        else:
+            self.cache.update(seen)
+
+
+BACKENDS = ('auto', 'psutil', 'procfs')
+
+
+def make_backend(name='auto'):
+    """Build a process reader; procfs is only used on Linux and falls back to psutil"""
+    if name in ('auto', 'procfs') and sys.platform.startswith('linux') and procfs.is_supported():
+        return procfs.ProcfsBackend()
+    if name == 'procfs':
+        print("procfs backend is not available on this platform, using psutil")
+    return PsutilBackend()
+
+
+class Schedule:
+    """Per-subsystem sampling intervals for the collector.
+
+    System counters, the full process table and the watched processes each
+    have their own interval. The process table pauses while no visible view
+    needs it, everything backs off while the window is iconified, and the
+    collector's own CPU use stretches the process interval when it goes
+    over budget. Auto-kill rules and watched processes keep their rate
+    regardless, since they must work while nobody is looking. Per-process
+    history alone keeps the table going at its own slower `history` rate
+    (five times slower again while iconified), so its series stay coarse
+    but unbroken while the tab is hidden.
+    """
+
+    def __init__(self, system=1.0, processes=2.0, watched=2.0, history=10.0, budget=0.05, slack=0.05):
+        self.base = {'system': system, 'processes': processes, 'watched': watched}
+        self.history = history  # process-table interval when only the per-process history needs it
+        self.next_due = dict.fromkeys(self.base, 0.0)
+        self.budget = budget  # fraction of one core the collector may use
+        self.slack = slack  # seconds; subsystems due this close together are sampled together
+        self.load = 0.0
+        self.backoff = 1.0
+
+        # Demand, set from the GUI thread
+        self.processes_visible = True
+        self.iconified = False
+        self.rules_active = False
+        self.history_active = False
+        self.watched = frozenset()
+
+    def interval(self, name):
+        """Current interval for a subsystem, or None while it is paused"""
+        base = self.base[name]
+        if name == 'system':
+            return base * 5 if self.iconified else base
+        if name == 'processes':
+            if self.processes_visible and not self.iconified:
+                return base * self.backoff
+            if self.rules_active:
+                return base
+            if self.history_active:
+                interval = max(self.history, base * self.backoff)
+                return interval * 5 if self.iconified else interval
+            return None
+        return base if self.watched else None
+
+    def due(self, now):
+        """Subsystems due now, plus any due within `slack` so they share this sample"""
+        return {name for name, at in self.next_due.items()
+                if at <= now + self.slack and self.interval(name) is not None}
+
+    def mark(self, names, now):
+        """Advance the sampled subsystems one interval along their own grid.
+
+        Stepping from the previous due time rather than from `now` keeps
+        wake-up latency from accumulating, so subsystems with commensurate
+        intervals stay aligned. A subsystem sampled early (a refresh) or
+        more than an interval late restarts its grid from `now`.
+        """
+        for name in names:
+            interval = self.interval(name)
+            if interval is None:
+                self.next_due[name] = now
+                continue
+            previous = self.next_due[name]
+            if previous > now + self.slack:
+                self.next_due[name] = now + interval
+            else:
+                self.next_due[name] = previous + interval
+                if self.next_due[name] <= now:
+                    self.next_due[name] = now + interval
+
+    def next_wake(self, now):
+        waits = [max(0.0, self.next_due[name] - now) for name in self.base
+                 if self.interval(name) is not None]
+        return min(waits) if waits else None
+
+    def record_cost(self, cpu_seconds, wall_seconds):
+        """Feed back the collector's own CPU use and adjust the process back-off"""
+        if wall_seconds <= 0:
+            return
+        self.load = 0.7 * self.load + 0.3 * (cpu_seconds / wall_seconds)
+        if self.load > self.budget:
+            self.backoff = min(self.backoff * 1.5, 8.0)
+        elif self.load < self.budget / 2:
+            self.backoff = max(1.0, self.backoff / 1.5)
+
+
+class Collector(threading.Thread):
+    """Background sampler that hands immutable Samples to the GUI through a queue.
+
+    All psutil and /proc access happens on this thread so a slow read can
+    never stall the Tk event loop. What gets sampled when is decided by a
+    Schedule; the GUI updates its demand fields and calls wake().
+    """
+
+    def __init__(self, max_pending=8, backend='auto', schedule=None):
+        super().__init__(name="collector", daemon=True)
+        self.schedule = schedule or Schedule()
+        self.backend = make_backend(backend)
+        # Interned names, users and statuses keep their IDs across ticks
+        self.names = StringPool()
+        self.users = StringPool()
+        self.statuses = StringPool()
+        # Set by consumers that need command lines (cmdline search) or I/O counters
+        self.want_cmdline = False
+        self.want_io = False
+        self.samples = queue.Queue(maxsize=max_pending)
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+        self._refresh = False
+
+        # Prime the counters so the first real sample has a baseline
+        psutil.cpu_percent(interval=None)
+        self.last_net_io = psutil.net_io_counters()
+        self.last_disk_io = psutil.disk_io_counters()
+        self.last_time = time.time()
+        self.cpu_rates = CounterRates(2)
+        self.nic_rates = CounterRates(2)
+        self.disk_rates = CounterRates(2)
+        self.sample_devices(self.last_time)
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake_event.set()
+
+    def wake(self):
+        """Re-evaluate the schedule now (demand changed)"""
+        self._wake_event.set()
+
+    def request_refresh(self):
+        """Take a full sample now instead of waiting for the interval"""
+        self._refresh = True
+        self._wake_event.set()
+
+    def run(self):
+        schedule = self.schedule
+        cost_since = time.monotonic()
+        cost_cpu = 0.0
+        while not self._stop_event.is_set():
+            now = time.monotonic()
+            due = schedule.due(now)
+            if self._refresh:
+                self._refresh = False
+                due |= {'system', 'processes'}
+            if due:
+                cpu_started = time.thread_time()
+                try:
+                    self.publish(self.sample(due))
+                except Exception as e:
+                    print(f"Collector error: {e}")
+                schedule.mark(due, now)
+                cost_cpu += time.thread_time() - cpu_started
+                # Judge our own CPU use over windows of at least a second
+                if now - cost_since >= 1.0:
+                    schedule.record_cost(cost_cpu, now - cost_since)
+                    cost_since = now
+                    cost_cpu = 0.0
+
+            self._wake_event.wait(schedule.next_wake(time.monotonic()))
+            self._wake_event.clear()
+
+    def publish(self, sample):
+        """Queue a sample, dropping the oldest one if the GUI has fallen behind"""
+        while True:
+            try:
+                self.samples.put_nowait(sample)
+                return
+            except queue.Full:
+                try:
+                    self.samples.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def collect_table(self, timestamp, pids=None):
+        builder = TableBuilder(self.names, self.users, self.statuses,
+                               with_cmdline=self.want_cmdline and pids is None,
+                               with_io=self.want_io)
+        self.backend.collect(builder, pids)
+        return builder.build(timestamp)
+
+    def sample_devices(self, now):
+        """Per-core busy%, per-NIC KB/s and per-disk MB/s since the previous call"""
+        cores = self.cpu_rates.update(
+            dict(enumerate(map(cpu_busy_times, psutil.cpu_times(percpu=True)))), now)
+        per_cpu = [round(min(busy / total * 100, 100.0), 1) if total > 0 else 0.0
+                   for busy, total in cores.values()]
+
+        nic_counters = psutil.net_io_counters(pernic=True) or {}
+        nics = {name: (sent / 1024, recv / 1024) for name, (sent, recv) in self.nic_rates.update(
+            {name: (c.bytes_sent, c.bytes_recv) for name, c in nic_counters.items()}, now).items()}
+
+        try:
+            disk_counters = psutil.disk_io_counters(perdisk=True) or {}
+        except (OSError, RuntimeError):
+            disk_counters = {}  # no disk stats on this platform or in this container
+        disks = {name: (read / (1024*1024), write / (1024*1024)) for name, (read, write) in self.disk_rates.update(
+            {name: (c.read_bytes, c.write_bytes) for name, c in disk_counters.items()}, now).items()}
+        return per_cpu, nics, disks
+
+    def sample(self, due):
+        cpu = psutil.cpu_percent(interval=None)
+        memory = psutil.virtual_memory()
+        current_net = psutil.net_io_counters()
+        current_time = time.time()
+
+        table = watched = None
+        watched_pids = frozenset()
+        if 'processes' in due:
+            table = self.collect_table(current_time)
+        elif 'watched' in due:
+            watched_pids = self.schedule.watched
+            watched = self.collect_table(current_time, sorted(watched_pids))
+
+        time_delta = current_time - self.last_time
+
+        if time_delta > 0:
+            net_sent = (current_net.bytes_sent - self.last_net_io.bytes_sent) / time_delta / 1024
+            net_recv = (current_net.bytes_recv - self.last_net_io.bytes_recv) / time_delta / 1024
+        else:
+            net_sent = net_recv = 0
+
+        self.last_net_io = current_net
+
+        current_disk = psutil.disk_io_counters()
+        if current_disk and self.last_disk_io and time_delta > 0:
+            disk_read = (current_disk.read_bytes - self.last_disk_io.read_bytes) / time_delta / (1024*1024)
+            disk_write = (current_disk.write_bytes - self.last_disk_io.write_bytes) / time_delta / (1024*1024)
+            disk_total = disk_read + disk_write
+        else:
+            disk_total = 0
+
+        self.last_disk_io = current_disk if current_disk else self.last_disk_io
+        self.last_time = current_time
+        per_cpu, nics, disks = self.sample_devices(current_time)
+
+        return Sample(
+            timestamp=current_time,
+            cpu=cpu,
+            memory=memory,
+            process_count=len(table) if table is not None else None,
+            net_sent=net_sent,
+            net_recv=net_recv,
+            disk_total=disk_total,
+            table=table,
+            watched=watched,
+            watched_pids=watched_pids,
+            per_cpu=per_cpu,
+            nics=nics,
+            disks=disks
+        )
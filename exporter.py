@@ -0,0 +1,107 @@
+import csv
+import gzip
+import json
+import lzma
+import threading
+
+
+# Raw, typed columns exported for each process row
+PROCESS_FIELDS = ('pid', 'name', 'status', 'cpu_percent', 'memory_percent', 'rss_bytes',
+                  'threads', 'user', 'create_time')
+
+SNAPSHOT_FIELDS = ('pid', 'name', 'cpu_percent', 'memory_percent', 'rss_bytes', 'threads', 'create_time')
+
+FILETYPES = [("CSV", "*.csv"), ("CSV, gzip", "*.csv.gz"), ("CSV, xz", "*.csv.xz"),
+             ("NDJSON", "*.ndjson"), ("NDJSON, gzip", "*.ndjson.gz"), ("NDJSON, xz", "*.ndjson.xz"),
+             ("All files", "*.*")]
+
+
+def table_records(table):
+    """One tuple of raw values per row of a ProcessTable"""
+    for i in range(len(table)):
+        yield (table.pid[i], table.name(i), table.status(i), table.cpu[i], table.memory[i],
+               table.rss[i], table.threads[i], table.username(i), table.create_time[i])
+
+
+def snapshot_records(snapshot):
+    for i in range(len(snapshot)):
+        yield (snapshot.pid[i], snapshot.name(i), snapshot.cpu[i], snapshot.memory[i],
+               snapshot.rss[i], snapshot.threads[i], snapshot.create_time[i])
+
+
+def open_output(path):
+    """Text stream for `path`, compressed according to its extension"""
+    if path.endswith('.gz'):
+        return gzip.open(path, 'wt', encoding='utf-8', newline='')
+    if path.endswith('.xz') or path.endswith('.lzma'):
+        # Preset 1 keeps the encoder near 10 MB; the default reserves ~95 MB
+        return lzma.open(path, 'wt', encoding='utf-8', newline='', preset=1)
+    return open(path, 'w', encoding='utf-8', newline='')
+
+
+def is_ndjson(path):
+    base, _, extension = path.rpartition('.')
+    if extension not in ('gz', 'xz', 'lzma'):
+        base = path
+    return base.endswith(('.ndjson', '.jsonl', '.json'))
+
+
+def write(path, fields, records, progress=None, cancelled=None, every=2000):
+    """Stream records to `path` as CSV or NDJSON; returns the number of rows written.
+
+    Records are consumed one at a time, so memory does not depend on the
+    number of rows. progress(rows) is called every `every` rows, and the
+    export stops early if cancelled() turns true.
+    """
+    count = 0
+    with open_output(path) as f:
+        if is_ndjson(path):
+            dumps = json.dumps
+            emit = lambda record: f.write(dumps(dict(zip(fields, record))) + "\n")
+        else:
+            writer = csv.writer(f)
+            writer.writerow(fields)
+            emit = writer.writerow
+        for record in records:
+            emit(record)
+            count += 1
+            if count % every == 0:
+                if cancelled is not None and cancelled():
+                    break
+                if progress is not None:
+                    progress(count)
+    return count
+
+
+class ExportJob(threading.Thread):
+    """Runs one write() on a worker thread; the GUI polls `done`, `rows` and `error`"""
+
+    def __init__(self, path, fields, records, total=None):
+        super().__init__(name="exporter", daemon=True)
+        self.path = path
+        self.fields = fields
+        self.records = records
+        self.total = total
+        self.rows = 0
+        self.done = False
+        self.error = None
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def run(self):
+        try:
+            self.rows = write(self.path, self.fields, self.records,
+                              progress=self.set_progress, cancelled=self._cancel.is_set)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+
+    def set_progress(self, rows):
+        self.rows = rows
@@ -0,0 +1,315 @@
+"""Rule conditions: a small expression language compiled to closures.
+
+    user == "ci" and rss_mb > 4096 and threads > 500 and runtime > 10m
+    cmdline ~ /gradle/ and io_write_mbps > 200
+    not (status == "sleeping") or cpu >= 50
+
+Comparisons are joined with and/or/not and parentheses. Numbers compare
+with < <= > >= == !=; strings with == != and regexes with ~ !~. Runtime
+takes s/m/h/d units. A condition is parsed once and compiled to a
+function of (table, row, state), where state is the rules.Breach that
+carries the smoothed CPU/memory and I/O rates of that process.
+
+Comparisons on plain table columns (names, users, rss, threads, runtime,
+...) also compile to whole-column masks, so selector() can narrow a
+table to candidate rows before any per-row closure runs.
+"""
+import re
+import operator
+from itertools import compress, repeat
+
+from process_table import ProcessTable
+
+
+class ExpressionError(ValueError):
+    pass
+
+
+MB = 1024 * 1024
+
+# field: (kind, getter(table, i, state))
+FIELDS = {
+    'name': ('str', lambda t, i, s: t.names[t.name_id[i]]),
+    'user': ('str', lambda t, i, s: t.users[t.user_id[i]]),
+    'status': ('str', lambda t, i, s: t.statuses[t.status_id[i]]),
+    'cmdline': ('str', lambda t, i, s: t.cmdline[i] if t.cmdline is not None else ''),
+    'pid': ('num', lambda t, i, s: t.pid[i]),
+    'ppid': ('num', lambda t, i, s: t.ppid[i]),
+    'cpu': ('num', lambda t, i, s: s.cpu),
+    'memory': ('num', lambda t, i, s: s.memory),
+    'rss_mb': ('num', lambda t, i, s: t.rss[i] / MB),
+    'threads': ('num', lambda t, i, s: t.threads[i]),
+    'runtime': ('time', lambda t, i, s: t.timestamp - t.create_time[i]),
+    'io_read_mbps': ('num', lambda t, i, s: s.read_mbps),
+    'io_write_mbps': ('num', lambda t, i, s: s.write_mbps),
+}
+
+# Fields the collector only reads when asked to
+CMDLINE_FIELDS = frozenset({'cmdline'})
+IO_FIELDS = frozenset({'io_read_mbps', 'io_write_mbps'})
+
+UNITS = {'': 1, 's': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+COMPARE = {'>': operator.gt, '>=': operator.ge, '<': operator.lt, '<=': operator.le,
+           '==': operator.eq, '!=': operator.ne}
+
+# Comparison with the operands swapped: runtime > k is create_time < now - k
+SWAPPED = {'>': '<', '>=': '<=', '<': '>', '<=': '>=', '==': '==', '!=': '!='}
+
+# Fields stored as table columns: (pool, ID column) for strings, (column, scale) for numbers
+STRING_COLUMNS = ProcessTable.STRING_COLUMNS
+NUMBER_COLUMNS = {'pid': ('pid', 1), 'ppid': ('ppid', 1), 'threads': ('threads', 1), 'rss_mb': ('rss', MB)}
+
+TOKEN = re.compile(r'''\s*(?:
+    (?P<number>(?:\d+\.?\d*|\.\d+))(?P<unit>[A-Za-z]*)
+  | (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+  | (?P<regex>/(?:[^/\\]|\\.)+/)
+  | (?P<op>>=|<=|==|!=|!~|[<>~()])
+  | (?P<word>[A-Za-z_]\w*)
+)''', re.VERBOSE)
+
+
+def tokenize(text):
+    tokens = []
+    pos = 0
+    text = text.rstrip()
+    while pos < len(text):
+        while text[pos].isspace():
+            pos += 1  # so error columns point at the token, not the blank before it
+        match = TOKEN.match(text, pos)
+        if match is None or match.end() == pos:
+            raise ExpressionError(f"unexpected {text[pos:].strip()[:10]!r} at column {pos + 1}")
+        kind = match.lastgroup if match.lastgroup != 'unit' else 'number'
+        if kind == 'number':
+            unit = match.group('unit')
+            if unit not in UNITS:
+                raise ExpressionError(f"unknown unit {unit!r} (use s, m, h or d)")
+            tokens.append(('number', (float(match.group('number')), unit), pos))
+        elif kind == 'string':
+            tokens.append(('string', re.sub(r'\\(.)', r'\1', match.group('string')[1:-1]), pos))
+        elif kind == 'regex':
+            source = match.group('regex')[1:-1].replace('\\/', '/')
+            try:
+                tokens.append(('regex', re.compile(source, re.IGNORECASE), pos))
+            except re.error as e:
+                raise ExpressionError(f"bad regex /{source}/: {e}")
+        elif kind == 'word' and match.group('word') in ('and', 'or', 'not'):
+            tokens.append((match.group('word'), None, pos))
+        else:
+            tokens.append((kind, match.group(kind), pos))
+        pos = match.end()
+    return tokens
+
+
+class Parser:
+    """Recursive descent over the tokens; builds a tuple tree"""
+
+    def __init__(self, text):
+        self.tokens = tokenize(text)
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos][0] if self.pos < len(self.tokens) else None
+
+    def take(self, kind=None):
+        if self.pos >= len(self.tokens):
+            raise ExpressionError("unexpected end of condition")
+        token = self.tokens[self.pos]
+        if kind is not None and token[0] != kind:
+            raise ExpressionError(f"expected {kind} at column {token[2] + 1}")
+        self.pos += 1
+        return token
+
+    def parse(self):
+        if not self.tokens:
+            raise ExpressionError("empty condition")
+        tree = self.parse_or()
+        if self.pos < len(self.tokens):
+            raise ExpressionError(f"unexpected input at column {self.tokens[self.pos][2] + 1}")
+        return tree
+
+    def parse_or(self):
+        terms = [self.parse_and()]
+        while self.peek() == 'or':
+            self.take()
+            terms.append(self.parse_and())
+        return terms[0] if len(terms) == 1 else ('or', terms)
+
+    def parse_and(self):
+        terms = [self.parse_not()]
+        while self.peek() == 'and':
+            self.take()
+            terms.append(self.parse_not())
+        return terms[0] if len(terms) == 1 else ('and', terms)
+
+    def parse_not(self):
+        if self.peek() == 'not':
+            self.take()
+            return ('not', self.parse_not())
+        if self.peek() == 'op' and self.tokens[self.pos][1] == '(':
+            self.take()
+            tree = self.parse_or()
+            _, value, pos = self.take('op')
+            if value != ')':
+                raise ExpressionError(f"expected ) at column {pos + 1}")
+            return tree
+        return self.parse_compare()
+
+    def parse_compare(self):
+        _, field, pos = self.take('word')
+        if field not in FIELDS:
+            raise ExpressionError(f"unknown field {field!r}; fields are {', '.join(FIELDS)}")
+        kind = FIELDS[field][0]
+        _, op, op_pos = self.take('op')
+        value_kind, value, value_pos = self.take()
+        if op in ('~', '!~'):
+            if kind != 'str' or value_kind != 'regex':
+                raise ExpressionError(f"{op} needs a text field and a /regex/ (column {op_pos + 1})")
+        elif op not in COMPARE:
+            raise ExpressionError(f"expected a comparison at column {op_pos + 1}")
+        elif kind == 'str':
+            if value_kind != 'string' or op not in ('==', '!='):
+                raise ExpressionError(f"{field} compares with == or != and a quoted string")
+        else:
+            if value_kind != 'number':
+                raise ExpressionError(f"{field} compares with a number (column {value_pos + 1})")
+            number, unit = value
+            if unit and kind != 'time':
+                raise ExpressionError(f"{field} takes no unit")
+            value = number * UNITS[unit]
+        return ('compare', field, op, value)
+
+
+def parse(text):
+    """Tuple tree for a condition; raises ExpressionError with the reason"""
+    return Parser(text).parse()
+
+
+def fields(tree):
+    """Names of the fields a tree reads"""
+    if tree[0] == 'compare':
+        return {tree[1]}
+    if tree[0] == 'not':
+        return fields(tree[1])
+    return set().union(*map(fields, tree[1]))
+
+
+def evaluator(tree, margin=0.0):
+    """Closure (table, i, state) -> bool for a tree.
+
+    With a margin, > and < thresholds are relaxed by that fraction, which
+    gives the looser "still breaching" test used for hysteresis; `not`
+    flips the direction for its operand.
+    """
+    node = tree[0]
+    if node == 'compare':
+        _, field, op, value = tree
+        get = FIELDS[field][1]
+        if FIELDS[field][0] == 'str':
+            test = text_test(op, value)
+            return lambda t, i, s: test(get(t, i, s))
+        value = relaxed(op, value, margin)
+        test = COMPARE[op]
+        return lambda t, i, s: test(get(t, i, s), value)
+    if node == 'not':
+        operand = evaluator(tree[1], -margin)
+        return lambda t, i, s: not operand(t, i, s)
+    # Chains of two-operand closures short-circuit without a generator per row
+    terms = [evaluator(term, margin) for term in tree[1]]
+    combined = terms[-1]
+    for term in reversed(terms[:-1]):
+        combined = both(term, combined) if node == 'and' else either(term, combined)
+    return combined
+
+
+def both(a, b):
+    return lambda t, i, s: a(t, i, s) and b(t, i, s)
+
+
+def either(a, b):
+    return lambda t, i, s: a(t, i, s) or b(t, i, s)
+
+
+def relaxed(op, value, margin):
+    if op in ('>', '>='):
+        return value - abs(value) * margin
+    if op in ('<', '<='):
+        return value + abs(value) * margin
+    return value
+
+
+def text_test(op, value):
+    """str -> bool for a text comparison"""
+    if op == '~':
+        return lambda text: value.search(text) is not None
+    if op == '!~':
+        return lambda text: value.search(text) is None
+    return value.__eq__ if op == '==' else value.__ne__
+
+
+def column_mask(tree, margin):
+    """(build(table) -> iterable of bools, exact) for the column-only part of a tree, or None.
+
+    `exact` is false when comparisons on per-process state were left out;
+    the mask then only rules rows out, which is all `not` cannot use.
+    """
+    node = tree[0]
+    if node == 'compare':
+        _, field, op, value = tree
+        if field in STRING_COLUMNS:
+            pool, column = STRING_COLUMNS[field]
+            test = text_test(op, value)
+
+            def build(t):
+                ids = {k for k, text in enumerate(getattr(t, pool)) if test(text)}
+                return map(ids.__contains__, getattr(t, column))
+        elif field == 'cmdline':
+            test = text_test(op, value)
+
+            def build(t):
+                return map(test, t.cmdline if t.cmdline is not None else repeat('', len(t)))
+        elif field in NUMBER_COLUMNS:
+            column, scale = NUMBER_COLUMNS[field]
+            test, limit = COMPARE[op], relaxed(op, value, margin) * scale
+
+            def build(t):
+                return map(test, getattr(t, column), repeat(limit))
+        elif field == 'runtime':
+            test, limit = COMPARE[SWAPPED[op]], relaxed(op, value, margin)
+
+            def build(t):
+                return map(test, t.create_time, repeat(t.timestamp - limit))
+        else:
+            return None
+        return build, True
+    if node == 'not':
+        inner = column_mask(tree[1], -margin)
+        if inner is None or not inner[1]:
+            return None
+        build = inner[0]
+        return (lambda t: map(operator.not_, build(t))), True
+    parts = [column_mask(term, margin) for term in tree[1]]
+    masks = [part for part in parts if part is not None]
+    if node == 'or' and len(masks) < len(parts):
+        return None  # a term the columns cannot decide might hold for any row
+    if not masks:
+        return None
+    exact = len(masks) == len(parts) and all(part[1] for part in masks)
+    builds = [build for build, _ in masks]
+    combine = operator.and_ if node == 'and' else operator.or_
+
+    def build(t):
+        mask = builds[0](t)
+        for other in builds[1:]:
+            mask = map(combine, mask, other(t))
+        return mask
+    return build, exact
+
+
+def selector(tree, margin=0.0):
+    """table -> set of rows that can satisfy the tree, or None if the columns cannot tell"""
+    mask = column_mask(tree, margin)
+    if mask is None:
+        return None
+    build = mask[0]
+    return lambda t: set(compress(range(len(t)), build(t)))
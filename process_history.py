@@ -0,0 +1,123 @@
+from array import array
+from collections import OrderedDict
+
+
+class ProcessHistory:
+    """Short, fixed-length series of CPU, RSS, threads and I/O for every process.
+
+    Each process owns one slot in preallocated slabs: one typed array per
+    field holding `max_processes * length` values, written as a per-slot
+    ring. Slots are keyed by (pid, create_time) and handed out from a free
+    list; when a process exits its slot is kept for `tail` seconds so the
+    last moments stay visible, then returned to the list. If churn fills
+    every slot, the longest-exited processes are reclaimed first and any
+    process beyond that is simply not recorded, so memory never grows past
+    the configured cap.
+    """
+
+    FIELDS = ('cpu', 'rss_mb', 'threads', 'io_kbps')
+
+    def __init__(self, length=150, max_processes=2048, tail=60.0):
+        self.length = length
+        self.capacity = max_processes
+        self.tail = tail
+        size = length * max_processes
+        self.slabs = {field: array('f', [0.0]) * size for field in self.FIELDS}
+        self.heads = array('L', [0]) * max_processes
+        self.counts = array('L', [0]) * max_processes
+        # Previous cumulative I/O per slot, to turn counters into rates
+        self.last_io = array('d', [0.0]) * max_processes
+        self.last_time = array('d', [0.0]) * max_processes
+        self.free = list(range(max_processes - 1, -1, -1))
+        self.slots = {}  # (pid, create_time): slot
+        self.live = set()
+        self.exited = OrderedDict()  # (pid, create_time): exit time, oldest first
+        self.dropped = 0  # processes not recorded because every slot was taken
+
+    def __len__(self):
+        return len(self.slots)
+
+    def __contains__(self, key):
+        return key in self.slots
+
+    def allocate(self, key):
+        if not self.free:
+            if not self.exited:
+                return None
+            old, _ = self.exited.popitem(last=False)
+            self.free.append(self.slots.pop(old))
+        slot = self.free.pop()
+        self.heads[slot] = 0
+        self.counts[slot] = 0
+        self.last_time[slot] = 0.0
+        self.slots[key] = slot
+        return slot
+
+    def release(self, key):
+        self.free.append(self.slots.pop(key))
+
+    def record(self, table):
+        """Append one tick of a full ProcessTable to every live process's series"""
+        now = table.timestamp
+        length = self.length
+        cpu, rss, threads, io = (self.slabs[field] for field in self.FIELDS)
+        has_io = table.io_read is not None
+        keys = list(zip(table.pid, table.create_time))
+
+        # Exits first, so a slot freed this tick can go to a process that started this tick
+        current = set(keys)
+        for key in self.live - current:
+            if key in self.slots:
+                self.exited[key] = now
+        # A reused key cannot come back, but a process missed for one tick can
+        for key in current & self.exited.keys():
+            del self.exited[key]
+        self.live = current
+
+        for i, key in enumerate(keys):
+            slot = self.slots.get(key)
+            if slot is None:
+                slot = self.allocate(key)
+                if slot is None:
+                    self.dropped += 1
+                    continue
+            pos = slot * length + self.heads[slot]
+            cpu[pos] = table.cpu[i]
+            rss[pos] = table.rss[i] / (1024 * 1024)
+            threads[pos] = table.threads[i]
+            if has_io:
+                total = table.io_read[i] + table.io_write[i]
+                elapsed = now - self.last_time[slot]
+                previous = self.last_io[slot]
+                if self.last_time[slot] and elapsed > 0 and total >= previous:
+                    io[pos] = (total - previous) / elapsed / 1024
+                else:
+                    io[pos] = 0.0
+                self.last_io[slot] = total
+                self.last_time[slot] = now
+            else:
+                io[pos] = 0.0
+            self.heads[slot] = (self.heads[slot] + 1) % length
+            if self.counts[slot] < length:
+                self.counts[slot] += 1
+
+        while self.exited:
+            key, ended = next(iter(self.exited.items()))
+            if now - ended < self.tail:
+                break
+            del self.exited[key]
+            self.release(key)
+
+    def series(self, key, field):
+        """Values of one field for a process, oldest first; empty if not recorded"""
+        slot = self.slots.get(key)
+        if slot is None:
+            return []
+        length = self.length
+        count = self.counts[slot]
+        head = self.heads[slot]
+        base = slot * length
+        values = self.slabs[field]
+        if count < length:
+            return values[base:base + count].tolist()
+        return values[base + head:base + length].tolist() + values[base:base + head].tolist()
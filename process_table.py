@@ -0,0 +1,223 @@
+import heapq
+from array import array
+from datetime import datetime
+from itertools import compress
+
+
+def format_runtime(create_time, now=None):
+    """Format a process runtime the way the Processes tab shows it"""
+    if not create_time:
+        return "N/A"
+    runtime = (now or datetime.now()) - datetime.fromtimestamp(create_time)
+    if runtime.days > 0:
+        return f"{runtime.days}d {runtime.seconds//3600}h"
+    elif runtime.seconds >= 3600:
+        return f"{runtime.seconds//3600}h {(runtime.seconds//60)%60}m"
+    return f"{runtime.seconds//60}m"
+
+
+class StringPool:
+    """Interns strings to small integer IDs that stay stable across ticks.
+
+    Only the collector thread adds strings; readers index `strings` with IDs
+    they got from a table, which is safe because the list only ever grows.
+    """
+
+    def __init__(self):
+        self.strings = []
+        self.ids = {}
+
+    def intern(self, value):
+        if value is None:
+            value = 'N/A'
+        sid = self.ids.get(value)
+        if sid is None:
+            sid = self.ids[value] = len(self.strings)
+            self.strings.append(value)
+        return sid
+
+
+# Typed columns of a ProcessTable and their array typecodes
+COLUMNS = (
+    ('pid', 'l'), ('cpu', 'd'), ('memory', 'd'), ('rss', 'Q'), ('threads', 'L'),
+    ('create_time', 'd'), ('name_id', 'L'), ('user_id', 'L'), ('status_id', 'L'), ('ppid', 'l'),
+)
+
+
+class TableBuilder:
+    """Accumulates one tick of process data straight into typed columns"""
+
+    def __init__(self, names, users, statuses, with_cmdline=False, with_io=False):
+        self.names = names
+        self.users = users
+        self.statuses = statuses
+        for column, typecode in COLUMNS:
+            setattr(self, column, array(typecode))
+        # Command lines are costly to read, so they are only collected on request
+        self.cmdline = [] if with_cmdline else None
+        # Cumulative I/O bytes need one more read per process, so they are optional too
+        self.io_read = array('Q') if with_io else None
+        self.io_write = array('Q') if with_io else None
+
+    def add(self, pid, name, status, cpu, memory, rss, threads, username, create_time, cmdline=None,
+            io_read=0, io_write=0, ppid=0):
+        self.pid.append(pid)
+        self.cpu.append(cpu)
+        self.memory.append(memory)
+        self.rss.append(rss)
+        self.threads.append(threads or 0)
+        self.create_time.append(create_time or 0.0)
+        self.name_id.append(self.names.intern(name))
+        self.user_id.append(self.users.intern(username))
+        self.status_id.append(self.statuses.intern(status))
+        self.ppid.append(ppid or 0)
+        if self.cmdline is not None:
+            self.cmdline.append(cmdline or '')
+        if self.io_read is not None:
+            self.io_read.append(io_read or 0)
+            self.io_write.append(io_write or 0)
+
+    def build(self, timestamp):
+        return ProcessTable(self, timestamp)
+
+
+class ProcessTable:
+    """Read-only, column-oriented view of every process captured in one tick.
+
+    Built once per tick on the collector thread and shared by the process
+    list, the Monitor tab, the auto-kill rules, snapshots and export, so
+    none of them has to enumerate processes on its own. Each attribute is a
+    typed array indexed by row number; names, users and statuses are stored
+    as IDs into shared string pools. Hot paths (filtering, sorting, top-N,
+    thresholds) work on whole columns; `row(i)` builds a dict for the few
+    consumers that want one.
+    """
+
+    __slots__ = tuple(column for column, _ in COLUMNS) + ('timestamp', 'cmdline', 'io_read', 'io_write',
+                                                         'names', 'users', 'statuses', 'index',
+                                                         'children')
+
+    # Interned columns: (string pool, ID column) for each sortable name
+    STRING_COLUMNS = {'name': ('names', 'name_id'), 'user': ('users', 'user_id'),
+                      'status': ('statuses', 'status_id')}
+
+    def __init__(self, builder, timestamp):
+        self.timestamp = timestamp
+        for column, _ in COLUMNS:
+            setattr(self, column, getattr(builder, column))
+        self.cmdline = builder.cmdline
+        self.io_read = builder.io_read
+        self.io_write = builder.io_write
+        self.names = builder.names.strings
+        self.users = builder.users.strings
+        self.statuses = builder.statuses.strings
+        self.index = dict(zip(self.pid, range(len(self.pid))))
+        self.children = None  # ppid: child rows, built on first descendants() call
+
+    @classmethod
+    def empty(cls, timestamp=0.0):
+        return TableBuilder(StringPool(), StringPool(), StringPool()).build(timestamp)
+
+    def __len__(self):
+        return len(self.pid)
+
+    def __iter__(self):
+        return map(self.row, range(len(self.pid)))
+
+    def __contains__(self, pid):
+        return pid in self.index
+
+    def descendants(self, pids):
+        """Rows of every process below `pids`, parents before children"""
+        children = self.children
+        if children is None:
+            children = self.children = {}
+            for i, ppid in enumerate(self.ppid):
+                children.setdefault(ppid, []).append(i)
+        seen = set(pids)
+        parents = list(pids)
+        rows = []
+        for parent in parents:
+            for i in children.get(parent, ()):
+                pid = self.pid[i]
+                if pid not in seen:
+                    seen.add(pid)
+                    rows.append(i)
+                    parents.append(pid)
+        return rows
+
+    def iid(self, i):
+        """Treeview item id for a row"""
+        return f"{self.pid[i]}-{self.create_time[i]}"
+
+    def name(self, i):
+        return self.names[self.name_id[i]]
+
+    def username(self, i):
+        return self.users[self.user_id[i]]
+
+    def status(self, i):
+        return self.statuses[self.status_id[i]]
+
+    def memory_mb(self, i):
+        return round(self.rss[i] / (1024 * 1024), 1)
+
+    def row(self, i):
+        """Row i as a dict, for consumers that are not on a hot path"""
+        return {
+            'pid': self.pid[i],
+            'name': self.name(i),
+            'status': self.status(i),
+            'cpu': self.cpu[i],
+            'memory': self.memory[i],
+            'memory_mb': self.memory_mb(i),
+            'threads': self.threads[i],
+            'username': self.username(i),
+            'create_time': self.create_time[i],
+            'runtime': format_runtime(self.create_time[i])
+        }
+
+    def get(self, pid):
+        """Row for a PID, or None if the process was not alive this tick"""
+        i = self.index.get(pid)
+        return None if i is None else self.row(i)
+
+    def select_ids(self, ids, column):
+        """Indices of rows whose interned ID in `column` is in `ids`"""
+        return list(compress(range(len(self.pid)), map(ids.__contains__, column)))
+
+    def above(self, column, threshold):
+        """Set of indices whose value in a numeric column exceeds threshold"""
+        values = getattr(self, column)
+        return set(compress(range(len(values)), map(float(threshold).__lt__, values)))
+
+    def sort_keys(self, column):
+        """Per-row sort key sequence for a numeric or interned string column"""
+        if column in self.STRING_COLUMNS:
+            pool, id_column = self.STRING_COLUMNS[column]
+            strings, ids = getattr(self, pool), getattr(self, id_column)
+            # Rank each distinct string once, then map rows to ranks
+            distinct = sorted(set(ids), key=lambda sid: strings[sid].lower())
+            rank = dict(zip(distinct, range(len(distinct))))
+            return list(map(rank.__getitem__, ids))
+        return getattr(self, column)
+
+    def order(self, column, reverse=False, indices=None, limit=None):
+        """Row indices ordered by a column, optionally only the first `limit` of them.
+
+        With a limit this is a partial heap select, so "top 50 by CPU" does
+        not pay for sorting every row.
+        """
+        keys = self.sort_keys(column)
+        if indices is None:
+            indices = range(len(self.pid))
+        if limit is not None and limit < len(indices):
+            select = heapq.nlargest if reverse else heapq.nsmallest
+            return select(limit, indices, key=keys.__getitem__)
+        return sorted(indices, key=keys.__getitem__, reverse=reverse)
+
+    def levels(self, critical, high):
+        """(critical, high) index sets for CPU or memory above the given percents"""
+        crit = self.above('cpu', critical) | self.above('memory', critical)
+        warn = (self.above('cpu', high) | self.above('memory', high)) - crit
+        return crit, warn
@@ -0,0 +1,228 @@
+import os
+import time
+
+try:
+    import pwd
+except ImportError:  # Windows
+    pwd = None
+
+
+# Single-letter states from /proc/<pid>/stat, named the way psutil names them
+STATUS_NAMES = {
+    'R': 'running', 'S': 'sleeping', 'D': 'disk-sleep', 'T': 'stopped',
+    't': 'tracing-stop', 'Z': 'zombie', 'X': 'dead', 'x': 'dead',
+    'K': 'wake-kill', 'W': 'waking', 'I': 'idle', 'P': 'parked',
+}
+
+
+def is_supported(proc_root='/proc'):
+    return os.path.exists(os.path.join(proc_root, 'self', 'stat')) or \
+        os.path.exists(os.path.join(proc_root, '1', 'stat'))
+
+
+def real_uid(status):
+    """Real uid from the contents of /proc/<pid>/status"""
+    start = status.index(b'\nUid:') + 5
+    return int(status[start:status.index(b'\n', start)].split()[0])
+
+
+class ProcfsBackend:
+    """Linux process reader that goes straight to /proc.
+
+    psutil opens several files per process to answer the nine attributes
+    the process list needs. This backend reads only /proc/<pid>/stat,
+    /proc/<pid>/statm and /proc/<pid>/status into one reused buffer, splits
+    the fixed fields and takes the owner from the real uid on the status
+    "Uid:" line (as psutil does; the /proc/<pid> directory owner is the
+    effective uid, and root for non-dumpable processes), with uid to
+    username resolved through a cache. Names the kernel truncated to 15
+    characters are completed from argv[0] (or the executable) once per
+    process, as psutil does. It fills the same columns as
+    collector.PsutilBackend.
+    """
+
+    name = 'procfs'
+
+    def __init__(self, proc_root='/proc'):
+        self.proc_root = proc_root
+        self.clk_tck = os.sysconf('SC_CLK_TCK')
+        self.page_size = os.sysconf('SC_PAGE_SIZE')
+        self.mem_total = self.read_mem_total()
+        self.boot_time = self.read_boot_time()
+        self.buf = bytearray(4096)
+        self.view = memoryview(self.buf)
+        self.users = {}  # uid: username
+        self.cpu_ticks = {}  # (pid, starttime): (utime + stime, monotonic time)
+        self.long_names = {}  # (pid, starttime): full name where comm was truncated
+
+    def read_boot_time(self):
+        with open(os.path.join(self.proc_root, 'stat'), 'rb') as f:
+            for line in f:
+                if line.startswith(b'btime'):
+                    return float(line.split()[1])
+        return 0.0
+
+    def read_mem_total(self):
+        try:
+            with open(os.path.join(self.proc_root, 'meminfo'), 'rb') as f:
+                for line in f:
+                    if line.startswith(b'MemTotal:'):
+                        return int(line.split()[1]) * 1024
+        except OSError:
+            pass
+        return os.sysconf('SC_PHYS_PAGES') * self.page_size
+
+    def read(self, path):
+        """Read a small /proc file into the shared buffer"""
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            n = os.readv(fd, [self.buf])
+        finally:
+            os.close(fd)
+        return self.view[:n].tobytes()
+
+    def read_all(self, path):
+        """Read a /proc file that can be longer than the buffer"""
+        chunks = []
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            while True:
+                n = os.readv(fd, [self.buf])
+                if not n:
+                    break
+                chunks.append(self.view[:n].tobytes())
+        finally:
+            os.close(fd)
+        return b''.join(chunks)
+
+    def read_cmdline(self, base):
+        """Command line of a process, arguments joined by spaces"""
+        return self.read_all(base + "/cmdline").rstrip(b'\0').replace(b'\0', b' ').decode('utf-8', 'replace')
+
+    def full_name(self, base, comm):
+        """Untruncated name for a comm the kernel cut to 15 characters.
+
+        Like psutil: the basename of argv[0] if it starts with comm, else the
+        basename of the executable, else comm itself.
+        """
+        candidates = []
+        try:
+            argv0 = self.read_all(base + "/cmdline").split(b'\0', 1)[0]
+            candidates.append(os.path.basename(argv0.decode('utf-8', 'replace')))
+        except OSError:
+            pass
+        try:
+            candidates.append(os.path.basename(os.readlink(base + "/exe")))
+        except OSError:
+            pass  # kernel threads and other users' processes
+        for candidate in candidates:
+            if candidate.startswith(comm):
+                return candidate
+        return comm
+
+    def read_io(self, base):
+        """(read_bytes, write_bytes) from /proc/<pid>/io; only readable for our own processes"""
+        try:
+            fields = self.read(base + "/io").split()
+        except OSError:
+            return 0, 0
+        # rchar, wchar, syscr, syscw, read_bytes, write_bytes, ... as "name: value" pairs
+        return int(fields[9]), int(fields[11])
+
+    def username(self, uid):
+        name = self.users.get(uid)
+        if name is None:
+            try:
+                name = pwd.getpwuid(uid).pw_name if pwd else str(uid)
+            except KeyError:
+                name = str(uid)
+            self.users[uid] = name
+        return name
+
+    def pids(self):
+        return [int(entry) for entry in os.listdir(self.proc_root) if entry.isdigit()]
+
+    def collect(self, builder, pids=None):
+        """Read every process (or just `pids`) once into a TableBuilder"""
+        now = time.monotonic()
+        previous = self.cpu_ticks
+        current = {}
+        known_names = self.long_names
+        long_names = {}
+        root = self.proc_root
+        clk_tck = self.clk_tck
+
+        for pid in self.pids() if pids is None else pids:
+            base = f"{root}/{pid}"
+            try:
+                stat = self.read(base + "/stat")
+                statm = self.read(base + "/statm")
+                uid = real_uid(self.read(base + "/status"))
+            except OSError:
+                # Exited between listdir() and the read, or not ours to read
+                continue
+
+            # comm may contain spaces and parentheses; it ends at the last ')'
+            lparen = stat.find(b'(')
+            rparen = stat.rfind(b')')
+            name = stat[lparen + 1:rparen].decode('utf-8', 'replace')
+            fields = stat[rparen + 2:].split()
+            # fields[0] is field 3 (state) in proc(5)
+            state = fields[0].decode()
+            ppid = int(fields[1])
+            ticks = int(fields[11]) + int(fields[12])
+            threads = int(fields[17])
+            starttime = int(fields[19])
+
+            key = (pid, starttime)
+            current[key] = (ticks, now)
+            last = previous.get(key)
+            if last and now > last[1]:
+                cpu = (ticks - last[0]) / clk_tck / (now - last[1]) * 100
+            else:
+                cpu = 0.0
+
+            # The kernel keeps only 15 bytes of comm; resolve longer names once per process
+            if len(stat[lparen + 1:rparen]) >= 15:
+                full = known_names.get(key)
+                if full is None:
+                    full = self.full_name(base, name)
+                long_names[key] = name = full
+
+            rss = int(statm.split(None, 2)[1]) * self.page_size
+
+            cmdline = None
+            if builder.cmdline is not None:
+                try:
+                    cmdline = self.read_cmdline(base)
+                except OSError:
+                    pass
+
+            io_read = io_write = 0
+            if builder.io_read is not None:
+                io_read, io_write = self.read_io(base)
+
+            builder.add(
+                pid=pid,
+                name=name,
+                status=STATUS_NAMES.get(state, state),
+                cpu=round(cpu, 1),
+                memory=round(rss / self.mem_total * 100, 2) if self.mem_total else 0.0,
+                rss=rss,
+                threads=threads,
+                username=self.username(uid),
+                create_time=self.boot_time + starttime / clk_tck,
+                cmdline=cmdline,
+                io_read=io_read,
+                io_write=io_write,
+                ppid=ppid
+            )
+
+        if pids is None:
+            # Exited processes simply do not make it into the new dicts
+            self.cpu_ticks = current
+            self.long_names = long_names
+        else:
+            previous.update(current)
+            known_names.update(long_names)
+
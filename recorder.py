@@ -0,0 +1,187 @@
+"""Headless recording of system and process samples, without tkinter.
+
+    python app.py record --interval 0.5 --out session.bin
+    python app.py record --interval 0.5 --processes 2 --duration 600 --budget 0.03 --out session.bin
+    python app.py record --rules rules.json [--enforce] --out session.bin
+
+A recording is a magic header followed by frames. Each frame is a kind
+byte, a payload length and a timestamp. System frames hold cpu%,
+memory%, disk MB/s and network KB/s as doubles. Process-table frames
+hold a row count and a snapshots.encode() blob, so the GUI imports them
+straight into the snapshot store without re-encoding.
+"""
+import time
+import queue
+import struct
+import argparse
+from bisect import bisect_right
+
+from collector import Collector, Schedule
+from snapshots import encode
+from rules import RuleEngine
+from actions import ActionExecutor, Batch
+from expressions import CMDLINE_FIELDS, IO_FIELDS
+
+
+MAGIC = b'TMREC001'
+FRAME = struct.Struct('<BId')  # kind, payload length, timestamp
+SYSTEM = struct.Struct('<4d')  # cpu %, memory %, disk MB/s, network KB/s
+COUNT = struct.Struct('<I')  # rows in a process-table frame, before the blob
+
+KIND_SYSTEM = 1
+KIND_TABLE = 2
+
+
+def system_values(sample):
+    """The four series the Performance tab graphs, from one Sample"""
+    return (sample.cpu, sample.memory.percent, sample.disk_total, (sample.net_sent + sample.net_recv) / 2)
+
+
+class RecordingWriter:
+    """Appends frames to a recording file; buffered, never fsynced"""
+
+    def __init__(self, path):
+        self.file = open(path, 'wb')
+        self.file.write(MAGIC)
+        self.bytes = len(MAGIC)
+
+    def write(self, kind, timestamp, payload):
+        self.file.write(FRAME.pack(kind, len(payload), timestamp))
+        self.file.write(payload)
+        self.bytes += FRAME.size + len(payload)
+
+    def write_sample(self, sample):
+        self.write(KIND_SYSTEM, sample.timestamp, SYSTEM.pack(*system_values(sample)))
+        if sample.table is not None:
+            self.write(KIND_TABLE, sample.timestamp, COUNT.pack(len(sample.table)) + encode(sample.table))
+
+    def close(self):
+        self.file.close()
+
+
+class Recording:
+    """A recording read back into columns: the system series and the process-table blobs"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a Task Manager recording")
+        self.path = path
+        self.timestamps = []
+        self.columns = ([], [], [], [])  # cpu, memory, disk, network
+        self.tables = []  # (timestamp, row count, blob)
+        view = memoryview(data)
+        offset = len(MAGIC)
+        end = len(data)
+        while offset + FRAME.size <= end:
+            kind, length, timestamp = FRAME.unpack_from(data, offset)
+            offset += FRAME.size
+            if offset + length > end:
+                break  # the recorder was stopped mid-frame
+            if kind == KIND_SYSTEM:
+                self.timestamps.append(timestamp)
+                for column, value in zip(self.columns, SYSTEM.unpack_from(data, offset)):
+                    column.append(value)
+            elif kind == KIND_TABLE:
+                count, = COUNT.unpack_from(data, offset)
+                self.tables.append((timestamp, count, view[offset + COUNT.size:offset + length].tobytes()))
+            offset += length
+
+    def system_at(self, timestamp):
+        """(cpu, memory) of the last system sample at or before a table frame"""
+        i = bisect_right(self.timestamps, timestamp) - 1
+        if i < 0:
+            return 0.0, 0.0
+        return self.columns[0][i], self.columns[1][i]
+
+
+def check_rules(rules, table, actions=None):
+    """Print rule breaches; with an executor, also end the processes"""
+    targets = []
+    for rule, i, breach in rules.evaluate(table):
+        rule.triggers += 1
+        pid = table.pid[i]
+        print(f"Rule {rule.name}: {table.name(i)} (PID {pid}) for {breach.elapsed(table.timestamp):.0f}s, "
+              f"avg CPU {breach.cpu:.1f}% MEM {breach.memory:.1f}%")
+        targets.append((pid, table.create_time[i], table.name(i)))
+    if actions is not None and targets:
+        actions.submit(targets, 'rules', "Auto-kill")
+
+
+def print_action_results(actions):
+    while True:
+        try:
+            result = actions.results.get_nowait()
+        except queue.Empty:
+            return
+        if not isinstance(result, Batch):
+            detail = f" ({result.detail})" if result.detail else ""
+            print(f"  {result.name} (PID {result.pid}): {result.outcome}{detail}")
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog="app.py record", description="Record samples without the GUI")
+    parser.add_argument('--out', required=True, help="recording file to write")
+    parser.add_argument('--interval', type=float, default=1.0, help="seconds between system samples")
+    parser.add_argument('--processes', type=float, default=2.0, help="seconds between process tables")
+    parser.add_argument('--duration', type=float, default=None, help="stop after this many seconds")
+    parser.add_argument('--budget', type=float, default=0.05,
+                        help="CPU share of one core the recorder aims to stay under")
+    parser.add_argument('--backend', default='auto', help="process reader: auto, psutil or procfs")
+    parser.add_argument('--rules', help="auto-kill rules saved from the GUI, evaluated on every table")
+    parser.add_argument('--enforce', action='store_true', help="terminate processes that break a rule "
+                        "(default: only report them)")
+    args = parser.parse_args(argv)
+    rules = RuleEngine.load(args.rules) if args.rules else RuleEngine()
+    actions = ActionExecutor() if args.enforce else None
+
+    schedule = Schedule(system=args.interval, processes=args.processes, budget=args.budget)
+    collector = Collector(backend=args.backend, schedule=schedule)
+    # Only read what the rules' conditions reference
+    collector.want_cmdline = bool(rules.fields & CMDLINE_FIELDS)
+    collector.want_io = bool(rules.fields & IO_FIELDS)
+    writer = RecordingWriter(args.out)
+    print(f"Recording to {args.out} every {args.interval}s (processes every {args.processes}s, "
+          f"{collector.backend.name} backend, budget {args.budget:.0%} of a core). Ctrl+C stops.")
+
+    started_wall = time.monotonic()
+    started_cpu = time.process_time()
+    samples = tables = 0
+    next_report = started_wall + 10
+    collector.start()
+    if actions is not None:
+        actions.start()
+    try:
+        while args.duration is None or time.monotonic() - started_wall < args.duration:
+            try:
+                sample = collector.samples.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            writer.write_sample(sample)
+            samples += 1
+            if sample.table is not None:
+                tables += 1
+                check_rules(rules, sample.table, actions)
+            if actions is not None:
+                print_action_results(actions)
+            now = time.monotonic()
+            if now >= next_report:
+                next_report = now + 10
+                cpu = (time.process_time() - started_cpu) / (now - started_wall)
+                print(f"{samples} samples, {tables} tables, {writer.bytes / 1024:.0f} KB, "
+                      f"CPU {cpu:.1%} of a core, process interval {args.processes * schedule.backoff:.1f}s")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        collector.stop()
+        if actions is not None:
+            actions.stop()
+        writer.close()
+
+    wall = time.monotonic() - started_wall
+    cpu = (time.process_time() - started_cpu) / wall if wall > 0 else 0.0
+    verdict = "within" if cpu <= args.budget else "OVER"
+    print(f"Wrote {samples} samples and {tables} process tables ({writer.bytes / 1024:.0f} KB) in {wall:.0f}s. "
+          f"CPU {cpu:.2%} of a core, {verdict} the {args.budget:.0%} budget.")
+    return 0 if cpu <= args.budget else 2
@@ -0,0 +1,253 @@
+import os
+import re
+import sys
+import json
+import math
+import fnmatch
+
+import expressions
+
+
+# Never targeted by a rule, whatever it matches: the idle task, init and kthreadd
+PROTECTED_PIDS = frozenset({0, 1, 2})
+# Parent of every kernel thread on Linux; those threads cannot be killed anyway
+KTHREADD = 2 if sys.platform.startswith('linux') else None
+
+
+def name_matcher(pattern):
+    """(kind, matcher) for a rule's process name: exact, glob (*?[]) or /regex/"""
+    if len(pattern) > 2 and pattern.startswith('/') and pattern.endswith('/'):
+        return 'regex', re.compile(pattern[1:-1], re.IGNORECASE)
+    if any(c in pattern for c in '*?['):
+        return 'glob', re.compile(fnmatch.translate(pattern.lower()))
+    return 'exact', pattern.lower()
+
+
+class Rule:
+    """One auto-kill rule: a name pattern plus CPU/memory thresholds or a condition.
+
+    Raises re.error for a bad name regex and expressions.ExpressionError
+    for a bad condition. Without a condition the thresholds become
+    "cpu > a or memory > b".
+    """
+
+    def __init__(self, name, cpu_threshold=None, mem_threshold=None, duration=0, active=True, condition=''):
+        self.name = name
+        self.cpu_threshold = cpu_threshold
+        self.mem_threshold = mem_threshold
+        self.duration = duration
+        self.active = active
+        self.condition = condition
+        self.triggers = 0
+        self.last_trigger = None
+        self.kind, self.matcher = name_matcher(name)
+        self.tree = expressions.parse(condition or f"cpu > {cpu_threshold} or memory > {mem_threshold}")
+        self.fields = expressions.fields(self.tree)
+        self.compile(0.0)
+
+    def compile(self, hysteresis):
+        """Build the entry test, the looser hold test used while in breach, and the column prefilter"""
+        self.over = expressions.evaluator(self.tree)
+        self.holds = expressions.evaluator(self.tree, hysteresis)
+        self.candidates = expressions.selector(self.tree, hysteresis)
+
+    def matches_name(self, name):
+        if self.kind == 'exact':
+            return name.lower() == self.matcher
+        if self.kind == 'glob':
+            return self.matcher.match(name.lower()) is not None
+        return self.matcher.search(name) is not None
+
+    def describe(self):
+        if self.condition:
+            return f"{self.name} ({self.condition} for {self.duration}s)"
+        return f"{self.name} (CPU>{self.cpu_threshold}% OR Mem>{self.mem_threshold}% for {self.duration}s)"
+
+    def to_dict(self):
+        return {'name': self.name, 'cpu_threshold': self.cpu_threshold, 'mem_threshold': self.mem_threshold,
+                'duration': self.duration, 'active': self.active, 'condition': self.condition}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['name'], data.get('cpu_threshold'), data.get('mem_threshold'),
+                   data.get('duration', 0), data.get('active', True), data.get('condition', ''))
+
+
+class Breach:
+    """Tracking state of one rule against one process"""
+
+    __slots__ = ('cpu', 'memory', 'time', 'since', 'fired', 'io_read', 'io_write', 'read_mbps', 'write_mbps')
+
+    def __init__(self, cpu, memory, when):
+        self.cpu = cpu  # smoothed
+        self.memory = memory
+        self.time = when
+        self.since = None  # when the condition started to hold
+        self.fired = False
+        self.io_read = self.io_write = None  # cumulative bytes at `time`
+        self.read_mbps = self.write_mbps = 0.0
+
+    def elapsed(self, now):
+        return 0.0 if self.since is None else now - self.since
+
+
+class RuleEngine:
+    """Evaluates every auto-kill rule in one pass over the per-tick ProcessTable.
+
+    Exact-name rules are indexed by lowercase name; glob and regex rules
+    are tested once per distinct name. The result is cached per interned
+    name ID, which stays stable across ticks, so a tick only resolves names
+    it has not seen before and then selects the matching rows in one
+    column scan. Cost grows with matching processes, not rules x processes.
+
+    A rule fires only after a sustained breach. Each (rule, pid, create
+    time) pair smooths CPU and memory with an EWMA whose time constant is
+    the rule's duration (capped at `smoothing` seconds), must meet the
+    rule's condition for `duration` seconds, and fires once. It re-arms
+    only once the condition fails with its thresholds relaxed by
+    `hysteresis`. State lives in a dict rebuilt from the current matches
+    each tick, so state for processes that exited is dropped with the old
+    dict instead of being searched for.
+
+    The task manager itself, PID 0-2 and kernel threads never match, so a
+    broad rule such as '*' with rss_mb > 50 cannot take down init or the
+    app enforcing it.
+    """
+
+    def __init__(self, rules=(), smoothing=10.0, hysteresis=0.1):
+        self.rules = list(rules)
+        self.smoothing = smoothing
+        self.hysteresis = hysteresis
+        self.breaches = {}  # (rule, pid, create_time): Breach
+        self.protected = PROTECTED_PIDS | {os.getpid()}
+        self.compile()
+
+    def __len__(self):
+        return len(self.rules)
+
+    def __iter__(self):
+        return iter(self.rules)
+
+    @property
+    def active(self):
+        return bool(self.exact or self.patterns)
+
+    def compile(self):
+        """Rebuild the indexes; call after adding, removing or toggling rules"""
+        self.exact = {}
+        self.patterns = []
+        self.fields = set()  # read by the active rules; tells the collector what to fetch
+        for rule in self.rules:
+            if not rule.active:
+                continue
+            rule.compile(self.hysteresis)
+            self.fields |= rule.fields
+            if rule.kind == 'exact':
+                self.exact.setdefault(rule.matcher, []).append(rule)
+            else:
+                self.patterns.append(rule)
+        self.strings = None
+        self.by_name_id = {}
+
+    def add(self, rule):
+        self.rules.append(rule)
+        self.compile()
+
+    def remove(self, name):
+        self.rules = [rule for rule in self.rules if rule.name != name]
+        self.compile()
+
+    def clear(self):
+        self.rules.clear()
+        self.compile()
+
+    def rules_for(self, strings, name_id):
+        rules = self.by_name_id.get(name_id)
+        if rules is None:
+            name = strings[name_id]
+            rules = list(self.exact.get(name.lower(), ()))
+            rules.extend(rule for rule in self.patterns if rule.matches_name(name))
+            rules = self.by_name_id[name_id] = tuple(rules)
+        return rules
+
+    def matches(self, table):
+        """(rule, row index) for every active rule and every process it names"""
+        if table.names is not self.strings:
+            # A different string pool means different IDs
+            self.strings = table.names
+            self.by_name_id = {}
+        if not self.active or not len(table):
+            return []
+        strings = self.strings
+        ids = {nid for nid in set(table.name_id) if self.rules_for(strings, nid)}
+        if not ids:
+            return []
+        by_name_id = self.by_name_id
+        name_id, pid, ppid = table.name_id, table.pid, table.ppid
+        protected = self.protected
+        return [(rule, i) for i in table.select_ids(ids, name_id)
+                if pid[i] not in protected and ppid[i] != KTHREADD
+                for rule in by_name_id[name_id[i]]]
+
+    def evaluate(self, table):
+        """(rule, row index, Breach) for every rule that fires on this table"""
+        now = table.timestamp
+        previous = self.breaches
+        breaches = self.breaches = {}
+        fired = []
+        pid, create_time, cpu, memory = table.pid, table.create_time, table.cpu, table.memory
+        io_read, io_write = table.io_read, table.io_write
+        candidates = {}  # rule: rows its column tests allow, built on the rule's first match
+        for rule, i in self.matches(table):
+            if rule.candidates is not None:
+                rows = candidates.get(rule)
+                if rows is None:
+                    rows = candidates[rule] = rule.candidates(table)
+                if i not in rows:
+                    continue
+            key = (rule, pid[i], create_time[i])
+            state = previous.get(key)
+            if state is None:
+                state = Breach(cpu[i], memory[i], now)
+            else:
+                tau = min(rule.duration, self.smoothing)
+                alpha = 1.0 - math.exp(-(now - state.time) / tau) if tau > 0 else 1.0
+                state.cpu += alpha * (cpu[i] - state.cpu)
+                state.memory += alpha * (memory[i] - state.memory)
+                if io_read is not None and state.io_read is not None and now > state.time:
+                    elapsed = (now - state.time) * expressions.MB
+                    state.read_mbps = max(io_read[i] - state.io_read, 0) / elapsed
+                    state.write_mbps = max(io_write[i] - state.io_write, 0) / elapsed
+                state.time = now
+            if io_read is not None:
+                state.io_read = io_read[i]
+                state.io_write = io_write[i]
+            breaches[key] = state
+
+            if state.since is None:
+                if rule.over(table, i, state):
+                    state.since = now
+            elif not rule.holds(table, i, state):
+                state.since = None
+                state.fired = False
+            if state.since is not None and not state.fired and now - state.since >= rule.duration:
+                state.fired = True
+                fired.append((rule, i, state))
+        return fired
+
+    def breaching(self):
+        """Number of processes currently over a threshold, per rule"""
+        counts = {}
+        for (rule, _, _), state in self.breaches.items():
+            if state.since is not None:
+                counts[rule] = counts.get(rule, 0) + 1
+        return counts
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump([rule.to_dict() for rule in self.rules], f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls(Rule.from_dict(data) for data in json.load(f))
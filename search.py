@@ -0,0 +1,103 @@
+import re
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class PoolIndex:
+    """Trigram index over a StringPool's strings, extended as the pool grows.
+
+    Maps each lowercase trigram to the set of string IDs containing it, so a
+    substring query only verifies the few IDs that share all its trigrams.
+    """
+
+    def __init__(self):
+        self.strings = None
+        self.lowered = []
+        self.grams = {}  # trigram: set of string IDs
+
+    def sync(self, strings):
+        if strings is not self.strings:
+            self.strings = strings
+            self.lowered = []
+            self.grams = {}
+        for sid in range(len(self.lowered), len(strings)):
+            text = strings[sid].lower()
+            self.lowered.append(text)
+            for gram in trigrams(text):
+                self.grams.setdefault(gram, set()).add(sid)
+
+    def find(self, term, candidates):
+        """IDs among `candidates` whose string contains the lowercase term"""
+        lowered = self.lowered
+        if len(term) >= 3:
+            ids = None
+            for gram in trigrams(term):
+                hits = self.grams.get(gram)
+                if not hits:
+                    return set()
+                ids = hits if ids is None else ids & hits
+            candidates = ids & candidates
+        return {sid for sid in candidates if term in lowered[sid]}
+
+    def find_regex(self, pattern, candidates):
+        strings = self.strings
+        return {sid for sid in candidates if pattern.search(strings[sid])}
+
+
+class SearchIndex:
+    """In-memory search over the cached per-tick ProcessTable.
+
+    Name and user matching work on distinct interned strings through trigram
+    indexes, so cost grows with the number of distinct names rather than the
+    number of processes. PIDs and command lines are scanned per row, the
+    latter only when the collector has been asked to fetch them.
+    """
+
+    def __init__(self):
+        self.names = PoolIndex()
+        self.users = PoolIndex()
+        self._cache_table = None
+        self._cache_query = None
+        self._cache = None
+
+    def search(self, table, term, match_more=False, match_cmdline=False, regex=False):
+        """Indices of matching rows, in table order. Raises re.error for a bad regex."""
+        term = term.strip()
+        if not term:
+            return range(len(table))
+
+        query = (term, match_more, match_cmdline, regex)
+        if table is self._cache_table and query == self._cache_query:
+            return self._cache
+
+        if regex:
+            pattern = re.compile(term, re.IGNORECASE)
+            test = pattern.search
+        else:
+            pattern = term = term.lower()
+            test = lambda text: term in text.lower()
+
+        hits = set(self._match_pool(self.names, table, table.names, table.name_id, pattern, regex))
+        if match_more:
+            hits.update(self._match_pool(self.users, table, table.users, table.user_id, pattern, regex))
+            if regex or term.isdigit():
+                hits.update(i for i, pid in enumerate(table.pid) if test(str(pid)))
+        if match_cmdline and table.cmdline is not None:
+            hits.update(i for i, cmd in enumerate(table.cmdline) if cmd and test(cmd))
+
+        result = sorted(hits)
+        self._cache_table = table
+        self._cache_query = query
+        self._cache = result
+        return result
+
+    def _match_pool(self, index, table, strings, column, pattern, regex):
+        index.sync(strings)
+        present = set(column)
+        if regex:
+            ids = index.find_regex(pattern, present)
+        else:
+            ids = index.find(pattern, present)
+        return table.select_ids(ids, column) if ids else []
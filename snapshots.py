@@ -0,0 +1,265 @@
+import sys
+import time
+import zlib
+import heapq
+import struct
+from array import array
+from bisect import bisect_right
+from itertools import repeat
+from operator import sub
+from collections import OrderedDict, namedtuple
+
+try:
+    import sqlite3
+except ImportError:  # Python built without sqlite
+    sqlite3 = None
+
+
+# What the History tab lists for each snapshot; the process rows stay encoded
+SnapshotInfo = namedtuple('SnapshotInfo', ['id', 'timestamp', 'count', 'cpu', 'memory', 'description'])
+
+# Encoded columns, in blob order. Sorted PIDs and create times (in centiseconds)
+# are stored as deltas from the previous row; percents as hundredths.
+ENCODED = (('pid', 'q'), ('create_time', 'q'), ('cpu', 'l'), ('memory', 'l'),
+           ('rss', 'Q'), ('threads', 'L'), ('name', 'L'))
+
+HEADER = struct.Struct('<4sI')  # magic, row count
+MAGIC = b'TMS1'
+
+
+def deltas(values):
+    previous = 0
+    out = array('q')
+    for value in values:
+        out.append(value - previous)
+        previous = value
+    return out
+
+
+def undeltas(values):
+    total = 0
+    out = array('q')
+    for value in values:
+        total += value
+        out.append(total)
+    return out
+
+
+def encode(table):
+    """Pack a ProcessTable into one compressed, columnar blob"""
+    order = sorted(range(len(table)), key=table.pid.__getitem__)
+    names = {}
+    columns = {
+        'pid': deltas([table.pid[i] for i in order]),
+        'create_time': deltas([round(table.create_time[i] * 100) for i in order]),
+        'cpu': array('l', [round(table.cpu[i] * 100) for i in order]),
+        'memory': array('l', [round(table.memory[i] * 100) for i in order]),
+        'rss': array('Q', [table.rss[i] for i in order]),
+        'threads': array('L', [table.threads[i] for i in order]),
+        'name': array('L', [names.setdefault(table.name(i), len(names)) for i in order]),
+    }
+    parts = [HEADER.pack(MAGIC, len(order))]
+    for column, typecode in ENCODED:
+        data = columns[column]
+        if sys.byteorder == 'big':
+            data.byteswap()
+        parts.append(data.tobytes())
+    parts.append('\0'.join(names).encode('utf-8'))
+    return zlib.compress(b''.join(parts))
+
+
+class Snapshot:
+    """Decoded process rows of one snapshot, as parallel columns"""
+
+    def __init__(self, info, blob):
+        self.info = info
+        data = zlib.decompress(blob)
+        magic, count = HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError("not a snapshot blob")
+        offset = HEADER.size
+        raw = {}
+        for column, typecode in ENCODED:
+            values = array(typecode)
+            size = values.itemsize * count
+            values.frombytes(data[offset:offset + size])
+            if sys.byteorder == 'big':
+                values.byteswap()
+            raw[column] = values
+            offset += size
+        self.names = data[offset:].decode('utf-8').split('\0') if count else []
+
+        self.pid = undeltas(raw['pid'])
+        self.create_time = [ct / 100 for ct in undeltas(raw['create_time'])]
+        self.cpu = [v / 100 for v in raw['cpu']]
+        self.memory = [v / 100 for v in raw['memory']]
+        self.rss = raw['rss']
+        self.threads = raw['threads']
+        self.name_id = raw['name']
+
+    def __len__(self):
+        return len(self.pid)
+
+    def name(self, i):
+        return self.names[self.name_id[i]]
+
+    def row(self, i):
+        return {
+            'pid': self.pid[i],
+            'name': self.name(i),
+            'cpu': self.cpu[i],
+            'memory': self.memory[i],
+            'memory_mb': round(self.rss[i] / (1024 * 1024), 1),
+            'threads': self.threads[i],
+            'create_time': self.create_time[i],
+        }
+
+    def rows(self):
+        return map(self.row, range(len(self.pid)))
+
+
+class SnapshotStore:
+    """Snapshots kept as compressed columnar blobs with an in-memory time index.
+
+    Only the small SnapshotInfo records are held per snapshot; process rows
+    stay compressed (in memory, or in a SQLite file when `path` is given)
+    and are decoded on demand, with a few recent decodes cached. IDs are
+    unique integers, so two snapshots in the same second stay distinct.
+    """
+
+    def __init__(self, path=None, cache_size=4):
+        self.infos = []  # sorted by (timestamp, id)
+        self.times = []  # timestamps, parallel to infos, for bisect
+        self.by_id = {}
+        self.blobs = {}  # id: blob, when there is no database
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+        self.next_id = 1
+        self.db = None
+        if path:
+            if sqlite3 is None:
+                raise RuntimeError("sqlite3 is not available")
+            self.db = sqlite3.connect(path)
+            self.db.execute("""CREATE TABLE IF NOT EXISTS snapshots (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp REAL, count INTEGER,
+                cpu REAL, memory REAL, description TEXT, data BLOB)""")
+            self.db.execute("CREATE INDEX IF NOT EXISTS snapshots_time ON snapshots(timestamp)")
+            self.db.commit()
+            for row in self.db.execute("SELECT id, timestamp, count, cpu, memory, description "
+                                       "FROM snapshots ORDER BY timestamp, id"):
+                self.index(SnapshotInfo(*row))
+
+    def __len__(self):
+        return len(self.infos)
+
+    def __iter__(self):
+        return iter(self.infos)
+
+    def __contains__(self, snapshot_id):
+        return snapshot_id in self.by_id
+
+    def index(self, info):
+        pos = bisect_right(self.times, info.timestamp)
+        self.infos.insert(pos, info)
+        self.times.insert(pos, info.timestamp)
+        self.by_id[info.id] = info
+        self.next_id = max(self.next_id, info.id + 1)
+
+    def add(self, table, cpu, memory, description='', timestamp=None):
+        """Store a ProcessTable and return its SnapshotInfo"""
+        timestamp = time.time() if timestamp is None else timestamp
+        return self.add_encoded(encode(table), len(table), cpu, memory, description, timestamp)
+
+    def add_encoded(self, blob, count, cpu, memory, description, timestamp, commit=True):
+        """Store a blob from encode(), e.g. one read back from a recording"""
+        if self.db is not None:
+            cursor = self.db.execute(
+                "INSERT INTO snapshots (timestamp, count, cpu, memory, description, data) "
+                "VALUES (?, ?, ?, ?, ?, ?)", (timestamp, count, cpu, memory, description, blob))
+            if commit:
+                self.db.commit()
+            snapshot_id = cursor.lastrowid
+        else:
+            snapshot_id = self.next_id
+            self.blobs[snapshot_id] = blob
+        info = SnapshotInfo(snapshot_id, timestamp, count, cpu, memory, description)
+        self.index(info)
+        return info
+
+    def commit(self):
+        if self.db is not None:
+            self.db.commit()
+
+    def info(self, snapshot_id):
+        return self.by_id.get(snapshot_id)
+
+    def get(self, snapshot_id):
+        """Decoded Snapshot for an ID, or None"""
+        snapshot = self.cache.get(snapshot_id)
+        if snapshot is not None:
+            self.cache.move_to_end(snapshot_id)
+            return snapshot
+        info = self.by_id.get(snapshot_id)
+        if info is None:
+            return None
+        if self.db is not None:
+            blob = self.db.execute("SELECT data FROM snapshots WHERE id = ?", (snapshot_id,)).fetchone()[0]
+        else:
+            blob = self.blobs[snapshot_id]
+        snapshot = self.cache[snapshot_id] = Snapshot(info, blob)
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return snapshot
+
+    def clear(self):
+        if self.db is not None:
+            self.db.execute("DELETE FROM snapshots")
+            self.db.commit()
+        self.infos.clear()
+        self.times.clear()
+        self.by_id.clear()
+        self.blobs.clear()
+        self.cache.clear()
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+
+# Result of comparing two system states. started/exited are row indices into
+# `new`/`old`; the delta lists hold (delta, old index, new index), largest first.
+SnapshotDiff = namedtuple('SnapshotDiff', ['old', 'new', 'started', 'exited', 'cpu', 'rss'])
+
+
+def identity_keys(state):
+    """(pid, create time in centiseconds) per row; snapshots store create times at that precision"""
+    return list(zip(state.pid, [round(ct * 100) for ct in state.create_time]))
+
+
+def diff(old, new, top=10):
+    """Compare two snapshots, or a snapshot and a live ProcessTable.
+
+    A hash join on process identity: one dict built over the old rows, one
+    probe per new row. Rows present in both contribute CPU and RSS deltas,
+    of which only the `top` largest changes in each direction are kept.
+    """
+    old_index = dict(zip(identity_keys(old), range(len(old))))
+    # Popping matches leaves exactly the exited rows behind in old_index
+    probes = list(map(old_index.pop, identity_keys(new), repeat(None)))
+    started = [j for j, i in enumerate(probes) if i is None]
+    matched_new = [j for j, i in enumerate(probes) if i is not None]
+    matched_old = [probes[j] for j in matched_new]
+    exited = sorted(old_index.values())
+
+    def largest(old_values, new_values):
+        changes = list(map(sub, map(new_values.__getitem__, matched_new),
+                           map(old_values.__getitem__, matched_old)))
+        positions = range(len(changes))
+        grew = heapq.nlargest(top, positions, key=changes.__getitem__)
+        shrank = heapq.nsmallest(top, positions, key=changes.__getitem__)
+        return [(changes[k], matched_old[k], matched_new[k]) for k in grew if changes[k] > 0] + \
+               [(changes[k], matched_old[k], matched_new[k]) for k in shrank if changes[k] < 0]
+
+    return SnapshotDiff(old, new, started, exited,
+                        largest(old.cpu, new.cpu), largest(old.rss, new.rss))
@@ -0,0 +1,19 @@
+import os
+import sys
+
+# The modules under test live at the repository root, next to app.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from process_table import StringPool, TableBuilder  # noqa: E402
+
+
+def make_table(rows, timestamp=10000.0, with_cmdline=True, with_io=False):
+    """rows: dicts with any of the TableBuilder.add fields; the rest get defaults"""
+    builder = TableBuilder(StringPool(), StringPool(), StringPool(), with_cmdline=with_cmdline, with_io=with_io)
+    for pid, row in enumerate(rows, start=100):
+        builder.add(pid=row.get('pid', pid), name=row.get('name', 'proc'), status=row.get('status', 'running'),
+                    cpu=row.get('cpu', 0.0), memory=row.get('memory', 0.0), rss=row.get('rss', 0),
+                    threads=row.get('threads', 1), username=row.get('user', 'root'),
+                    create_time=row.get('create_time', timestamp - 60), cmdline=row.get('cmdline', ''),
+                    io_read=row.get('io_read', 0), io_write=row.get('io_write', 0), ppid=row.get('ppid', 1))
+    return builder.build(timestamp)
@@ -0,0 +1,116 @@
+import os
+import sys
+import time
+import queue
+import unittest
+import subprocess
+
+import psutil
+
+from actions import ActionExecutor, Batch
+
+IGNORES_SIGTERM = ("import signal, time; signal.signal(signal.SIGTERM, signal.SIG_IGN); "
+                   "print('ready', flush=True); time.sleep(60)")
+
+
+@unittest.skipIf(os.name != 'posix', "sends POSIX signals")
+class ActionExecutorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.executor = ActionExecutor(grace=0.3, kill_grace=2.0, poll=0.05)
+        self.executor.start()
+        self.addCleanup(self.executor.stop)
+
+    def spawn(self, *argv):
+        child = subprocess.Popen(argv or ['sleep', '60'], stdout=subprocess.PIPE)
+        self.addCleanup(self.reap, child)
+        return child
+
+    def reap(self, child):
+        if child.poll() is None:
+            child.kill()
+        child.wait()
+        child.stdout.close()
+
+    def target(self, child, create_time=None):
+        return (child.pid, create_time or psutil.Process(child.pid).create_time(), 'child')
+
+    def settled(self, child, status):
+        """Process status once it reaches `status`; SIGSTOP lands asynchronously"""
+        deadline = time.monotonic() + 5
+        while psutil.Process(child.pid).status() != status and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return psutil.Process(child.pid).status()
+
+    def run_batch(self, targets, action='terminate', value=None):
+        """Submit a batch and return ({pid: outcome}, finished Batch)"""
+        batch = self.executor.submit(targets, action=action, value=value)
+        outcomes = {}
+        while True:
+            result = self.executor.results.get(timeout=10)
+            if isinstance(result, Batch):
+                self.assertIs(result, batch)
+                return outcomes, batch
+            outcomes[result.pid] = result.outcome
+
+    def test_terminate(self):
+        child = self.spawn()
+        outcomes, batch = self.run_batch([self.target(child)])
+        self.assertEqual(outcomes, {child.pid: 'terminated'})
+        self.assertEqual(batch.summary(), "Terminate 1 process(es): 1/1 ended")
+
+    def test_escalates_to_sigkill(self):
+        child = self.spawn(sys.executable, '-c', IGNORES_SIGTERM)
+        child.stdout.readline()  # SIGTERM is ignored from here on
+        outcomes, batch = self.run_batch([self.target(child)])
+        self.assertEqual(outcomes, {child.pid: 'killed'})
+        self.assertIn("1 needed SIGKILL", batch.summary())
+
+    def test_kill(self):
+        child = self.spawn()
+        self.assertEqual(self.run_batch([self.target(child)], 'kill')[0], {child.pid: 'killed'})
+
+    def test_reused_pid_is_left_alone(self):
+        child = self.spawn()
+        outcomes, batch = self.run_batch([self.target(child, create_time=1.0)])
+        self.assertEqual(outcomes, {child.pid: 'reused'})
+        self.assertIsNone(child.poll())
+        self.assertEqual(batch.failures, [])  # not a failure: the process we saw is gone
+
+    def test_gone(self):
+        child = self.spawn()
+        target = self.target(child)
+        child.kill()
+        child.wait()
+        self.assertEqual(self.run_batch([target])[0], {child.pid: 'gone'})
+
+    def test_mixed_batch(self):
+        children = [self.spawn() for _ in range(3)]
+        stubborn = self.spawn(sys.executable, '-c', IGNORES_SIGTERM)
+        stubborn.stdout.readline()
+        outcomes, batch = self.run_batch([self.target(c) for c in children + [stubborn]])
+        self.assertEqual(sorted(outcomes.values()), ['killed', 'terminated', 'terminated', 'terminated'])
+        self.assertTrue(batch.done)
+
+    def test_suspend_resume_and_priority(self):
+        child = self.spawn()
+        target = self.target(child)
+        self.assertEqual(self.run_batch([target], 'suspend')[0], {child.pid: 'done'})
+        self.assertEqual(self.settled(child, psutil.STATUS_STOPPED), psutil.STATUS_STOPPED)
+        outcomes, batch = self.run_batch([target], 'resume')
+        self.assertEqual((outcomes, batch.summary()), ({child.pid: 'done'}, "Resume 1 process(es): 1/1 resumed"))
+        self.assertEqual(self.run_batch([target], 'priority', 10)[0], {child.pid: 'done'})
+        self.assertEqual(psutil.Process(child.pid).nice(), 10)
+
+    def test_empty_batch_finishes(self):
+        self.assertEqual(self.run_batch([])[0], {})
+
+    def test_unknown_action(self):
+        with self.assertRaises(ValueError):
+            self.executor.submit([], action='explode')
+        with self.assertRaises(queue.Empty):
+            self.executor.results.get(timeout=0.1)
+
+
+if __name__ == '__main__':
+    unittest.main()
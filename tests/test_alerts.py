@@ -0,0 +1,69 @@
+import unittest
+
+from alerts import AlertLog
+
+
+class AlertLogTest(unittest.TestCase):
+
+    def test_repeats_fold_within_window(self):
+        log = AlertLog(window=30.0)
+        first = log.add("disk full", 'warning', when=100.0)
+        self.assertIs(log.add("disk full", 'warning', when=120.0), first)
+        self.assertEqual((len(log), first.count, first.last), (1, 2, 120.0))
+        # Outside the window, or with another severity, it is a new record
+        self.assertIsNot(log.add("disk full", 'warning', when=151.0), first)
+        self.assertIsNot(log.add("disk full", 'critical', when=152.0), first)
+        self.assertEqual(len(log), 3)
+
+    def test_pending_then_recounted(self):
+        log = AlertLog()
+        alert = log.add("cpu high", when=1.0)
+        new, recounted = log.take_pending()
+        self.assertEqual((new, recounted), ([alert], []))
+        log.add("cpu high", when=2.0)
+        log.add("cpu high", when=3.0)
+        new, recounted = log.take_pending()
+        self.assertEqual((new, recounted, alert.count), ([], [alert], 3))
+        self.assertEqual(log.take_pending(), ([], []))
+
+    def test_repeat_of_unshown_alert_is_not_recounted(self):
+        log = AlertLog()
+        alert = log.add("cpu high", when=1.0)
+        log.add("cpu high", when=2.0)
+        self.assertEqual(log.take_pending(), ([alert], []))
+
+    def test_pending_never_outlives_the_ring(self):
+        log = AlertLog(maxlen=3)
+        for k in range(6):
+            log.add(f"alert {k}", when=k * 100.0)
+        new, _ = log.take_pending()
+        self.assertEqual([a.message for a in new], [a.message for a in log])
+        self.assertEqual(len(new), 3)
+
+    def test_evicted_alert_is_not_recounted(self):
+        log = AlertLog(maxlen=2)
+        old = log.add("old", when=0.0)
+        log.take_pending()
+        log.add("old", when=1.0)  # recounted...
+        log.add("b", when=2.0)
+        log.add("c", when=3.0)  # ...then evicted
+        new, recounted = log.take_pending()
+        self.assertNotIn(old, recounted)
+        self.assertEqual([a.message for a in new], ["b", "c"])
+
+    def test_evicted_key_starts_a_new_record(self):
+        log = AlertLog(maxlen=2)
+        first = log.add("x", when=0.0)
+        log.add("y", when=1.0)
+        log.add("z", when=2.0)
+        self.assertIsNot(log.add("x", when=3.0), first)
+
+    def test_clear(self):
+        log = AlertLog()
+        log.add("x")
+        log.clear()
+        self.assertEqual((len(log), log.take_pending()), (0, ([], [])))
+
+
+if __name__ == '__main__':
+    unittest.main()
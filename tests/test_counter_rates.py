@@ -0,0 +1,55 @@
+import unittest
+from collections import namedtuple
+
+from collector import CounterRates, cpu_busy_times
+
+
+class CounterRatesTest(unittest.TestCase):
+
+    def test_first_reading_is_zero(self):
+        rates = CounterRates(2)
+        self.assertEqual(rates.update({'eth0': (100, 200)}, 10.0), {'eth0': (0.0, 0.0)})
+
+    def test_rates(self):
+        rates = CounterRates(2)
+        rates.update({'eth0': (100, 200), 'wlan0': (0, 0)}, 10.0)
+        self.assertEqual(rates.update({'eth0': (300, 200), 'wlan0': (50, 10)}, 12.0),
+                         {'eth0': (100.0, 0.0), 'wlan0': (25.0, 5.0)})
+
+    def test_hotplug(self):
+        rates = CounterRates(2)
+        rates.update({'eth0': (100, 100), 'usb0': (5, 5)}, 10.0)
+        # usb0 unplugged and a new device appears before eth0 in key order
+        self.assertEqual(rates.update({'docker0': (900, 900), 'eth0': (200, 300)}, 11.0),
+                         {'docker0': (0.0, 0.0), 'eth0': (100.0, 200.0)})
+        self.assertEqual(rates.update({'docker0': (1000, 950), 'eth0': (200, 300)}, 12.0),
+                         {'docker0': (100.0, 50.0), 'eth0': (0.0, 0.0)})
+
+    def test_counter_going_backwards_reports_zero(self):
+        rates = CounterRates(1)
+        rates.update({'sda': (2 ** 32 - 10,)}, 10.0)
+        self.assertEqual(rates.update({'sda': (5,)}, 11.0), {'sda': (0.0,)})
+        self.assertEqual(rates.update({'sda': (15,)}, 12.0), {'sda': (10.0,)})
+
+    def test_clock_not_advancing_reports_zero(self):
+        rates = CounterRates(1)
+        rates.update({'sda': (10,)}, 10.0)
+        self.assertEqual(rates.update({'sda': (20,)}, 10.0), {'sda': (0.0,)})
+
+    def test_no_devices(self):
+        rates = CounterRates(2)
+        self.assertEqual(rates.update({}, 1.0), {})
+        self.assertEqual(rates.update({}, 2.0), {})
+
+
+class CpuBusyTimesTest(unittest.TestCase):
+
+    def test_guest_and_iowait(self):
+        Times = namedtuple('Times', 'user nice system idle iowait irq softirq steal guest guest_nice')
+        busy, total = cpu_busy_times(Times(10, 0, 5, 80, 5, 0, 0, 0, 3, 1))
+        # guest time is already counted in user and nice; iowait counts as idle
+        self.assertEqual((busy, total), (15, 100))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,204 @@
+import random
+import unittest
+
+import expressions
+from expressions import ExpressionError, parse, evaluator, selector, column_mask
+from rules import Breach
+from conftest import make_table
+
+
+def states(table):
+    """Breach state per row carrying the raw CPU/memory, as on a process's first tick"""
+    return [Breach(table.cpu[i], table.memory[i], table.timestamp) for i in range(len(table))]
+
+
+def random_table(count=400, seed=7):
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(count):
+        rows.append({
+            'name': rng.choice(['java', 'bash', 'cc1plus', 'python3']),
+            'status': rng.choice(['running', 'sleeping', 'stopped']),
+            'user': rng.choice(['ci', 'root', 'alice']),
+            'cpu': rng.uniform(0, 100), 'memory': rng.uniform(0, 10),
+            'rss': rng.randrange(1, 8192) * expressions.MB, 'threads': rng.randrange(1, 1000),
+            'create_time': 10000.0 - rng.randrange(0, 7200),
+            'cmdline': rng.choice(['java -jar gradle-wrapper.jar', 'bash -c make', '']),
+            'ppid': rng.choice([1, 100, 101, 2]),
+        })
+    return make_table(rows)
+
+
+class ParseErrorTest(unittest.TestCase):
+
+    def assertRejects(self, text, fragment):
+        with self.assertRaises(ExpressionError) as caught:
+            parse(text)
+        self.assertIn(fragment, str(caught.exception))
+
+    def test_empty(self):
+        self.assertRejects('', 'empty condition')
+        self.assertRejects('   ', 'empty condition')
+
+    def test_truncated(self):
+        self.assertRejects('cpu >', 'unexpected end')
+        self.assertRejects('cpu > 1 and', 'unexpected end')
+        self.assertRejects('(cpu > 1', 'unexpected end')
+
+    def test_unknown_field(self):
+        self.assertRejects('load > 1', "unknown field 'load'")
+
+    def test_type_mismatches(self):
+        self.assertRejects('user > 3', 'compares with == or !=')
+        self.assertRejects('user == ci', 'compares with == or !=')
+        self.assertRejects('cpu == "high"', 'compares with a number')
+        self.assertRejects('cmdline ~ "gradle"', 'needs a text field and a /regex/')
+        self.assertRejects('threads ~ /4/', 'needs a text field and a /regex/')
+
+    def test_units(self):
+        self.assertRejects('rss_mb > 10m', 'takes no unit')
+        self.assertRejects('runtime > 5x', "unknown unit 'x'")
+
+    def test_bad_tokens(self):
+        self.assertRejects('cpu > 1 @', "unexpected '@' at column 9")
+        self.assertRejects('name ~ /(/', 'bad regex')
+        self.assertRejects('cpu > 1 cpu > 2', 'unexpected input at column 9')
+        self.assertRejects('(cpu > 1))', 'unexpected input')
+
+
+class ParseTreeTest(unittest.TestCase):
+
+    def test_and_binds_tighter_than_or(self):
+        self.assertEqual(parse('cpu > 1 or cpu > 2 and cpu > 3'),
+                         ('or', [('compare', 'cpu', '>', 1.0),
+                                 ('and', [('compare', 'cpu', '>', 2.0), ('compare', 'cpu', '>', 3.0)])]))
+
+    def test_not_binds_tightest(self):
+        self.assertEqual(parse('not cpu > 1 and cpu > 2'),
+                         ('and', [('not', ('compare', 'cpu', '>', 1.0)), ('compare', 'cpu', '>', 2.0)]))
+
+    def test_parentheses_override(self):
+        self.assertEqual(parse('(cpu > 1 or cpu > 2) and cpu > 3'),
+                         ('and', [('or', [('compare', 'cpu', '>', 1.0), ('compare', 'cpu', '>', 2.0)]),
+                                  ('compare', 'cpu', '>', 3.0)]))
+        self.assertEqual(parse('not (cpu > 1 or cpu > 2)'),
+                         ('not', ('or', [('compare', 'cpu', '>', 1.0), ('compare', 'cpu', '>', 2.0)])))
+
+    def test_values(self):
+        self.assertEqual(parse('runtime > 10m'), ('compare', 'runtime', '>', 600.0))
+        self.assertEqual(parse('runtime <= 1.5h'), ('compare', 'runtime', '<=', 5400.0))
+        self.assertEqual(parse("user == 'o\\'brien'"), ('compare', 'user', '==', "o'brien"))
+        tree = parse('cmdline ~ /a\\/b/')
+        self.assertEqual(tree[3].pattern, 'a/b')
+
+    def test_fields(self):
+        self.assertEqual(expressions.fields(parse('user == "ci" and not (cmdline ~ /x/ or io_write_mbps > 1)')),
+                         {'user', 'cmdline', 'io_write_mbps'})
+
+
+class EvaluatorTest(unittest.TestCase):
+
+    def evaluate(self, text, row, margin=0.0):
+        table = make_table([row])
+        return evaluator(parse(text), margin)(table, 0, states(table)[0])
+
+    def test_boolean_logic(self):
+        row = {'cpu': 50, 'user': 'ci', 'threads': 600}
+        self.assertTrue(self.evaluate('cpu > 40 and user == "ci"', row))
+        self.assertFalse(self.evaluate('cpu > 60 and user == "ci"', row))
+        self.assertTrue(self.evaluate('cpu > 60 or threads > 500', row))
+        self.assertTrue(self.evaluate('not cpu > 60', row))
+        self.assertFalse(self.evaluate('not (cpu > 60 or threads > 500)', row))
+
+    def test_text_fields(self):
+        row = {'name': 'java', 'cmdline': 'java -jar Gradle.jar', 'status': 'sleeping'}
+        self.assertTrue(self.evaluate('cmdline ~ /gradle/', row))  # case-insensitive
+        self.assertTrue(self.evaluate('cmdline !~ /maven/', row))
+        self.assertTrue(self.evaluate('status != "running" and name == "java"', row))
+
+    def test_runtime(self):
+        self.assertTrue(self.evaluate('runtime > 59s', {'create_time': 10000.0 - 60}))
+        self.assertFalse(self.evaluate('runtime > 10m', {'create_time': 10000.0 - 60}))
+
+    def test_margin_relaxes_thresholds(self):
+        row = {'cpu': 95}
+        self.assertFalse(self.evaluate('cpu > 100', row))
+        self.assertTrue(self.evaluate('cpu > 100', row, margin=0.1))
+        row = {'cpu': 10.5}
+        self.assertFalse(self.evaluate('cpu < 10', row))
+        self.assertTrue(self.evaluate('cpu < 10', row, margin=0.1))
+
+    def test_margin_flips_under_not(self):
+        # not (cpu < 10) is cpu >= 10; held while cpu >= 9
+        self.assertFalse(self.evaluate('not cpu < 10', {'cpu': 9.5}))
+        self.assertTrue(self.evaluate('not cpu < 10', {'cpu': 9.5}, margin=0.1))
+        self.assertFalse(self.evaluate('not cpu < 10', {'cpu': 8.5}, margin=0.1))
+
+    def test_margin_leaves_equality_alone(self):
+        self.assertFalse(self.evaluate('threads == 10', {'threads': 9}, margin=0.5))
+
+
+class ColumnMaskTest(unittest.TestCase):
+    """selector() must never drop a row the closures accept, and must be exact when it claims to be"""
+
+    EXPRESSIONS = [
+        'user == "ci" and rss_mb > 4096 and threads > 500 and runtime > 10m',
+        'cmdline ~ /gradle/ and io_write_mbps > 200',
+        'cmdline !~ /gradle/ or threads < 10',
+        '(name == "java" or threads < 10) and not runtime < 5m',
+        'pid != 150 and not (cmdline !~ /bash/)',
+        'not (status == "sleeping") or cpu >= 50',
+        'not (user == "ci" and cpu > 5)',
+        'ppid == 2 or rss_mb <= 100',
+        'not (not (threads >= 500))',
+        'cpu > 50 and (user == "alice" or runtime >= 1h)',
+    ]
+
+    def test_masks_agree_with_closures(self):
+        table = random_table()
+        row_states = states(table)
+        for state in row_states:
+            state.write_mbps = 300.0
+        for text in self.EXPRESSIONS:
+            tree = parse(text)
+            for margin in (0.0, 0.1):
+                with self.subTest(condition=text, margin=margin):
+                    test = evaluator(tree, margin)
+                    accepted = {i for i in range(len(table)) if test(table, i, row_states[i])}
+                    select = selector(tree, margin)
+                    if select is None:
+                        continue
+                    candidates = select(table)
+                    self.assertLessEqual(accepted, candidates)
+                    if column_mask(tree, margin)[1]:
+                        self.assertEqual(accepted, candidates)
+
+    def test_column_only_conditions_are_exact(self):
+        for text in ('user == "ci" and threads > 500', 'not (name == "bash")', 'runtime > 1h or pid < 120'):
+            with self.subTest(condition=text):
+                self.assertTrue(column_mask(parse(text), 0.0)[1])
+
+    def test_state_fields_have_no_mask(self):
+        self.assertIsNone(selector(parse('cpu > 50')))
+        self.assertIsNone(selector(parse('user == "ci" or cpu > 50')))
+        self.assertIsNone(selector(parse('not (user == "ci" and cpu > 50)')))
+        # A conjunction still narrows by its column terms
+        self.assertFalse(column_mask(parse('user == "ci" and cpu > 50'), 0.0)[1])
+
+    def test_hold_mask_covers_entry(self):
+        table = random_table(seed=11)
+        for text in self.EXPRESSIONS:
+            tree = parse(text)
+            entry, hold = selector(tree, 0.0), selector(tree, 0.1)
+            if entry is not None:
+                with self.subTest(condition=text):
+                    self.assertLessEqual(entry(table), hold(table))
+
+    def test_missing_cmdline_column(self):
+        table = make_table([{'cmdline': 'gradle'}], with_cmdline=False)
+        self.assertEqual(selector(parse('cmdline ~ /gradle/'))(table), set())
+        self.assertEqual(selector(parse('cmdline !~ /gradle/'))(table), {0})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+
+from process_history import ProcessHistory
+from conftest import make_table
+
+MB = 1024 * 1024
+
+
+def tick(history, when, rows, with_io=False):
+    table = make_table(rows, timestamp=when, with_io=with_io)
+    history.record(table)
+    return table
+
+
+class ProcessHistoryTest(unittest.TestCase):
+
+    def test_series_ring(self):
+        history = ProcessHistory(length=3, max_processes=4)
+        for k in range(5):
+            tick(history, 100.0 + k, [{'pid': 10, 'cpu': k, 'rss': k * MB, 'threads': k, 'create_time': 1.0}])
+        self.assertEqual(history.series((10, 1.0), 'cpu'), [2.0, 3.0, 4.0])
+        self.assertEqual(history.series((10, 1.0), 'rss_mb'), [2.0, 3.0, 4.0])
+        self.assertEqual(history.series((99, 1.0), 'cpu'), [])
+
+    def test_io_rate(self):
+        history = ProcessHistory(length=4, max_processes=2)
+        for when, total in ((100.0, 0), (102.0, 4096), (104.0, 4096), (105.0, 1024)):
+            tick(history, when, [{'pid': 10, 'create_time': 1.0, 'io_read': total, 'io_write': 0}], with_io=True)
+        # KB/s; no rate on the first tick, and a counter that went backwards reports 0
+        self.assertEqual(history.series((10, 1.0), 'io_kbps'), [0.0, 2.0, 0.0, 0.0])
+
+    def test_exited_process_kept_for_tail(self):
+        history = ProcessHistory(length=4, max_processes=4, tail=10.0)
+        tick(history, 100.0, [{'pid': 10, 'create_time': 1.0}, {'pid': 11, 'create_time': 1.0}])
+        tick(history, 105.0, [{'pid': 10, 'create_time': 1.0}])
+        self.assertIn((11, 1.0), history)
+        tick(history, 116.0, [{'pid': 10, 'create_time': 1.0}])
+        self.assertNotIn((11, 1.0), history)
+        self.assertEqual(len(history.free), 3)
+
+    def test_process_missed_for_a_tick_keeps_its_series(self):
+        history = ProcessHistory(length=4, max_processes=2, tail=10.0)
+        tick(history, 100.0, [{'pid': 10, 'cpu': 1.0, 'create_time': 1.0}])
+        tick(history, 101.0, [])
+        tick(history, 102.0, [{'pid': 10, 'cpu': 2.0, 'create_time': 1.0}])
+        self.assertEqual(history.series((10, 1.0), 'cpu'), [1.0, 2.0])
+        tick(history, 200.0, [{'pid': 10, 'create_time': 1.0}])
+        self.assertIn((10, 1.0), history)
+
+    def test_reused_pid_gets_a_fresh_series(self):
+        history = ProcessHistory(length=4, max_processes=2, tail=0.0)
+        tick(history, 100.0, [{'pid': 10, 'cpu': 9.0, 'create_time': 1.0}])
+        tick(history, 101.0, [{'pid': 10, 'cpu': 1.0, 'create_time': 50.0}])
+        self.assertEqual(history.series((10, 50.0), 'cpu'), [1.0])
+        self.assertNotIn((10, 1.0), history)
+
+    def test_full_slabs_reclaim_exited_then_drop(self):
+        history = ProcessHistory(length=2, max_processes=2, tail=60.0)
+        tick(history, 100.0, [{'pid': 10, 'create_time': 1.0}, {'pid': 11, 'create_time': 1.0}])
+        # 10 exits but is still in its tail; 12 takes its slot
+        tick(history, 101.0, [{'pid': 11, 'create_time': 1.0}, {'pid': 12, 'create_time': 1.0}])
+        self.assertNotIn((10, 1.0), history)
+        self.assertIn((12, 1.0), history)
+        # Nothing has exited now, so a third live process is not recorded
+        tick(history, 102.0, [{'pid': 11, 'create_time': 1.0}, {'pid': 12, 'create_time': 1.0},
+                              {'pid': 13, 'create_time': 1.0}])
+        self.assertEqual((len(history), history.dropped), (2, 1))
+        self.assertNotIn((13, 1.0), history)
+
+
+if __name__ == '__main__':
+    unittest.main()
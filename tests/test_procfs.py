@@ -0,0 +1,45 @@
+import sys
+import time
+import unittest
+
+import procfs
+from collector import PsutilBackend
+from process_table import StringPool, TableBuilder
+
+
+STATUS = (b"Name:\tsudo\nUmask:\t0022\nState:\tS (sleeping)\nTgid:\t4242\nPid:\t4242\nPPid:\t1\n"
+          b"Uid:\t1000\t0\t0\t0\nGid:\t1000\t1000\t1000\t1000\nThreads:\t1\n")
+
+
+def collect(backend):
+    builder = TableBuilder(StringPool(), StringPool(), StringPool())
+    backend.collect(builder)
+    return builder.build(time.time())
+
+
+class RealUidTest(unittest.TestCase):
+
+    def test_real_not_effective(self):
+        self.assertEqual(procfs.real_uid(STATUS), 1000)
+
+
+@unittest.skipUnless(sys.platform.startswith('linux') and procfs.is_supported(), "needs /proc")
+class BackendParityTest(unittest.TestCase):
+
+    def test_rows_match_psutil(self):
+        ours, theirs = collect(procfs.ProcfsBackend()), collect(PsutilBackend())
+        expected = {theirs.iid(i): (theirs.name(i), theirs.users[theirs.user_id[i]], theirs.ppid[i])
+                    for i in range(len(theirs))}
+        compared = 0
+        for i in range(len(ours)):
+            if 2 in (ours.pid[i], ours.ppid[i]):
+                continue  # kernel workers rename themselves as they switch workqueues
+            row = expected.get(ours.iid(i))
+            if row is not None:
+                compared += 1
+                self.assertEqual((ours.name(i), ours.users[ours.user_id[i]], ours.ppid[i]), row)
+        self.assertGreater(compared, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import os
+import shutil
+import tempfile
+import unittest
+from collections import namedtuple
+
+from collector import Sample
+from recorder import MAGIC, FRAME, RecordingWriter, Recording
+from snapshots import Snapshot, SnapshotInfo
+from conftest import make_table
+
+Memory = namedtuple('Memory', 'percent')
+
+
+def sample(timestamp, cpu, memory=50.0, table=None):
+    return Sample(timestamp, cpu, Memory(memory), 0, 30.0, 10.0, 4.0, table, None, None, None, None, None)
+
+
+class RecordingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, 'session.bin')
+
+    def record(self, samples):
+        writer = RecordingWriter(self.path)
+        for s in samples:
+            writer.write_sample(s)
+        writer.close()
+        self.assertEqual(writer.bytes, os.path.getsize(self.path))
+
+    def test_round_trip(self):
+        table = make_table([{'pid': 7, 'name': 'systemd'}, {'pid': 900, 'name': 'zsh', 'cpu': 12.5}],
+                           timestamp=101.0)
+        self.record([sample(100.0, 5.0), sample(101.0, 15.0, 60.0, table), sample(102.0, 25.0)])
+        recording = Recording(self.path)
+        self.assertEqual(recording.timestamps, [100.0, 101.0, 102.0])
+        self.assertEqual(recording.columns, ([5.0, 15.0, 25.0], [50.0, 60.0, 50.0], [4.0] * 3, [20.0] * 3))
+        [(timestamp, count, blob)] = recording.tables
+        self.assertEqual((timestamp, count), (101.0, 2))
+        snapshot = Snapshot(SnapshotInfo(1, timestamp, count, 0.0, 0.0, ''), blob)
+        self.assertEqual([snapshot.name(i) for i in range(len(snapshot))], ['systemd', 'zsh'])
+        self.assertAlmostEqual(snapshot.cpu[1], 12.5, places=2)
+
+    def test_system_at(self):
+        self.record([sample(100.0, 5.0), sample(101.0, 15.0, 60.0), sample(102.0, 25.0, 70.0)])
+        recording = Recording(self.path)
+        self.assertEqual(recording.system_at(99.9), (0.0, 0.0))
+        self.assertEqual(recording.system_at(100.0), (5.0, 50.0))
+        self.assertEqual(recording.system_at(101.5), (15.0, 60.0))
+        self.assertEqual(recording.system_at(500.0), (25.0, 70.0))
+
+    def test_empty_recording(self):
+        self.record([])
+        recording = Recording(self.path)
+        self.assertEqual((recording.timestamps, recording.tables), ([], []))
+        self.assertEqual(recording.system_at(100.0), (0.0, 0.0))
+
+    def test_rejects_foreign_file(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'NOTAREC!' + FRAME.pack(1, 0, 0.0))
+        with self.assertRaises(ValueError):
+            Recording(self.path)
+
+    def test_truncated_final_frame_is_dropped(self):
+        table = make_table([{'pid': 900}] * 3)
+        self.record([sample(100.0, 5.0), sample(101.0, 15.0, table=table)])
+        size = os.path.getsize(self.path)
+        for cut in (size - 1, size - 20, len(MAGIC) + 3):  # mid-payload, mid-table frame, mid-header
+            with self.subTest(cut=cut):
+                with open(self.path, 'r+b') as f:
+                    f.truncate(cut)
+                recording = Recording(self.path)
+                self.assertEqual(recording.tables, [])
+                # The second sample's system frame precedes its table frame
+                self.assertEqual(recording.timestamps, [100.0, 101.0] if cut > len(MAGIC) + 3 else [])
+
+
+if __name__ == '__main__':
+    unittest.main()
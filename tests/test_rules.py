@@ -0,0 +1,45 @@
+import os
+import unittest
+
+from rules import Rule, RuleEngine, KTHREADD
+from conftest import make_table
+
+
+class ProtectedProcessTest(unittest.TestCase):
+
+    def test_catch_all_rule_skips_protected_processes(self):
+        engine = RuleEngine([Rule('*', condition='rss_mb >= 0')])
+        rows = [{'pid': os.getpid()}, {'pid': 1, 'ppid': 0}, {'pid': 2, 'ppid': 0}, {'pid': 4242}]
+        if KTHREADD is not None:
+            rows.append({'pid': 4243, 'ppid': KTHREADD})
+        table = make_table(rows)
+        self.assertEqual([table.pid[i] for _, i, _ in engine.evaluate(table)], [4242])
+
+
+class SustainedBreachTest(unittest.TestCase):
+
+    def tick(self, engine, when, cpu):
+        table = make_table([{'pid': 4242, 'name': 'worker', 'cpu': cpu, 'create_time': 1.0}], timestamp=when)
+        return [table.pid[i] for _, i, _ in engine.evaluate(table)]
+
+    def test_fires_once_after_duration(self):
+        engine = RuleEngine([Rule('worker', 90, 90, duration=10)])
+        fired = [self.tick(engine, 1000.0 + t, 100) for t in range(0, 20, 2)]
+        self.assertEqual(fired, [[], [], [], [], [], [4242], [], [], [], []])
+
+    def test_short_spike_does_not_fire(self):
+        engine = RuleEngine([Rule('worker', 90, 90, duration=10)])
+        fired = [self.tick(engine, 1000.0 + t, 100 if t < 4 else 5) for t in range(0, 20, 2)]
+        self.assertEqual(sum(fired, []), [])
+
+    def test_rearms_only_below_hysteresis(self):
+        engine = RuleEngine([Rule('worker', 90, 90, duration=0)])
+        self.assertEqual(self.tick(engine, 1000.0, 95), [4242])
+        self.assertEqual(self.tick(engine, 1001.0, 85), [])  # within 10% of the threshold: still breaching
+        self.assertEqual(self.tick(engine, 1002.0, 95), [])
+        self.assertEqual(self.tick(engine, 1003.0, 50), [])  # cleared
+        self.assertEqual(self.tick(engine, 1004.0, 95), [4242])
+
+
+if __name__ == '__main__':
+    unittest.main()
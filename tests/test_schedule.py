@@ -0,0 +1,54 @@
+import unittest
+
+from collector import Schedule
+
+
+def run(schedule, until, latency):
+    """Drive a Schedule like Collector.run, waking `latency` seconds late; returns the samples taken"""
+    now, samples = 0.0, []
+    while now < until:
+        due = schedule.due(now)
+        if due:
+            samples.append((now, due))
+            schedule.mark(due, now)
+        now += schedule.next_wake(now) + latency
+    return samples
+
+
+class ScheduleTest(unittest.TestCase):
+
+    def test_late_wakeups_do_not_drift(self):
+        schedule = Schedule(system=0.5, processes=1.0)
+        samples = run(schedule, 30.0, latency=0.01)
+        self.assertEqual(len(samples), 60)
+        # Every process tick shares a sample with a system tick
+        self.assertTrue(all('system' in due for _, due in samples))
+        self.assertEqual(sum('processes' in due for _, due in samples), 30)
+
+    def test_refresh_restarts_the_grid(self):
+        schedule = Schedule(system=1.0, processes=2.0)
+        schedule.mark({'system', 'processes', 'watched'}, 0.0)
+        schedule.mark({'system', 'processes'}, 0.7)  # refresh between ticks
+        self.assertAlmostEqual(schedule.next_due['system'], 1.7)
+        self.assertAlmostEqual(schedule.next_due['processes'], 2.7)
+
+    def test_falling_far_behind_does_not_burst(self):
+        schedule = Schedule(system=1.0)
+        schedule.mark({'system'}, 0.0)
+        schedule.mark({'system'}, 5.2)
+        self.assertAlmostEqual(schedule.next_due['system'], 6.2)
+
+    def test_history_alone_samples_slowly(self):
+        schedule = Schedule(processes=2.0, history=10.0)
+        schedule.processes_visible = False
+        self.assertIsNone(schedule.interval('processes'))
+        schedule.history_active = True
+        self.assertEqual(schedule.interval('processes'), 10.0)
+        schedule.iconified = True
+        self.assertEqual(schedule.interval('processes'), 50.0)
+        schedule.rules_active = True
+        self.assertEqual(schedule.interval('processes'), 2.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
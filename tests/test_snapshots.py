@@ -0,0 +1,133 @@
+import os
+import zlib
+import shutil
+import tempfile
+import unittest
+
+from snapshots import Snapshot, SnapshotInfo, SnapshotStore, encode, diff, sqlite3
+from conftest import make_table
+
+MB = 1024 * 1024
+
+
+def info(count=0, timestamp=0.0):
+    return SnapshotInfo(1, timestamp, count, 0.0, 0.0, '')
+
+
+def snapshot_of(table):
+    return Snapshot(info(len(table)), encode(table))
+
+
+class EncodeTest(unittest.TestCase):
+
+    def test_round_trip(self):
+        table = make_table([
+            {'pid': 900, 'name': 'zsh', 'cpu': 12.34, 'memory': 1.5, 'rss': 300 * MB, 'threads': 4,
+             'create_time': 1700000000.25},
+            {'pid': 7, 'name': 'systemd', 'cpu': 0.0, 'memory': 0.07, 'rss': 12 * MB, 'threads': 1,
+             'create_time': 1600000000.0},
+            {'pid': 31337, 'name': 'naïve ☃', 'cpu': 100.0, 'memory': 42.0, 'rss': 2 ** 40, 'threads': 9000,
+             'create_time': 1700000123.99},
+            {'pid': 8, 'name': 'zsh', 'create_time': 1700000001.0},
+        ])
+        snapshot = snapshot_of(table)
+        self.assertEqual(len(snapshot), 4)
+        rows = sorted(range(len(table)), key=table.pid.__getitem__)
+        for j, i in enumerate(rows):  # decoded rows come back in PID order
+            self.assertEqual(snapshot.pid[j], table.pid[i])
+            self.assertEqual(snapshot.name(j), table.name(i))
+            self.assertAlmostEqual(snapshot.cpu[j], table.cpu[i], places=2)
+            self.assertAlmostEqual(snapshot.memory[j], table.memory[i], places=2)
+            self.assertEqual(snapshot.rss[j], table.rss[i])
+            self.assertEqual(snapshot.threads[j], table.threads[i])
+            self.assertAlmostEqual(snapshot.create_time[j], table.create_time[i], places=2)
+        self.assertEqual(len(set(snapshot.name_id)), 3)  # names are stored once each
+
+    def test_empty_table(self):
+        snapshot = snapshot_of(make_table([]))
+        self.assertEqual((len(snapshot), list(snapshot.rows())), (0, []))
+
+    def test_rejects_foreign_blob(self):
+        with self.assertRaises(ValueError):
+            Snapshot(info(), zlib.compress(b'XXXX\0\0\0\0'))
+
+
+class SnapshotStoreTest(unittest.TestCase):
+
+    def fill(self, store):
+        added = [store.add(make_table([{}] * (k + 1)), 10.0 * k, 20.0, f"#{k}", timestamp=ts)
+                 for k, ts in enumerate((300.0, 100.0, 200.0, 200.0))]
+        return added
+
+    def test_ids_and_time_order(self):
+        store = SnapshotStore()
+        added = self.fill(store)
+        self.assertEqual(len({a.id for a in added}), 4)  # same timestamp, distinct IDs
+        self.assertEqual([i.description for i in store], ["#1", "#2", "#3", "#0"])
+        self.assertEqual(len(store.get(added[3].id)), 4)
+        self.assertIsNone(store.get(999))
+        store.clear()
+        self.assertEqual((len(store), store.get(added[0].id)), (0, None))
+
+    def test_decode_cache_is_bounded(self):
+        store = SnapshotStore(cache_size=2)
+        added = self.fill(store)
+        for a in added:
+            store.get(a.id)
+        self.assertEqual(list(store.cache), [added[2].id, added[3].id])
+        self.assertIs(store.get(added[3].id), store.get(added[3].id))
+
+    @unittest.skipIf(sqlite3 is None, "needs sqlite3")
+    def test_database_survives_reopen(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'snapshots.db')
+        store = SnapshotStore(path)
+        added = self.fill(store)
+        store.close()
+
+        store = SnapshotStore(path)
+        self.addCleanup(store.close)
+        self.assertEqual([i.description for i in store], ["#1", "#2", "#3", "#0"])
+        self.assertEqual(store.info(added[0].id), added[0])
+        self.assertEqual(len(store.get(added[0].id)), 1)
+        later = store.add(make_table([]), 0.0, 0.0, timestamp=400.0)
+        self.assertGreater(later.id, max(a.id for a in added))
+
+
+class DiffTest(unittest.TestCase):
+
+    def test_started_exited_and_deltas(self):
+        old = snapshot_of(make_table([
+            {'pid': 10, 'cpu': 5.0, 'rss': 100 * MB, 'create_time': 1.0},
+            {'pid': 11, 'cpu': 50.0, 'rss': 10 * MB, 'create_time': 1.0},
+            {'pid': 12, 'create_time': 1.0},
+            {'pid': 13, 'create_time': 1.0},  # PID reused below
+        ]))
+        new = make_table([
+            {'pid': 10, 'cpu': 25.0, 'rss': 40 * MB, 'create_time': 1.0},
+            {'pid': 11, 'cpu': 50.0, 'rss': 90 * MB, 'create_time': 1.0},
+            {'pid': 13, 'create_time': 2.0},
+            {'pid': 14, 'create_time': 2.0},
+        ])
+        result = diff(old, new)
+        self.assertEqual(sorted(new.pid[j] for j in result.started), [13, 14])
+        self.assertEqual(sorted(old.pid[i] for i in result.exited), [12, 13])
+        self.assertEqual([(delta, old.pid[i], new.pid[j]) for delta, i, j in result.cpu], [(20.0, 10, 10)])
+        self.assertEqual([(delta // MB, new.pid[j]) for delta, i, j in result.rss], [(80, 11), (-60, 10)])
+
+    def test_top_limits_each_direction(self):
+        rows = [{'pid': pid, 'rss': 100 * MB, 'create_time': 1.0} for pid in range(100, 130)]
+        old = snapshot_of(make_table(rows))
+        new = make_table([dict(row, rss=row['rss'] + (row['pid'] - 115) * MB) for row in rows])
+        result = diff(old, new, top=3)
+        self.assertEqual([delta // MB for delta, _, _ in result.rss], [14, 13, 12, -15, -14, -13])
+
+    def test_identical(self):
+        table = make_table([{'pid': 1}, {'pid': 2}])
+        result = diff(snapshot_of(table), table)
+        self.assertEqual(result[2:], ([], [], [], []))
+
+
+if __name__ == '__main__':
+    unittest.main()
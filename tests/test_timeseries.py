@@ -0,0 +1,73 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from timeseries import RingFile
+
+
+class RingFileTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'history.ring')
+
+    def open(self, fields=3, capacity=4):
+        ring = RingFile(self.path, fields, capacity)
+        self.addCleanup(ring.close)
+        return ring
+
+    def test_reopen_restores_records(self):
+        ring = self.open()
+        for k in range(3):
+            ring.append(100.0 + k, (k, k * 10))
+        ring.close()
+
+        ring = self.open()
+        self.assertEqual(len(ring), 3)
+        self.assertEqual(ring.columns(), ([100.0, 101.0, 102.0], [[0.0, 1.0, 2.0], [0.0, 10.0, 20.0]]))
+
+    def test_wraps_and_keeps_the_newest(self):
+        ring = self.open()
+        for k in range(10):
+            ring.append(100.0 + k, (k, -k))
+        ring.close()
+
+        ring = self.open()
+        timestamps, (first, second) = ring.columns()
+        self.assertEqual(timestamps, [106.0, 107.0, 108.0, 109.0])
+        self.assertEqual(second, [-6.0, -7.0, -8.0, -9.0])
+        # Appending after a reopen continues the ring where it stopped
+        ring.append(110.0, (10, -10))
+        self.assertEqual(ring.columns()[0], [107.0, 108.0, 109.0, 110.0])
+
+    def test_since(self):
+        ring = self.open()
+        for k in range(6):
+            ring.append(100.0 + k, (k, k))
+        self.assertEqual(ring.columns(since=103.5)[0], [104.0, 105.0])
+        self.assertEqual(ring.columns(since=200.0), ([], [[], []]))
+
+    def test_layout_change_starts_empty(self):
+        ring = self.open()
+        ring.append(100.0, (1, 2))
+        ring.close()
+        for fields, capacity in ((3, 8), (4, 4)):
+            with self.subTest(fields=fields, capacity=capacity):
+                ring = self.open(fields, capacity)
+                self.assertEqual(len(ring), 0)
+                ring.close()
+
+    def test_foreign_file_starts_empty(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'\xff' * (64 + 8 * 3 * 4))
+        ring = self.open()
+        self.assertEqual((len(ring), ring.columns()), (0, ([], [[], []])))
+
+    def test_empty(self):
+        self.assertEqual(self.open().columns(), ([], [[], []]))
+
+
+if __name__ == '__main__':
+    unittest.main()
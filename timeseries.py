@@ -0,0 +1,309 @@
+import os
+import mmap
+import time
+import struct
+from array import array
+from bisect import bisect_left
+
+
+class Ring:
+    """Fixed-capacity ring of timestamped rows held in preallocated arrays"""
+
+    def __init__(self, capacity, width):
+        self.capacity = capacity
+        self.ts = array('d', bytes(8 * capacity))
+        self.columns = [array('d', bytes(8 * capacity)) for _ in range(width)]
+        self.head = 0  # next slot to write
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, ts, row):
+        slot = self.head
+        self.ts[slot] = ts
+        for column, value in zip(self.columns, row):
+            column[slot] = value
+        self.head = (slot + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    def _slices(self, since):
+        """Chronological (start, stop) slot ranges for rows with ts >= since"""
+        start = (self.head - self.count) % self.capacity
+        if start + self.count <= self.capacity:
+            ranges = [(start, start + self.count)]
+        else:
+            ranges = [(start, self.capacity), (0, self.head)]
+        # Timestamps are increasing, so skip old rows with a binary search per range
+        result = []
+        for lo, hi in ranges:
+            a, b = lo, hi
+            while a < b:
+                mid = (a + b) // 2
+                if self.ts[mid] < since:
+                    a = mid + 1
+                else:
+                    b = mid
+            if a < hi:
+                result.append((a, hi))
+        return result
+
+    def since(self, since, column):
+        """Values of one column for rows newer than `since`, oldest first"""
+        values = self.columns[column]
+        out = []
+        for lo, hi in self._slices(since):
+            out.extend(values[lo:hi])
+        return out
+
+    def timestamps(self, since):
+        out = []
+        for lo, hi in self._slices(since):
+            out.extend(self.ts[lo:hi])
+        return out
+
+    def extend(self, timestamps, columns):
+        """Append chronological rows given column-wise; only the last `capacity` are kept"""
+        start = max(0, len(timestamps) - self.capacity)
+        for i in range(start, len(timestamps)):
+            self.append(timestamps[i], [column[i] for column in columns])
+
+
+class Resolution:
+    """One level of a MetricStore: raw samples, or min/avg/max buckets of `step` seconds"""
+
+    def __init__(self, name, step, capacity, metrics):
+        self.name = name
+        self.step = step
+        self.metrics = metrics
+        # Raw rows hold one value per metric; rollups hold min, avg, max per metric
+        self.ring = Ring(capacity, metrics if not step else metrics * 3)
+        self.bucket = None  # start time of the open bucket
+        self.count = 0
+        self.sums = [0.0] * metrics
+        self.mins = [0.0] * metrics
+        self.maxs = [0.0] * metrics
+
+    def add(self, ts, values):
+        if not self.step:
+            self.ring.append(ts, values)
+            return
+        bucket = ts - ts % self.step
+        if bucket != self.bucket:
+            self.flush()
+            self.bucket = bucket
+            self.count = 0
+            self.sums = [0.0] * self.metrics
+            self.mins = list(values)
+            self.maxs = list(values)
+        self.count += 1
+        for i, value in enumerate(values):
+            self.sums[i] += value
+            if value < self.mins[i]:
+                self.mins[i] = value
+            if value > self.maxs[i]:
+                self.maxs[i] = value
+
+    def open_row(self):
+        row = []
+        for i in range(self.metrics):
+            row.extend((self.mins[i], self.sums[i] / self.count, self.maxs[i]))
+        return row
+
+    def flush(self):
+        """Commit the open bucket to the ring"""
+        if self.bucket is not None and self.count:
+            self.ring.append(self.bucket, self.open_row())
+            self.bucket = None
+            self.count = 0
+
+    def extend(self, timestamps, columns):
+        """Bulk-load chronological samples given column-wise.
+
+        Rollup buckets are cut with a binary search over the timestamps and
+        reduced with min/sum/max over slices, so the cost grows with the
+        number of buckets rather than the number of samples. The newest
+        bucket is left open for live samples to keep folding into.
+        """
+        if not self.step:
+            self.ring.extend(timestamps, columns)
+            return
+        lo = 0
+        total = len(timestamps)
+        while lo < total:
+            bucket = timestamps[lo] - timestamps[lo] % self.step
+            hi = bisect_left(timestamps, bucket + self.step, lo)
+            self.flush()
+            self.bucket = bucket
+            self.count = hi - lo
+            self.sums = [sum(column[lo:hi]) for column in columns]
+            self.mins = [min(column[lo:hi]) for column in columns]
+            self.maxs = [max(column[lo:hi]) for column in columns]
+            lo = hi
+
+    def window(self, metric, since, stat='avg'):
+        """Values of one metric for rows newer than `since`, including the open bucket"""
+        if not self.step:
+            return self.ring.since(since, metric)
+        offset = {'min': 0, 'avg': 1, 'max': 2}[stat]
+        values = self.ring.since(since, metric * 3 + offset)
+        if self.count and self.bucket >= since:
+            values.append(self.open_row()[metric * 3 + offset])
+        return values
+
+
+class MetricStore:
+    """Bounded multi-resolution history for a fixed set of system metrics.
+
+    Every sample goes into the raw ring and is folded incrementally into the
+    open 1-minute and 1-hour buckets, so reads for long ranges never have to
+    downsample raw points. Memory is fixed by the ring capacities: by default
+    an hour of raw samples, a week of minutes and 90 days of hours.
+    """
+
+    RESOLUTIONS = (('raw', 0, 3600), ('1m', 60, 7 * 24 * 60), ('1h', 3600, 90 * 24))
+
+    def __init__(self, metrics, resolutions=RESOLUTIONS, max_points=1500):
+        self.metrics = list(metrics)
+        self.max_points = max_points
+        self.levels = [Resolution(name, step, capacity, len(self.metrics))
+                       for name, step, capacity in resolutions]
+        self.raw_step = 1.0
+        self.last_ts = None
+        self.latest = [0.0] * len(self.metrics)
+
+    def add(self, ts, values):
+        if self.last_ts is not None and ts > self.last_ts:
+            # Track the actual sample spacing to pick resolutions for a range
+            self.raw_step = 0.8 * self.raw_step + 0.2 * (ts - self.last_ts)
+        self.last_ts = ts
+        self.latest = list(values)
+        for level in self.levels:
+            level.add(ts, values)
+
+    def extend(self, timestamps, columns):
+        """Bulk-load chronological history, e.g. restored from a RingFile"""
+        if not timestamps:
+            return
+        for level in self.levels:
+            level.extend(timestamps, columns)
+        self.last_ts = timestamps[-1]
+        self.latest = [column[-1] for column in columns]
+        if len(timestamps) > 1:
+            tail = timestamps[-min(len(timestamps), 10):]
+            self.raw_step = max((tail[-1] - tail[0]) / (len(tail) - 1), 0.1)
+
+    def rows(self, seconds, now=None):
+        """(fields, row iterator, row count) for the last `seconds` at the resolution window() uses.
+
+        Rollup rows carry min/avg/max per metric. The values are copied out
+        first, so the iterator can be consumed on another thread.
+        """
+        level = self.resolution_for(seconds)
+        since = (now or time.time()) - seconds
+        ring = level.ring
+        timestamps = ring.timestamps(since)
+        if not level.step:
+            fields = ('timestamp',) + tuple(self.metrics)
+        else:
+            fields = ('timestamp',) + tuple(f'{metric}_{stat}' for metric in self.metrics
+                                            for stat in ('min', 'avg', 'max'))
+        columns = [ring.since(since, c) for c in range(len(ring.columns))]
+        if level.step and level.count and level.bucket >= since:
+            timestamps.append(level.bucket)
+            for column, value in zip(columns, level.open_row()):
+                column.append(value)
+        return fields, zip(timestamps, *columns), len(timestamps)
+
+    def resolution_for(self, seconds):
+        """Finest resolution that draws `seconds` of history in at most max_points points"""
+        for level in self.levels:
+            step = level.step or self.raw_step
+            if seconds / step <= self.max_points:
+                return level
+        return self.levels[-1]
+
+    def window(self, metric, seconds, stat='avg', now=None):
+        """(resolution name, values) for the last `seconds` of one metric"""
+        level = self.resolution_for(seconds)
+        since = (now or time.time()) - seconds
+        return level.name, level.window(self.metrics.index(metric), since, stat)
+
+
+class RingFile:
+    """Fixed-size on-disk ring of timestamped metric records, accessed through mmap.
+
+    The file is a small header followed by `capacity` records of
+    (timestamp, *metrics) little-endian doubles. Appends overwrite one
+    record and the header in place and never fsync; the page cache writes
+    them back, and at worst the newest few samples are lost on a crash.
+    Reopening maps the file and casts it to a memoryview of doubles;
+    columns() then copies each metric out with one strided slice, with no
+    per-record unpacking. The copy is deliberate: the mapping cannot be
+    closed while views onto it are still held elsewhere.
+    """
+
+    MAGIC = b'TMRING01'
+    HEADER = struct.Struct('<8sIIQQ')  # magic, fields per record, capacity, head, count
+    HEADER_SIZE = 64
+
+    def __init__(self, path, fields, capacity):
+        self.path = path
+        self.fields = fields  # doubles per record, timestamp included
+        self.capacity = capacity
+        self.record = struct.Struct(f'<{fields}d')
+        size = self.HEADER_SIZE + self.record.size * capacity
+
+        fd = os.open(path, os.O_RDWR | os.O_CREAT | getattr(os, 'O_BINARY', 0), 0o644)
+        try:
+            fresh = os.fstat(fd).st_size != size
+            if fresh:
+                os.ftruncate(fd, size)
+            self.mm = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+
+        magic, stored_fields, stored_capacity, head, count = self.HEADER.unpack_from(self.mm, 0)
+        if fresh or magic != self.MAGIC or stored_fields != fields or stored_capacity != capacity:
+            # New file, or one written with another layout: start an empty ring
+            head = count = 0
+            self.HEADER.pack_into(self.mm, 0, self.MAGIC, fields, capacity, 0, 0)
+        self.head = head % capacity
+        self.count = min(count, capacity)
+        self.values = memoryview(self.mm)[self.HEADER_SIZE:].cast('d')
+
+    def __len__(self):
+        return self.count
+
+    def append(self, timestamp, values):
+        self.record.pack_into(self.mm, self.HEADER_SIZE + self.head * self.record.size, timestamp, *values)
+        self.head = (self.head + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+        self.HEADER.pack_into(self.mm, 0, self.MAGIC, self.fields, self.capacity, self.head, self.count)
+
+    def columns(self, since=0.0):
+        """(timestamps, [metric columns]) for records newer than `since`, oldest first, as lists"""
+        start = (self.head - self.count) % self.capacity
+        if start + self.count <= self.capacity:
+            segments = [(start, start + self.count)]
+        else:
+            segments = [(start, self.capacity), (0, self.head)]
+        fields = self.fields
+        columns = [[] for _ in range(fields)]
+        for lo, hi in segments:
+            rows = self.values[lo * fields:hi * fields]
+            for f in range(fields):
+                columns[f].extend(rows[f::fields])
+        timestamps = columns[0]
+        skip = bisect_left(timestamps, since)
+        return timestamps[skip:], [column[skip:] for column in columns[1:]]
+
+    def close(self):
+        if self.mm is None:
+            return
+        self.values.release()
+        self.mm.flush()
+        self.mm.close()
+        self.mm = None
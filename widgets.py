@@ -0,0 +1,309 @@
+import tkinter as tk
+
+
+class VirtualTreeview:
+    """Drives an existing Treeview as a scrolling window onto a large row model.
+
+    Only the visible rows plus a small overscan are materialized as Treeview
+    items. The scrollbar is driven from the model size, so memory and render
+    cost stay flat however many rows the model holds. Rows are formatted
+    lazily, only when they scroll into the window.
+    """
+
+    def __init__(self, tree, scrollbar, row_height=25, heading_height=25, overscan=5):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.row_height = row_height
+        self.heading_height = heading_height
+        self.overscan = overscan
+
+        self.model = ()
+        self.key_fn = None
+        self.format_fn = None
+        self.offset = 0
+        self.selected = set()  # keys of selected rows, including rows outside the window
+        self.slots = []  # iid of each materialized row, top to bottom
+        self.slot_rows = {}  # iid: (key, values, tags) last written
+        self.attached = False
+
+        # Bound once; every handler is a no-op while the tree is in normal mode
+        for sequence, handler in (('<MouseWheel>', self.on_wheel),
+                                  ('<Button-4>', self.on_wheel),
+                                  ('<Button-5>', self.on_wheel),
+                                  ('<Up>', self.on_key),
+                                  ('<Down>', self.on_key),
+                                  ('<Prior>', self.on_key),
+                                  ('<Next>', self.on_key),
+                                  ('<Configure>', lambda e: self.render()),
+                                  ('<<TreeviewSelect>>', self.on_select)):
+            self.tree.bind(sequence, handler, add='+')
+
+    def attach(self):
+        """Take over the tree and scrollbar from the normal (fully populated) mode"""
+        if self.attached:
+            return
+        self.attached = True
+        self.offset = 0
+        self.tree.configure(yscrollcommand='')
+        self.scrollbar.configure(command=self.yview)
+
+    def detach(self):
+        """Drop the materialized rows and hand the tree back to normal scrolling"""
+        if not self.attached:
+            return
+        self.attached = False
+        if self.slots:
+            self.tree.delete(*self.slots)
+        self.slots = []
+        self.slot_rows = {}
+        self.selected = set()
+        self.tree.configure(yscrollcommand=self.scrollbar.set)
+        self.scrollbar.configure(command=self.tree.yview)
+
+    def set_model(self, rows, key_fn, format_fn):
+        """Replace the (already filtered and sorted) model and redraw the window.
+
+        format_fn(row) must return (values, tags); it is only called for
+        rows inside the window.
+        """
+        self.model = rows
+        self.key_fn = key_fn
+        self.format_fn = format_fn
+        self.render()
+
+    def visible_count(self):
+        height = self.tree.winfo_height() - self.heading_height
+        return max(1, height // self.row_height)
+
+    def max_offset(self):
+        return max(0, len(self.model) - self.visible_count())
+
+    def scroll_to(self, offset):
+        offset = max(0, min(int(offset), self.max_offset()))
+        if offset != self.offset:
+            self.offset = offset
+            self.render()
+
+    def yview(self, *args):
+        """Scrollbar command: 'moveto fraction' or 'scroll n units|pages'"""
+        if not args:
+            return
+        if args[0] == 'moveto':
+            self.scroll_to(float(args[1]) * len(self.model))
+        elif args[0] == 'scroll':
+            step = int(args[1])
+            if args[2] == 'pages':
+                step *= self.visible_count()
+            self.scroll_to(self.offset + step)
+
+    def on_wheel(self, event):
+        if not self.attached:
+            return
+        if getattr(event, 'num', None) == 4 or getattr(event, 'delta', 0) > 0:
+            self.scroll_to(self.offset - 3)
+        else:
+            self.scroll_to(self.offset + 3)
+        return "break"
+
+    def on_key(self, event):
+        """Move the selection through the model, scrolling the window with it"""
+        if not self.attached:
+            return
+        if not self.model:
+            return "break"
+        step = {'Up': -1, 'Down': 1,
+                'Prior': -self.visible_count(), 'Next': self.visible_count()}[event.keysym]
+        focus = self.tree.focus()
+        if focus in self.slot_rows:
+            index = self.offset + self.slots.index(focus)
+        else:
+            index = self.offset
+        index = max(0, min(len(self.model) - 1, index + step))
+
+        if index < self.offset:
+            self.offset = index
+        elif index >= self.offset + self.visible_count():
+            self.offset = index - self.visible_count() + 1
+        self.selected = {self.key_fn(self.model[index])}
+        self.render()
+
+        iid = self.slots[index - self.offset]
+        self.tree.focus(iid)
+        self.tree.selection_set(iid)
+        return "break"
+
+    def on_select(self, event):
+        if not self.attached:
+            return
+        in_window = {row[0] for row in self.slot_rows.values()}
+        chosen = {self.slot_rows[iid][0] for iid in self.tree.selection() if iid in self.slot_rows}
+        self.selected = (self.selected - in_window) | chosen
+
+    def render(self):
+        if not self.attached or self.format_fn is None:
+            return
+        self.offset = max(0, min(self.offset, self.max_offset()))
+        window = self.model[self.offset:self.offset + self.visible_count() + self.overscan]
+
+        while len(self.slots) > len(window):
+            iid = self.slots.pop()
+            self.tree.delete(iid)
+            self.slot_rows.pop(iid, None)
+
+        wanted_selection = []
+        for i, row in enumerate(window):
+            key = self.key_fn(row)
+            values, tags = self.format_fn(row)
+            if i == len(self.slots):
+                iid = f"slot{i}"
+                self.tree.insert('', tk.END, iid=iid, values=values, tags=tags)
+                self.slots.append(iid)
+            else:
+                iid = self.slots[i]
+                if self.slot_rows.get(iid, (None,))[1:] != (values, tags):
+                    self.tree.item(iid, values=values, tags=tags)
+            self.slot_rows[iid] = (key, values, tags)
+            if key in self.selected:
+                wanted_selection.append(iid)
+
+        if set(self.tree.selection()) != set(wanted_selection):
+            self.tree.selection_set(wanted_selection)
+        self.tree.yview_moveto(0)
+
+        total = len(self.model)
+        if total:
+            self.scrollbar.set(self.offset / total,
+                               min(1.0, (self.offset + self.visible_count()) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+
+class LineGraph:
+    """A graph panel whose Canvas items are created once and updated in place.
+
+    layout() positions the static parts (background, grid, title) and is only
+    needed when the canvas is resized; update() just moves the polyline and
+    changes the value label, so a refresh costs two Tcl calls.
+    """
+
+    def __init__(self, canvas, title, color, bg, fg, grid='#3e3e42', border=None):
+        self.canvas = canvas
+        self.color = color
+        self.box = (0, 0, 0, 0)
+        self.background = canvas.create_rectangle(0, 0, 0, 0, fill=bg, outline=border or bg, width=2)
+        self.title = canvas.create_text(0, 0, text=title, font=('Arial', 11, 'bold'), fill=fg)
+        self.value = canvas.create_text(0, 0, text="0.0", font=('Arial', 10, 'bold'), fill=color)
+        self.grid = [canvas.create_line(0, 0, 0, 0, fill=grid, dash=(2, 2)) for _ in range(5)]
+        self.line = canvas.create_line(0, 0, 0, 0, fill=color, width=2, smooth=True)
+
+    def layout(self, x, y, width, height):
+        self.box = (x, y, width, height)
+        canvas = self.canvas
+        canvas.coords(self.background, x, y, x + width, y + height)
+        canvas.coords(self.title, x + width // 2, y + 15)
+        canvas.coords(self.value, x + width // 2, y + height - 15)
+        for i, item in enumerate(self.grid):
+            y_pos = y + 30 + (height - 60) * i / 4
+            canvas.coords(item, x + 10, y_pos, x + width - 10, y_pos)
+
+    def update(self, data, max_val):
+        x, y, width, height = self.box
+        current = data[-1] if data else 0
+        self.canvas.itemconfig(self.value, text=f"{current:.1f}")
+
+        if len(data) < 2 or width < 30 or height < 70 or max_val <= 0:
+            self.canvas.coords(self.line, 0, 0, 0, 0)
+            return
+        step = (width - 20) / (len(data) - 1)
+        span = height - 60
+        points = []
+        for i, value in enumerate(data):
+            points.append(x + 10 + step * i)
+            points.append(y + 30 + span * (1 - min(value, max_val) / max_val))
+        self.canvas.coords(self.line, *points)
+
+
+def heat_color(value, levels=10):
+    """Quantized dark-to-red fill for a 0-100 value"""
+    level = min(levels - 1, max(0, int(value * levels / 100)))
+    t = level / (levels - 1)
+    red = int(0x2d + (0xe7 - 0x2d) * t)
+    green = int(0x2d + (0x4c - 0x2d) * t)
+    blue = int(0x30 + (0x3c - 0x30) * t)
+    return f"#{red:02x}{green:02x}{blue:02x}"
+
+
+class Heatmap:
+    """Grid of 0-100 cells, one per CPU core, drawn with reusable Canvas items.
+
+    Cells are rectangles created once and only recoloured when a value moves
+    into another colour band, so a tick touches only the cells that changed
+    and cost stays flat from 4 to 256 cores. Items are added or removed only
+    when the number of cells changes.
+    """
+
+    def __init__(self, canvas, bg, fg, border=None, gap=2):
+        self.canvas = canvas
+        self.fg = fg
+        self.gap = gap
+        self.box = (0, 0, 0, 0)
+        self.cells = []
+        self.colors = []
+        self.values = []
+        self.background = canvas.create_rectangle(0, 0, 0, 0, fill=bg, outline=border or bg, width=2)
+        self.title = canvas.create_text(0, 0, text="Per-core CPU (%)", font=('Arial', 11, 'bold'), fill=fg, anchor='w')
+        self.summary = canvas.create_text(0, 0, text="", font=('Arial', 10), fill=fg, anchor='e')
+
+    def layout(self, x, y, width, height):
+        self.box = (x, y, width, height)
+        canvas = self.canvas
+        canvas.coords(self.background, x, y, x + width, y + height)
+        canvas.coords(self.title, x + 10, y + 15)
+        canvas.coords(self.summary, x + width - 10, y + 15)
+        self.place_cells()
+
+    def place_cells(self):
+        x, y, width, height = self.box
+        count = len(self.cells)
+        if not count or width < 30 or height < 40:
+            return
+        area_w, area_h = width - 20, height - 40
+        # Pick the column count that gives the largest roughly square cells
+        columns = 1
+        best = 0
+        for cols in range(1, count + 1):
+            rows = -(-count // cols)
+            size = min(area_w / cols, area_h / rows)
+            if size > best:
+                best, columns = size, cols
+        cell_w = area_w / columns
+        cell_h = area_h / -(-count // columns)
+        gap = self.gap if min(cell_w, cell_h) > 3 * self.gap else 0
+        for i, item in enumerate(self.cells):
+            row, col = divmod(i, columns)
+            left = x + 10 + col * cell_w
+            top = y + 30 + row * cell_h
+            self.canvas.coords(item, left, top, left + cell_w - gap, top + cell_h - gap)
+
+    def update(self, values):
+        canvas = self.canvas
+        if len(values) != len(self.cells):
+            # CPU hotplug or first data: grow or shrink the item pool, then re-place
+            while len(self.cells) < len(values):
+                self.cells.append(canvas.create_rectangle(0, 0, 0, 0, width=0))
+                self.colors.append(None)
+            while len(self.cells) > len(values):
+                canvas.delete(self.cells.pop())
+                self.colors.pop()
+            self.place_cells()
+        self.values = values
+
+        for i, value in enumerate(values):
+            color = heat_color(value)
+            if color != self.colors[i]:
+                canvas.itemconfig(self.cells[i], fill=color)
+                self.colors[i] = color
+
+        if values:
+            busiest = max(range(len(values)), key=values.__getitem__)
+            canvas.itemconfig(self.summary, text=f"{len(values)} cores, busiest #{busiest}: {values[busiest]:.0f}%")